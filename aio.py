@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+
+from cnf import get_backend
+
+#Asynchronous API of the core calculation for asyncio, used by solve_async and z3solve_async of Graph and HGraph:
+#g = Graph(parse=path)
+#retraction = await g.solve_async(backend="kissat", timeout=60)
+#The search itself runs in a thread of the default executor of the event loop, so the event loop stays free for everything else while encoding and reducing.
+#Backends that run a solver binary get their calls handed back to the event loop, which runs the binary via asyncio.create_subprocess_exec and streams the CNF to it, see cnf.Budget.run_async.
+#z3 runs in-process, thus the calculations that use it, i.e. z3solve_async and solve_async with any backend without solve_async, hold a bounded semaphore while they run in the executor, which limits how many of them run at once.
+#Cancelling the task awaiting a calculation stops the calculation just like setting the cancel event of solve, which leaves the graph at the smallest retract found so far.
+
+#Amount of calculations using z3 that may run at once in an event loop, unless a semaphore of their own gets handed to them.
+Z3_CONCURRENCY = os.cpu_count() or 1
+
+#Bounded semaphores of the event loops, each one gets created on first use within its loop.
+_semaphores = weakref.WeakKeyDictionary()
+
+#Returns the bounded semaphore of the running event loop that limits the calculations using z3 to Z3_CONCURRENCY.
+def z3_semaphore():
+
+    loop = asyncio.get_running_loop()
+
+    if not loop in _semaphores:
+        _semaphores[loop] = asyncio.BoundedSemaphore(Z3_CONCURRENCY)
+
+    return _semaphores[loop]
+
+#Backend handed to the search running in the executor, which runs each call of backend.solve_async in the event loop and waits for its result.
+class _LoopBackend:
+
+    def __init__(self, backend, loop):
+
+        self.backend = backend
+        self.loop = loop
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        return asyncio.run_coroutine_threadsafe(self.backend.solve_async(cnf, assumptions, budget), self.loop).result()
+
+#Runs solve, the solve method of a Graph or HGraph, with the given backend and keyword arguments in the executor, see above.
+async def solve(solve, backend, semaphore, **kwargs):
+
+    loop = asyncio.get_running_loop()
+
+    backend = get_backend(backend)
+
+    if hasattr(backend, "solve_async"):
+        return await _run(functools.partial(solve, backend=_LoopBackend(backend, loop), **kwargs))
+
+    async with semaphore or z3_semaphore():
+        return await _run(functools.partial(solve, backend=backend, **kwargs))
+
+#Runs z3solve, the z3solve method of a Graph or HGraph, with the given keyword arguments in the executor, see above.
+async def z3solve(z3solve, semaphore, **kwargs):
+
+    async with semaphore or z3_semaphore():
+        return await _run(functools.partial(z3solve, **kwargs))
+
+#Runs function in the default executor with a cancel event of its own, which gets set once the awaiting task gets cancelled.
+#The task then still waits for the function to return, so the graph is never left in the middle of a reduction.
+async def _run(function):
+
+    cancel = threading.Event()
+
+    future = asyncio.get_running_loop().run_in_executor(None, functools.partial(function, cancel=cancel))
+
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        cancel.set()
+        await asyncio.wait([future])
+        raise
@@ -0,0 +1,174 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import CoreCache
+from cnf import ENCODINGS, TimedBackend, get_backend
+from cores import Graph
+from coresh import HGraph
+from events import Phases
+from fileio import is_hgraph
+
+#Command line tool to calculate the cores of many graph/hypergraph files at once, spread over a pool of processes:
+#python batch.py graphs hgraphs/*.txt --out cores --records cores.jsonl --backend kissat
+#For each file, one JSON object gets written per line, holding the sizes of the graph and of its core, the amount of solver calls and the time spent in each phase: parse, encode, solver, reduce, solve as a whole and write.
+#The cores get written to the same paths under --out as their input files have relative to the directory all of them share, so files of the same name in different directories don't overwrite each other.
+
+#Backend of the worker process, built once by _init so that it stays warm across all files the worker handles.
+_backend = None
+
+#Cache of the worker process, see cache.CoreCache, None if no cache is used.
+_cache = None
+
+#Set up a worker process. The SMT approach builds its own z3 solvers, thus it doesn't need a backend.
+#All workers share the same cache directory, which is safe to use from several processes at once.
+def _init(backend, smt, cache, cache_size):
+
+    global _backend, _cache
+
+    if not smt:
+        _backend = get_backend(backend)
+
+    if cache != None:
+        _cache = CoreCache(cache, cache_size)
+
+#Calculates the core of a single file in a worker process, writes it to target unless that is None and returns its record.
+def _run(path, target, smt, minimal, fold, encoding):
+
+    record = {"file": path}
+    times = {}
+
+    #Sums up the encode, solver and reduce laps of all rounds, see events
+    phases = Phases()
+
+    #The solve methods report failures on stdout, which gets caught so it doesn't end up between the records.
+    messages = io.StringIO()
+
+    try:
+
+        with contextlib.redirect_stdout(messages):
+
+            start = time.perf_counter()
+            record["type"] = "hgraph" if is_hgraph(path) else "graph"
+            g = HGraph(parse=path) if record["type"] == "hgraph" else Graph(parse=path)
+            times["parse"] = time.perf_counter()-start
+
+            record["vertices"], record["edges"] = g.counts()
+
+            hits = _cache.hits if _cache != None else 0
+
+            start = time.perf_counter()
+            if smt:
+                solved = g.z3solve(minimal=minimal, fold=fold, observer=phases, cache=_cache) not in (None, False)
+                record["rounds"] = None
+            else:
+                backend = TimedBackend(_backend)
+                solved = g.solve(backend=backend, minimal=minimal, fold=fold, processes=1, observer=phases, cache=_cache, encoding=encoding) not in (None, False)
+                record["rounds"] = backend.calls
+            times.update(phases.times)
+            times["solve"] = time.perf_counter()-start
+
+            if _cache != None:
+                record["cached"] = _cache.hits > hits
+
+            if not solved:
+                raise Exception(messages.getvalue().strip())
+
+            record["core_vertices"], record["core_edges"] = g.counts()
+
+            if target != None:
+                start = time.perf_counter()
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                record["core"] = g.serialize(target)
+                times["write"] = time.perf_counter()-start
+
+    except Exception as e:
+        record["error"] = str(e)
+
+    record["time"] = times
+
+    return record
+
+#Turns the inputs into a list of files: directories stand for all .txt files directly inside of them, anything else is used as glob pattern.
+def _files(inputs):
+
+    files = []
+
+    for n in inputs:
+        if os.path.isdir(n):
+            files += sorted(glob.glob(os.path.join(n, "*.txt")))
+        else:
+            files += sorted(glob.glob(n))
+
+    #A file matched by several inputs only gets solved once
+    return list(dict.fromkeys(files))
+
+#Returns the path each of the files gets its core written to: its path relative to the directory all of the files share, joined to out.
+def _targets(files, out):
+
+    common = os.path.commonpath([os.path.dirname(os.path.abspath(n)) for n in files])
+
+    return [os.path.join(out, os.path.relpath(os.path.abspath(n), common)) for n in files]
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Calculate the cores of many graph and hypergraph files in parallel.")
+    parser.add_argument("inputs", nargs="+", help="files, directories (all .txt files directly inside) or glob patterns")
+    parser.add_argument("-o", "--out", help="directory to write the cores to, at the paths of their input files relative to the directory all of them share")
+    parser.add_argument("-r", "--records", default="-", help="file to write the JSON-lines records to, - for stdout (default)")
+    parser.add_argument("-b", "--backend", help="SAT backend: z3, limboole, portfolio or the name/path of a DIMACS solver, see cnf.get_backend")
+    parser.add_argument("--smt", action="store_true", help="use the SMT approach via z3 instead of the SAT encoding")
+    parser.add_argument("--minimal", action="store_true", help="search for a retract of minimum size directly")
+    parser.add_argument("--no-fold", action="store_true", help="don't fold dominated vertices before solving")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="auto", help="encoding of the at-most-one constraints of the SAT encoding, see cnf.CNF.at_most_one (default: auto)")
+    parser.add_argument("-p", "--processes", type=int, help="amount of worker processes, one per CPU by default")
+    parser.add_argument("--cache", help="directory of a cache of cores shared by all workers and runs, see cache.CoreCache")
+    parser.add_argument("--cache-size", type=int, default=1<<30, help="bytes the cache may take up before the least recently used cores get removed (default: 1 GiB)")
+    args = parser.parse_args(argv)
+
+    files = _files(args.inputs)
+
+    if not files:
+        parser.error("No input files found.")
+
+    #Fail early if the backend isn't available instead of in every worker
+    if not args.smt:
+        try:
+            get_backend(args.backend)
+        except Exception as e:
+            parser.error(str(e))
+
+    if args.out != None:
+        os.makedirs(args.out, exist_ok=True)
+
+    records = sys.stdout if args.records == "-" else open(args.records, "w")
+
+    failed = 0
+
+    with ProcessPoolExecutor(args.processes, initializer=_init, initargs=(args.backend, args.smt, args.cache, args.cache_size)) as pool:
+
+        targets = _targets(files, args.out) if args.out != None else [None]*len(files)
+
+        jobs = [pool.submit(_run, n, m, args.smt, args.minimal, not args.no_fold, args.encoding) for n,m in zip(files, targets)]
+
+        for n in jobs:
+            record = n.result()
+            if "error" in record:
+                failed += 1
+            records.write(json.dumps(record)+"\n")
+            records.flush()
+
+    if records != sys.stdout:
+        records.close()
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
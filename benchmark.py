@@ -0,0 +1,184 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from tempfile import TemporaryDirectory
+
+from cnf import ENCODINGS, get_backend
+from cores import Graph
+from coresh import HGraph
+from events import Phases
+
+#Reproducible benchmark of the core calculation:
+#python benchmark.py --backends picosat smt --out results.json
+#python benchmark.py --backends picosat smt --baseline results.json
+#python benchmark.py --backends kissat --encodings pairwise sequential commander ladder   #Compare the encodings of the at-most-one constraints, see cnf.CNF.at_most_one
+#Each case gets generated with a fixed seed or is one of the bundled graphs/hgraphs and gets timed per phase. With --baseline, the results get compared to the saved ones and the exit code is 1 if any case got slower, used more memory or ended up with a different core.
+
+#Sweep of Graph(gen=(|V|, |Λ|, ρ)) parameters. FULL_GRAPH_SWEEP together with 50 seeds follows the parameters of the sweep shown in benchmark.png, the graphs themselves differ.
+GRAPH_SWEEP = [(n, m, l) for n in (16, 24, 32) for m in (1, 2, 3) for l in (0.5, 1.0, 1.5)]
+FULL_GRAPH_SWEEP = [(n, m, l/10) for n in (16, 24, 32, 48, 64, 96) for m in (1, 2, 3) for l in range(5, 16)]
+
+#Sweep of HGraph(gen=(vertex_n, edge_n, avg_edge_args, connectivity)) parameters.
+HGRAPH_SWEEP = [(n, m, 2, l) for n in (8, 16, 24) for m in (2, 3) for l in (0.5, 1.0)]
+FULL_HGRAPH_SWEEP = [(n, m, l, k) for n in (8, 16, 24, 32) for m in (1, 2, 3) for l in (1, 2, 3) for k in (0.5, 1.0, 1.5)]
+
+FIXTURES = os.path.dirname(os.path.realpath(__file__))
+
+#"smt" stands for z3solve, any other backend for solve with that backend, see cnf.get_backend.
+SMT = "smt"
+
+#Parses the file of a case and calculates its core, timing each phase unless phases is None.
+#Returns the amount of vertices and edges of the core.
+def _core(path, hyper, backend, encoding, phases):
+
+    start = time.perf_counter()
+    g = HGraph(parse=path) if hyper else Graph(parse=path)
+    parse = time.perf_counter()-start
+
+    start = time.perf_counter()
+
+    #Cases are timed in this process, thus the components of a graph don't get spread over other processes.
+    if backend == SMT:
+        g.z3solve(observer=phases)
+    elif g.solve(backend=backend, processes=1, observer=phases, encoding=encoding) in (None, False):
+        raise Exception("The core could not be calculated.")
+
+    if phases != None:
+        phases.times["parse"] = parse
+        phases.times["solve"] = time.perf_counter()-start
+
+    return list(g.counts())
+
+#Runs a single case repeat times and keeps the fastest run, followed by one more run to measure the peak memory, since tracing allocations slows everything down.
+#The size of the CNFs is the same for each run and gets recorded along with the times.
+def _run(path, hyper, backend, encoding, repeat):
+
+    best = None
+
+    for n in range(repeat):
+        phases = Phases()
+        core = _core(path, hyper, backend, encoding, phases)
+        if best == None or phases.times["solve"] < best["solve"]:
+            best = dict(phases.times, **phases.formula)
+
+    tracemalloc.start()
+    _core(path, hyper, backend, encoding, None)
+    best["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best["core"] = core
+
+    return best
+
+#Returns the random number generator of the case with the given seed and gen parameters. Each case draws its graph from a generator of its own, so no two cases share a graph and each case gets the same one on every run.
+def _rng(seed, gen):
+
+    return random.Random("{} {}".format(seed, gen))
+
+#Yields the cases as (key, path of the graph file, whether it is a hypergraph).
+#Generated graphs get serialized to a file first, so that parsing them is part of the benchmark as well.
+def _cases(args, tmp):
+
+    if not args.no_fixtures:
+        for n in sorted(glob.glob(os.path.join(FIXTURES, "graphs", "*.txt"))):
+            yield "graphs/"+os.path.basename(n), n, False
+        for n in sorted(glob.glob(os.path.join(FIXTURES, "hgraphs", "*.txt"))):
+            yield "hgraphs/"+os.path.basename(n), n, True
+
+    if not args.no_gen:
+        for n in (FULL_GRAPH_SWEEP if args.full else GRAPH_SWEEP):
+            for m in args.seeds:
+                path = Graph(gen=n+(_rng(m, n),)).serialize(os.path.join(tmp, "graph.txt"))
+                yield "Graph(gen={}) seed={}".format(n, m), path, False
+        for n in (FULL_HGRAPH_SWEEP if args.full else HGRAPH_SWEEP):
+            for m in args.seeds:
+                path = HGraph(gen=n+(_rng(m, n),)).serialize(os.path.join(tmp, "hgraph.txt"))
+                yield "HGraph(gen={}) seed={}".format(n, m), path, True
+
+#Compares results to a baseline of the same form and returns a description of each regression.
+#Times only count as a regression if they grew by more than the threshold relative to the baseline and by more than min_time seconds, to not trip over noise on tiny cases.
+def compare(results, baseline, threshold, min_time):
+
+    regressions = []
+
+    for n in results:
+
+        if not n in baseline:
+            continue
+
+        new, old = results[n], baseline[n]
+
+        if new["core"] != old["core"]:
+            regressions.append("{}: core changed from {} to {}".format(n, old["core"], new["core"]))
+
+        for m in ("parse", "encode", "solver", "reduce", "solve"):
+            if m in new and m in old and new[m] > old[m]*(1+threshold) and new[m]-old[m] > min_time:
+                regressions.append("{}: {} took {:.3f}s instead of {:.3f}s".format(n, m, new[m], old[m]))
+
+        if new["peak_memory"] > old["peak_memory"]*(1+threshold) and new["peak_memory"]-old["peak_memory"] > 1<<16:
+            regressions.append("{}: peak memory grew from {} to {} bytes".format(n, old["peak_memory"], new["peak_memory"]))
+
+    return regressions
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark the core calculation on generated graphs and the bundled fixtures.")
+    parser.add_argument("-b", "--backends", nargs="+", default=[None], help="SAT backends to benchmark solve with, see cnf.get_backend, or smt for z3solve (default: the first one available)")
+    parser.add_argument("-e", "--encodings", nargs="+", choices=ENCODINGS, default=["auto"], help="encodings of the at-most-one constraints to benchmark solve with, see cnf.CNF.at_most_one (default: auto)")
+    parser.add_argument("-s", "--seeds", nargs="+", type=int, default=[0, 1, 2], help="seeds for the generated graphs (default: 0 1 2)")
+    parser.add_argument("--full", action="store_true", help="use the full sweep, which follows the parameters of benchmark.png, best combined with 50 seeds")
+    parser.add_argument("--no-fixtures", action="store_true", help="skip the bundled graphs and hgraphs")
+    parser.add_argument("--no-gen", action="store_true", help="skip the generated graphs")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the fastest one counts (default: 1)")
+    parser.add_argument("-o", "--out", help="file to save the results to as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare to")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative growth of a time or the peak memory that counts as regression (default: 0.25)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="growth of a time in seconds below which it never counts as regression (default: 0.05)")
+    args = parser.parse_args(argv)
+
+    results = {}
+
+    with TemporaryDirectory() as tmp:
+        for n in args.backends:
+
+            name = n if n != None else "default"
+            backend = n if n == SMT else get_backend(n)
+
+            #z3solve doesn't use the SAT encoding, thus it only gets run once
+            for e in (args.encodings if n != SMT else ["auto"]):
+                for m,l,k in _cases(args, tmp):
+                    #Keys of the default encoding stay the same as without --encodings, so earlier baselines still apply
+                    key = "{} backend={}".format(m, name)+(" encoding="+e if e != "auto" else "")
+                    results[key] = _run(l, k, backend, e, args.repeat)
+                    print("{}: core {} in {:.3f}s, {} clauses".format(key, results[key]["core"], results[key]["solve"], results[key]["clauses"]), file=sys.stderr)
+
+    if args.out != None:
+        with open(args.out, "w") as file:
+            json.dump({"python": platform.python_version(), "platform": platform.platform(), "results": results}, file, indent=1)
+
+    if args.baseline != None:
+
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["results"]
+
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+
+        for n in regressions:
+            print("Regression: "+n)
+
+        if regressions:
+            return 1
+
+        print("No regressions compared to {}.".format(args.baseline))
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
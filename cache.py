@@ -0,0 +1,418 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from collections import deque
+
+#Content-addressed on-disk cache of computed cores, shared by Graph and HGraph, see CoreCache.
+#A graph gets handed over as its amount of vertices n, named 0 to n-1, and its edges in the form of (label, args) with args the tuple of vertices it connects, e.g. (mask, (source, target)) for a Graph.
+
+#Version of the entries, entries of any other version count as missing.
+VERSION = 2
+
+#Leaves of the search tree of Canonical after which it settles for the smallest numbering found so far, see there.
+MAX_LEAVES = 16
+
+#Numberings of the same graph a cache entry holds at most, see CoreCache.
+MAX_VARIANTS = 4
+
+#Canonical form of a graph, i.e. a numbering of its vertices and its edges under that numbering that don't depend on the names of the vertices or the order of the edges.
+#The vertices get split into ordered cells by partition refinement, see _Partition, which only ever depends on the structure of the graph. Thus key, the hash of the cells and of the edges between them, is the same for all ways of naming the vertices.
+#The numbering is then found by individualizing a vertex of the first cell holding several vertices and refining again, until each vertex has a cell of its own. Each choice of vertices leads to a numbering, a leaf of a search tree,
+#and the numbering under which the sorted edges are smallest is the same for all ways of naming the vertices. Only one vertex of each set of twins and of each orbit of the automorphisms found so far gets tried, see _search.
+#Graphs whose search tree has more than MAX_LEAVES leaves left after that get the smallest numbering among the first MAX_LEAVES leaves, exhaustive is False then. Such a numbering may differ between namings of the same graph,
+#which only costs a cache miss, as a cached entry only counts as hit if its edges are exactly the same as those of the graph under its numbering.
+class Canonical:
+
+    def __init__(self, kind, n, edges):
+
+        self.kind = kind
+        self.n = n
+
+        #Labels are kept as JSON, which they get stored as anyway and which makes labels of any kind comparable
+        edges = list(dict.fromkeys((json.dumps(label), tuple(args)) for label,args in edges))
+
+        partition = _Partition(n, edges)
+        partition.refine([0] if n else [])
+
+        cells = partition.cells()
+        digest = hashlib.sha256(json.dumps([VERSION, kind, n, [partition.end[m]-m for m in cells], sorted([label, [partition.start[m] for m in args]] for label,args in edges)]).encode())
+        self.key = digest.hexdigest()
+
+        #index maps each vertex to its canonical number, order each canonical number to its vertex.
+        self.exhaustive, self.index, self.order = _search(partition, _twins(n, edges))
+
+        self.edges = [[json.loads(label), list(args)] for label,args in sorted((label, tuple(self.index[m] for m in args)) for label,args in edges)]
+
+#Returns the class of twins of each vertex as list. Two vertices are twins if they share no edge and have the same edges otherwise, so swapping them maps the graph onto itself.
+def _twins(n, edges):
+
+    incident = [[] for m in range(n)]
+    for label,args in edges:
+        for m in set(args):
+            incident[m].append((label, args))
+
+    classes = {}
+
+    return [classes.setdefault(tuple(sorted((label, tuple(-1 if l == m else l for l in args)) for label,args in incident[m])), len(classes)) for m in range(n)]
+
+#Searches the numberings that individualizing vertices of the refined partition leads to for the one under which the sorted edges are smallest, see Canonical.
+#Returns whether all leaves that matter got searched and the numbering as index and order, see Canonical. Numberings get compared by their edges encoded as sorted numbers, which is faster than comparing the edges themselves.
+#Whenever two numberings give the same edges, mapping one onto the other is an automorphism. A vertex gets skipped if a vertex tried before at the same point lies in the same orbit of the automorphisms that fix all vertices individualized up to there,
+#as both lead to the same edges, just like twins do. Branching points get saved along the way, up to MAX_LEAVES of them, and the search continues at the latest one with a vertex left to try.
+def _search(partition, twins):
+
+    n = len(partition.perm)
+    labels = {m: c for c,m in enumerate(sorted({(label, len(args)) for label,args in partition.edges}))}
+    codes = [(labels[(label, len(args))], args) for label,args in partition.edges]
+
+    best = None
+    automorphisms = []
+    leaves = 0
+    exhaustive = True
+
+    stack = []
+    individualized = []
+    m = 0
+
+    while True:
+
+        while m < len(partition.perm) and partition.end[m]-m == 1:
+            m += 1
+
+        if m < len(partition.perm):
+
+            cell = partition.perm[m:partition.end[m]]
+
+            #Twins are interchangeable, so a cell of twins only needs to be split up in any order
+            if all(twins[l] == twins[cell[0]] for l in cell):
+                individualized.extend(cell[1:])
+                partition.refine([partition.individualize(m, l) for l in reversed(cell[1:])])
+                continue
+
+            l = cell[-1]
+
+            if len(stack) < MAX_LEAVES:
+                stack.append((partition.save(), list(individualized), m, [l]))
+            elif exhaustive:
+                exhaustive = _next(partition, m, [l], individualized, twins, automorphisms) == None
+
+            individualized.append(l)
+            partition.refine([partition.individualize(m, l)])
+            continue
+
+        certificate = []
+        for c,args in codes:
+            for l in args:
+                c = c*n+partition.where[l]
+            certificate.append(c)
+        certificate.sort()
+
+        leaves += 1
+
+        if best == None or certificate < best[0]:
+            best = (certificate, list(partition.where), list(partition.perm))
+        elif certificate == best[0]:
+            automorphism = [0]*n
+            for c,l in enumerate(partition.perm):
+                automorphism[l] = best[2][c]
+            automorphisms.append(({l for l,c in enumerate(automorphism) if l != c}, automorphism))
+
+        l = None
+
+        while stack and l == None:
+            state, individualized, m, tried = stack[-1]
+            partition.restore(state)
+            l = _next(partition, m, tried, individualized, twins, automorphisms)
+            if l == None:
+                stack.pop()
+
+        if l == None:
+            return exhaustive, best[1], best[2]
+
+        if leaves >= MAX_LEAVES:
+            return False, best[1], best[2]
+
+        tried.append(l)
+        individualized = individualized+[l]
+        partition.refine([partition.individualize(m, l)])
+
+#Returns the next vertex of the cell starting at m to individualize after the ones tried already, or None if all others are twins of or in the same orbit as one of them, see _search.
+def _next(partition, m, tried, individualized, twins, automorphisms):
+
+    cell = partition.perm[m:partition.end[m]]
+
+    orbit = {l: l for l in cell}
+
+    def find(l):
+        while orbit[l] != l:
+            orbit[l] = orbit[orbit[l]]
+            l = orbit[l]
+        return l
+
+    first = {}
+    for l in cell:
+        orbit[find(l)] = find(first.setdefault(twins[l], l))
+
+    individualized = set(individualized)
+
+    for moved,automorphism in automorphisms:
+        if moved.isdisjoint(individualized):
+            for l in cell:
+                orbit[find(l)] = find(automorphism[l])
+
+    roots = {find(l) for l in tried}
+
+    for l in reversed(cell):
+        if not find(l) in roots:
+            return l
+
+    return None
+
+#Ordered partition of the vertices into cells, which are ranges of perm. Each vertex knows its position in perm and the start of its cell, each start of a cell where the cell ends.
+#Refining the partition by a cell W splits each cell by the labels and positions of the edges its vertices share with vertices of W, including the edges of W itself, until no cell can be split any further (an equitable partition).
+#Only cells next to a cell that got split get touched again, and a cell that got split only has to be refined by all but its largest part, which takes O((V+E)*log(V)) overall instead of O(V+E) per step.
+class _Partition:
+
+    def __init__(self, n, edges):
+
+        self.edges = edges
+
+        self.incident = [[] for m in range(n)]
+        for i,(label,args) in enumerate(edges):
+            for p,m in enumerate(args):
+                self.incident[m].append((i, p))
+
+        self.perm = list(range(n))
+        self.where = list(range(n))
+        self.start = [0]*n
+        self.end = [n]*n
+
+    #Returns the starts of all cells in order.
+    def cells(self):
+
+        cells = []
+        m = 0
+
+        while m < len(self.perm):
+            cells.append(m)
+            m = self.end[m]
+
+        return cells
+
+    #Splits the vertex m, the last vertex of the cell starting at s by default, off into a cell of its own, which gets returned.
+    def individualize(self, s, m=None):
+
+        e = self.end[s]
+
+        if m != None:
+            l = self.perm[e-1]
+            self.where[m], self.where[l] = e-1, self.where[m]
+            self.perm[self.where[l]] = l
+            self.perm[e-1] = m
+
+        self.end[s] = e-1
+        self.start[self.perm[e-1]] = e-1
+        self.end[e-1] = e
+
+        return e-1
+
+    #Returns a copy of the state of the partition, which restore brings back any number of times.
+    def save(self):
+
+        return (list(self.perm), list(self.where), list(self.start), list(self.end))
+
+    def restore(self, state):
+
+        self.perm, self.where, self.start, self.end = (list(n) for n in state)
+
+    #Refines the partition by the cells starting at the given positions and by all cells that get split along the way.
+    def refine(self, queue):
+
+        queue = deque(queue)
+        queued = set(queue)
+
+        while queue:
+
+            s = queue.popleft()
+            queued.discard(s)
+
+            signatures = {}
+
+            for m in self.perm[s:self.end[s]]:
+                for i,q in self.incident[m]:
+                    label, args = self.edges[i]
+                    for p,l in enumerate(args):
+                        signatures.setdefault(l, []).append((label, p, q))
+
+            touched = {}
+            for m,l in signatures.items():
+                touched.setdefault(self.start[m], []).append((tuple(sorted(l)), m))
+
+            for c in sorted(touched):
+
+                parts = self._split(c, touched[c])
+
+                if len(parts) == 1:
+                    continue
+
+                if c in queued:
+                    parts.remove(c)
+                else:
+                    parts.remove(max(parts, key=lambda n: self.end[n]-n))
+
+                queue.extend(parts)
+                queued.update(parts)
+
+    #Splits the cell starting at s: its vertices that are not part of touched stay in front, the ones that are follow, grouped and ordered by their signatures.
+    #Returns the starts of the resulting cells.
+    def _split(self, s, touched):
+
+        e = self.end[s]
+        tail = e-len(touched)
+
+        touched.sort(key=lambda n: n[0])
+
+        if tail == s and touched[0][0] == touched[-1][0]:
+            return [s]
+
+        #Swap the touched vertices in front of the tail with the untouched ones in the tail
+        inside = {m for l,m in touched}
+        front = [m for l,m in touched if self.where[m] < tail]
+        back = [m for m in self.perm[tail:e] if not m in inside]
+
+        for m,l in zip(front, back):
+            self.where[m], self.where[l] = self.where[l], self.where[m]
+            self.perm[self.where[m]] = m
+            self.perm[self.where[l]] = l
+
+        for i,(l,m) in enumerate(touched):
+            self.perm[tail+i] = m
+            self.where[m] = tail+i
+
+        parts = [s] if tail > s else []
+        self.end[s] = tail
+
+        for i,(l,m) in enumerate(touched):
+            if i == 0 or l != touched[i-1][0]:
+                parts.append(tail+i)
+            self.start[m] = parts[-1]
+            self.end[parts[-1]] = tail+i+1
+
+        return parts
+
+#Persistent cache of cores in a directory, which several processes may use at the same time.
+#Each entry is a JSON file named after the key of the canonical form of a graph, holding its canonical edges and the retraction of its vertices onto its core in canonical numbering.
+#As the numbering of a graph with many symmetries may depend on the names of its vertices, see Canonical, an entry holds up to MAX_VARIANTS numberings of the same graph, the most recently stored first.
+#Entries get written to a temporary file first and then moved in place via os.replace, so readers only ever see complete entries. Reading an entry touches its modification time,
+#and whenever an entry gets written, the least recently used entries get removed until all of them take up at most max_bytes. Concurrent removals of the same entry are ignored.
+#The cache is only ever an optimization: any entry that can't be read or written counts as a miss.
+class CoreCache:
+
+    def __init__(self, directory, max_bytes=1<<30):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, form):
+
+        return os.path.join(self.directory, form.key+".json")
+
+    #Returns the numberings of the entry of the canonical form as list of dicts with the keys edges and retraction, empty if there is none.
+    def _variants(self, form):
+
+        try:
+            with open(self._path(form), "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return []
+
+        if not isinstance(entry, dict) or entry.get("version") != VERSION or entry.get("kind") != form.kind or entry.get("vertices") != form.n:
+            return []
+
+        return entry.get("variants", [])
+
+    #Returns the retraction of the vertices of the graph of the canonical form onto its core as list, i.e. the vertex each vertex gets mapped onto, or None if it isn't cached.
+    def get(self, form):
+
+        variant = next((n for n in self._variants(form) if n.get("edges") == form.edges), None)
+
+        if variant == None:
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(self._path(form))
+        except OSError:
+            pass
+
+        self.hits += 1
+
+        return [form.order[variant["retraction"][c]] for c in form.index]
+
+    #Stores the retraction of the vertices of the graph of the canonical form onto its core, given as list like get returns it.
+    def put(self, form, retraction):
+
+        variants = [{"edges": form.edges, "retraction": [form.index[retraction[m]] for m in form.order]}]
+        variants.extend(n for n in self._variants(form) if n.get("edges") != form.edges)
+
+        entry = {"version": VERSION, "kind": form.kind, "vertices": form.n, "variants": variants[:MAX_VARIANTS]}
+
+        try:
+            file, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(file, "w") as file:
+                    json.dump(entry, file)
+                os.replace(tmp, self._path(form))
+            except OSError:
+                os.remove(tmp)
+                raise
+        except OSError:
+            return
+
+        self._evict()
+
+    #Removes the least recently used entries until all of them take up at most max_bytes, along with temporary files left behind by crashed processes for more than an hour.
+    def _evict(self):
+
+        entries = []
+        total = 0
+
+        with os.scandir(self.directory) as files:
+            for n in files:
+                try:
+                    stat = n.stat()
+                    if n.name.endswith(".json"):
+                        entries.append((stat.st_mtime, stat.st_size, n.path))
+                        total += stat.st_size
+                    elif n.name.endswith(".tmp") and stat.st_mtime < time.time()-3600:
+                        os.remove(n.path)
+                except OSError:
+                    continue
+
+        for mtime,size,path in sorted(entries):
+
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            total -= size
+
+#Turns the cache parameter of solve and z3solve into a CoreCache: a CoreCache is used as is, a path is the directory of a CoreCache of its own.
+def get_cache(cache):
+
+    if cache == None or isinstance(cache, CoreCache):
+        return cache
+
+    return CoreCache(cache)
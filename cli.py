@@ -0,0 +1,90 @@
+import argparse
+import sys
+import time
+
+from cnf import ENCODINGS
+
+#Command line entry points of cores.py and coresh.py for short jobs on a single graph/hypergraph file:
+#python -m cores parse graph.txt                                  #Check that a file parses and print its size
+#python -m cores solve graph.txt --out core.txt --backend kissat  #Calculate its core and optionally serialize it
+#python -m cores serialize graph.txt graph.bin --binary           #Convert between the text and the binary format
+#python -m coresh takes the same commands for hypergraphs.
+#Only what a command actually uses gets imported, e.g. z3 only for --smt or --backend z3, so these start fast.
+
+def main(kind, argv=None):
+
+    if kind == "hgraph":
+        from coresh import HGraph as cls
+    else:
+        from cores import Graph as cls
+
+    parser = argparse.ArgumentParser(prog="python -m "+("coresh" if kind == "hgraph" else "cores"), description="Parse, solve or serialize a single {} file.".format("hypergraph" if kind == "hgraph" else "graph"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parse = commands.add_parser("parse", help="parse a file and print its size")
+    parse.add_argument("input", help="file to parse, text, gzip compressed text or binary")
+
+    solve = commands.add_parser("solve", help="calculate the core of a file")
+    solve.add_argument("input", help="file to parse, text, gzip compressed text or binary")
+    solve.add_argument("-o", "--out", help="file to serialize the core to")
+    solve.add_argument("--binary", action="store_true", help="serialize the core in the binary format")
+    solve.add_argument("-b", "--backend", help="SAT backend: z3, limboole, portfolio or the name/path of a DIMACS solver, see cnf.get_backend")
+    solve.add_argument("--smt", action="store_true", help="use the SMT approach via z3 instead of the SAT encoding")
+    solve.add_argument("--minimal", action="store_true", help="search for a retract of minimum size directly")
+    solve.add_argument("--no-fold", action="store_true", help="don't fold dominated vertices before solving")
+    solve.add_argument("--encoding", choices=ENCODINGS, default="auto", help="encoding of the at-most-one constraints of the SAT encoding, see cnf.CNF.at_most_one (default: auto)")
+    solve.add_argument("-p", "--processes", type=int, help="amount of processes to solve components in parallel with")
+    solve.add_argument("-t", "--timeout", type=float, help="seconds after which the retract found so far gets returned")
+    solve.add_argument("--cache", help="directory of a cache of cores, see cache.CoreCache")
+    if kind == "hgraph":
+        solve.add_argument("--no-am", action="store_true", help="don't attach the names of removed vertices to the vertices they get mapped to, see HGraph.solve")
+
+    serialize = commands.add_parser("serialize", help="convert a file between the text and the binary format")
+    serialize.add_argument("input", help="file to parse, text, gzip compressed text or binary")
+    serialize.add_argument("output", help="file to serialize to")
+    serialize.add_argument("--binary", action="store_true", help="serialize in the binary format")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "solve" and args.smt and kind == "hgraph" and args.no_am:
+        parser.error("--no-am only applies to the SAT encoding, z3solve always attaches the names of removed vertices.")
+
+    start = time.perf_counter()
+
+    try:
+        g = cls(parse=args.input)
+    except Exception as e:
+        print("{}: {}".format(args.input, e), file=sys.stderr)
+        return 1
+
+    vertices, edges = g.counts()
+    print("{}: {} vertices, {} edges, parsed in {:.3f}s".format(args.input, vertices, edges, time.perf_counter()-start))
+
+    if args.command == "serialize":
+        g.serialize(args.output, binary=args.binary)
+        return 0
+
+    if args.command != "solve":
+        return 0
+
+    options = {"minimal": args.minimal, "fold": not args.no_fold, "timeout": args.timeout, "cache": args.cache}
+
+    start = time.perf_counter()
+    if args.smt:
+        solved = g.z3solve(**options)
+    elif kind == "hgraph":
+        solved = g.solve(am=not args.no_am, backend=args.backend, processes=args.processes, encoding=args.encoding, **options)
+    else:
+        solved = g.solve(backend=args.backend, processes=args.processes, encoding=args.encoding, **options)
+
+    #The solve methods report their failures themselves, returning None (Graph) or False (HGraph)
+    if solved in (None, False):
+        return 1
+
+    vertices, edges = g.counts()
+    print("core: {} vertices, {} edges, {} in {:.3f}s".format(vertices, edges, "proven" if g.proven else "not proven", time.perf_counter()-start))
+
+    if args.out != None:
+        g.serialize(args.out, binary=args.binary)
+
+    return 0
@@ -0,0 +1,686 @@
+import copy
+import functools
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+
+from tempfile import TemporaryFile
+
+#DIMACS solvers that get looked for on the PATH if no backend is specified. All of them read DIMACS from stdin and answer in the format of the SAT competition.
+DIMACS_SOLVERS = ["kissat", "cadical", "cryptominisat5", "lingeling", "picosat"]
+
+#Encodings of the at-most-one and exactly-one constraints of a CNF, see CNF.at_most_one.
+ENCODINGS = ["auto", "pairwise", "sequential", "commander", "ladder"]
+
+#Up to this many literals, the encoding "auto" uses pairwise clauses, which take no auxiliary variables and are about as many clauses as any other encoding this size. Longer ones use a sequential counter.
+PAIRWISE_LIMIT = 6
+
+#Size of the groups of the commander encoding, each of which gets one commander variable.
+COMMANDER_GROUP = 3
+
+#Objects of class CNF represent a propositional formula in conjunctive normal form.
+#Variables are positive integers, literals are variables or their negation and clauses are lists of literals, just like in the DIMACS format.
+#Parameter encoding selects the encoding of at_most_one and exactly_one, one of ENCODINGS.
+class CNF:
+
+    def __init__(self, encoding="auto"):
+
+        if not encoding in ENCODINGS:
+            raise Exception("Unknown encoding {}, it has to be one of {}.".format(encoding, ", ".join(ENCODINGS)))
+
+        self.encoding = encoding
+        self.n_vars = 0
+        self.clauses = []
+        #Variables allocated for a key, e.g. the vertex pair (n, m) for the variable "n gets mapped to m"
+        self.variables = {}
+
+    #Returns the variable of a key, allocating a new one if the key hasn't been seen so far.
+    def var(self, key):
+
+        if not key in self.variables:
+            self.variables[key] = self.new()
+
+        return self.variables[key]
+
+    #Returns a new auxiliary variable without a key.
+    def new(self):
+
+        self.n_vars += 1
+
+        return self.n_vars
+
+    def add(self, clause):
+
+        self.clauses.append(clause)
+
+    #Impose that at most one of the literals is true, encoded as selected by encoding:
+    #pairwise: a clause for each pair of literals, O(k²) clauses for k literals but no auxiliary variables
+    #sequential: a sequential counter, k-1 auxiliary variables and 3k-4 clauses, see _sequential
+    #commander: groups with a commander variable each, about k/2 auxiliary variables and 3.5k clauses, see _commander
+    #ladder: a ladder of k-1 auxiliary variables and 3k-4 clauses, see _ladder
+    #auto: pairwise for up to PAIRWISE_LIMIT literals, sequential for more
+    def at_most_one(self, literals):
+
+        literals = list(literals)
+
+        if len(literals) < 2:
+            return
+
+        encoding = self.encoding
+        if encoding == "auto":
+            encoding = "pairwise" if len(literals) <= PAIRWISE_LIMIT else "sequential"
+
+        if encoding == "pairwise":
+            self._pairwise(literals)
+        elif encoding == "sequential":
+            self._sequential(literals)
+        elif encoding == "commander":
+            self._commander(literals)
+        else:
+            self._ladder(literals, False)
+
+    #Impose that exactly one of the literals is true, i.e. at least one and at_most_one.
+    #The ladder encoding gets the "at least one" for free from its channelling clauses, thus it needs no clause over all literals.
+    def exactly_one(self, literals):
+
+        literals = list(literals)
+
+        if self.encoding == "ladder" and len(literals) > 1:
+            self._ladder(literals, True)
+            return
+
+        self.add(literals)
+        self.at_most_one(literals)
+
+    def _pairwise(self, literals):
+
+        for i,n in enumerate(literals):
+            for m in literals[i+1:]:
+                self.add([-n, -m])
+
+    #Auxiliary variable s[i] is implied whenever any of the first i+1 literals is true, and no literal may be true once one of the literals before it is.
+    def _sequential(self, literals):
+
+        s = [self.new() for n in literals[:-1]]
+
+        for i,n in enumerate(literals):
+            if i < len(s):
+                self.add([-n, s[i]])
+            if i > 0:
+                self.add([-n, -s[i-1]])
+                if i < len(s):
+                    self.add([-s[i-1], s[i]])
+
+    #The literals get split into groups of COMMANDER_GROUP, each of which gets encoded pairwise and gets a commander variable that is true iff any literal of the group is.
+    #At most one of the commanders may be true, which gets encoded the same way on the next level until only COMMANDER_GROUP of them are left.
+    def _commander(self, literals):
+
+        while len(literals) > COMMANDER_GROUP:
+
+            commanders = []
+
+            for i in range(0, len(literals), COMMANDER_GROUP):
+
+                group = literals[i:i+COMMANDER_GROUP]
+
+                if len(group) == 1:
+                    commanders.append(group[0])
+                    continue
+
+                c = self.new()
+                self._pairwise(group)
+                for n in group:
+                    self.add([-n, c])
+                self.add([-c]+group)
+                commanders.append(c)
+
+            literals = commanders
+
+        self._pairwise(literals)
+
+    #Auxiliary variables y[0] to y[k-2] form a ladder, i.e. y[i+1] implies y[i], and y[i] is true iff the true literal comes after literal i.
+    #Literal i implies that the ladder switches from true to false right at it, which two true literals can't both satisfy.
+    #If exact is set, literal i also gets implied by the ladder switching right at it, which makes one of the literals true.
+    def _ladder(self, literals, exact):
+
+        y = [self.new() for n in literals[:-1]]
+
+        for i in range(len(y)-1):
+            self.add([-y[i+1], y[i]])
+
+        for i,n in enumerate(literals):
+            if i > 0:
+                self.add([-n, y[i-1]])
+            if i < len(y):
+                self.add([-n, -y[i]])
+            if exact:
+                self.add(([-y[i-1]] if i > 0 else [])+([y[i]] if i < len(y) else [])+[n])
+
+    #Count the true literals via a sequential counter and return its outputs: output j is implied whenever more than j of the literals are true.
+    #Thus the negation of output bound imposes that at most bound of the literals are true. Passed as assumption, it switches that bound on for a single solver call, see Graph._solve_minimal.
+    #Since the counter gets built only once for all bounds, a search over bounds only changes the assumptions, so the CNF stays the same and backends that solve incrementally keep everything learned.
+    #Counter variable (i, j) is implied whenever more than j of the first i literals are true. As no more than i of them can be, this takes O(len(literals)**2) variables and clauses.
+    def counter(self, literals):
+        row = []
+        for i,n in enumerate(literals):
+            new = [self.new() for j in range(i+1)]
+            self.add([-n, new[0]])
+            for j in range(len(row)):
+                self.add([-row[j], new[j]])
+                self.add([-n, -row[j], new[j+1]])
+            row = new
+        return row
+
+    #Write the CNF in DIMACS format to a file. Assumptions get added as unit clauses.
+    def write(self, file, assumptions=()):
+
+        file.writelines(self.lines(assumptions))
+
+    #Yields the lines of the CNF in DIMACS format, see write.
+    def lines(self, assumptions=()):
+
+        yield "p cnf {} {}\n".format(self.n_vars, len(self.clauses)+len(assumptions))
+
+        for n in self.clauses:
+            yield " ".join([str(m) for m in n])+" 0\n"
+
+        for n in assumptions:
+            yield str(n)+" 0\n"
+
+#Raised by a solver call that got cut short because its Budget ran out or got cancelled.
+#The solve methods catch it and keep the smallest retract found so far, see Budget.
+class Interrupted(Exception):
+    pass
+
+#Time budget of a calculation: a wall-clock timeout in seconds for all of it, a timeout in seconds for each single solver call and a threading.Event that cancels it once set from another thread.
+#Each of them may be None. Solver calls get killed or interrupted as soon as any of them runs out.
+class Budget:
+
+    def __init__(self, timeout=None, round_timeout=None, cancel=None):
+
+        self.deadline = time.monotonic()+timeout if timeout != None else None
+        self.round_timeout = round_timeout
+        self.cancel = cancel
+
+    #The cancel event can't be sent to another process, there the calculation gets cancelled by terminating the process instead.
+    def __getstate__(self):
+
+        return dict(self.__dict__, cancel=None)
+
+    def cancelled(self):
+
+        return self.cancel != None and self.cancel.is_set()
+
+    #Raises Interrupted if the calculation got cancelled or the wall-clock timeout ran out.
+    def check(self):
+
+        if self.cancelled():
+            raise Interrupted("The calculation got cancelled.")
+        if self.deadline != None and time.monotonic() >= self.deadline:
+            raise Interrupted("The time limit ran out.")
+
+    #Returns the seconds the next solver call may take, None if there is no limit.
+    def remaining(self):
+
+        limits = [n for n in (self.round_timeout, self.deadline-time.monotonic() if self.deadline != None else None) if n != None]
+
+        return max(0, min(limits)) if limits else None
+
+    #Runs a solver binary with stdin as its input and returns its output and returncode.
+    #The process gets killed once the budget runs out. If the calculation can be cancelled, the process gets polled every 50ms.
+    def run(self, args, stdin):
+
+        import subprocess
+
+        self.check()
+
+        process = subprocess.Popen(args, stdin=stdin, stdout=subprocess.PIPE)
+
+        limit = self.remaining()
+        end = time.monotonic()+limit if limit != None else None
+
+        while True:
+
+            wait = 0.05 if self.cancel != None else None
+            if end != None:
+                wait = max(0, end-time.monotonic()) if wait == None else min(wait, max(0, end-time.monotonic()))
+
+            try:
+                output = process.communicate(timeout=wait)[0]
+                return output.decode(), process.returncode
+            except subprocess.TimeoutExpired:
+                if self.cancelled() or end != None and time.monotonic() >= end:
+                    process.kill()
+                    process.communicate()
+                    self.check()
+                    raise Interrupted("A solver call ran out of time.")
+
+    #Runs a solver binary as asyncio subprocess just like run, with lines streamed to its stdin while its output gets read, instead of a file.
+    #The process gets killed once the budget runs out or the task awaiting this gets cancelled.
+    async def run_async(self, args, lines):
+
+        import asyncio
+        import subprocess
+
+        self.check()
+
+        process = await asyncio.create_subprocess_exec(*args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+        limit = self.remaining()
+        end = time.monotonic()+limit if limit != None else None
+
+        #Lines get written in chunks of about 64KiB, waiting for the solver to read each one
+        async def feed():
+            try:
+                chunk = []
+                size = 0
+                for n in lines:
+                    chunk.append(n)
+                    size += len(n)
+                    if size >= 1<<16:
+                        process.stdin.write("".join(chunk).encode())
+                        await process.stdin.drain()
+                        chunk = []
+                        size = 0
+                process.stdin.write("".join(chunk).encode())
+                await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                #The solver quit early, its returncode tells why
+                pass
+
+        communicate = asyncio.ensure_future(asyncio.gather(feed(), process.stdout.read()))
+
+        try:
+            while True:
+
+                wait = 0.05 if self.cancel != None else None
+                if end != None:
+                    wait = max(0, end-time.monotonic()) if wait == None else min(wait, max(0, end-time.monotonic()))
+
+                done, pending = await asyncio.wait([communicate], timeout=wait)
+
+                if done:
+                    output = communicate.result()[1]
+                    await process.wait()
+                    return output.decode(), process.returncode
+                elif self.cancelled() or end != None and time.monotonic() >= end:
+                    self.check()
+                    raise Interrupted("A solver call ran out of time.")
+        finally:
+            if process.returncode == None:
+                process.kill()
+                await process.wait()
+            communicate.cancel()
+
+    #Calls check of a z3 solver with the given assumptions within the budget, returns its result unless it is unknown because the budget ran out.
+    #While the check runs, a thread watches the cancel event and interrupts the z3 context once it is set.
+    def check_z3(self, solver, cntxt, *assumptions):
+
+        import z3
+
+        self.check()
+
+        #z3 keeps the timeout for later checks of the same solver, thus an unlimited one gets set explicitly.
+        limit = self.remaining()
+        solver.set("timeout", max(1, int(limit*1000)) if limit != None else 4294967295)
+
+        done = threading.Event()
+
+        if self.cancel != None:
+            threading.Thread(target=self._watch, args=(cntxt, done), daemon=True).start()
+
+        try:
+            result = solver.check(*assumptions)
+        finally:
+            done.set()
+
+        if result == z3.unknown and (limit != None or self.cancel != None) and solver.reason_unknown() in ("timeout", "canceled"):
+            self.check()
+            raise Interrupted("A solver call ran out of time.")
+
+        return result
+
+    def _watch(self, cntxt, done):
+
+        while not done.wait(0.05):
+            if self.cancelled():
+                cntxt.interrupt()
+                return
+
+#Backends take a CNF, a list of assumed literals and a Budget and either return the set of variables that are true in a satisfying assignment or None if there is none.
+#If a backend fails, it raises an Exception, if it runs out of budget, it raises Interrupted.
+#Backends that run a solver binary also have solve_async, a coroutine with the same parameters and results that runs the binary via asyncio instead, see aio.
+
+#Solves CNFs in-process with the SAT engine of z3.
+#As long as it is handed the same CNF object, the backend only adds the clauses that are new since the last call to the very same solver, which keeps everything learned so far.
+class Z3Backend:
+
+    def __init__(self):
+
+        #z3py is only required if this backend actually gets used.
+        import z3
+
+        self.z3 = z3
+        self.cnf = None
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        z3 = self.z3
+
+        if not cnf is self.cnf:
+            self.cnf = cnf
+            self.loaded = 0
+            self.cntxt = z3.Context()
+            self.solver = z3.SolverFor("QF_FD", ctx=self.cntxt)
+            self.vars = [None]
+            self.negs = [None]
+
+        #The clauses get built via the C API of z3, since going through z3.Or and z3.Not for each of them takes much longer than solving, e.g. for the counter of cnf.CNF.counter
+        ref = self.cntxt.ref()
+        sort = z3.BoolSort(self.cntxt).ast
+
+        while len(self.vars) <= cnf.n_vars:
+            var = z3.BoolRef(z3.Z3_mk_const(ref, z3.Z3_mk_string_symbol(ref, str(len(self.vars))), sort), self.cntxt)
+            self.vars.append(var)
+            self.negs.append(z3.BoolRef(z3.Z3_mk_not(ref, var.as_ast()), self.cntxt))
+
+        literal = lambda n: self.vars[n] if n > 0 else self.negs[-n]
+
+        for n in cnf.clauses[self.loaded:]:
+            args = (z3.Ast*len(n))(*[literal(m).as_ast() for m in n])
+            z3.Z3_solver_assert(ref, self.solver.solver, z3.Z3_mk_or(ref, len(n), args))
+        self.loaded = len(cnf.clauses)
+
+        result = (budget or Budget()).check_z3(self.solver, self.cntxt, *[literal(n) for n in assumptions])
+
+        if result == z3.sat:
+            model = self.solver.model()
+            return {int(n.name()) for n in model.decls() if z3.is_true(model[n])}
+        elif result == z3.unsat:
+            return None
+        else:
+            raise Exception("z3 could not decide the formula: "+self.solver.reason_unknown())
+
+#Solves CNFs with any DIMACS solver binary that reads the formula from stdin and answers in the format of the SAT competition, i.e. "s SATISFIABLE" followed by "v" lines.
+class DimacsBackend:
+
+    def __init__(self, executable, *args):
+
+        self.executable = shutil.which(executable)
+
+        if self.executable == None:
+            raise Exception("The SAT solver \"{}\" could not be found on the PATH.".format(executable))
+
+        self.args = list(args)
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        tempfile = TemporaryFile(mode="w+")
+        cnf.write(tempfile, assumptions)
+        tempfile.seek(0)
+
+        try:
+            output, returncode = (budget or Budget()).run([self.executable]+self.args, tempfile)
+        finally:
+            tempfile.close()
+
+        return self._model(output, returncode)
+
+    #Same as solve, but as coroutine that streams the CNF to the solver via asyncio, see Budget.run_async.
+    async def solve_async(self, cnf, assumptions=(), budget=None):
+
+        output, returncode = await (budget or Budget()).run_async([self.executable]+self.args, cnf.lines(assumptions))
+
+        return self._model(output, returncode)
+
+    #Turns the output of a DIMACS solver into the set of true variables.
+    def _model(self, output, returncode):
+
+        status = re.search(r"^s (SATISFIABLE|UNSATISFIABLE)", output, re.MULTILINE)
+
+        if status == None:
+            raise Exception("The SAT solver \"{}\" failed with returncode {}.".format(self.executable, returncode))
+        elif status.group(1) == "UNSATISFIABLE":
+            return None
+
+        return {int(m) for n in re.findall(r"^v (.*)$", output, re.MULTILINE) for m in n.split() if int(m) > 0}
+
+#Solves CNFs with limboole, which gets found on the PATH as either limboole or limboole.exe.
+#Since a CNF is already in the normal form limboole turns its input into, it only has to parse a flat list of clauses.
+class LimbooleBackend:
+
+    def __init__(self):
+
+        self.executable = shutil.which("limboole") or shutil.which("limboole.exe")
+
+        if self.executable == None:
+            raise Exception("limboole could not be found on the PATH.")
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        tempfile = TemporaryFile(mode="w+")
+        self._write(tempfile, cnf, assumptions)
+        tempfile.seek(0)
+
+        try:
+            output, returncode = (budget or Budget()).run([self.executable, "-s"], tempfile)
+        finally:
+            tempfile.close()
+
+        return self._model(output, returncode)
+
+    #Same as solve, but as coroutine that streams the formula to limboole via asyncio, see Budget.run_async.
+    async def solve_async(self, cnf, assumptions=(), budget=None):
+
+        output, returncode = await (budget or Budget()).run_async([self.executable, "-s"], self._lines(cnf, assumptions))
+
+        return self._model(output, returncode)
+
+    #Write the CNF as a limboole formula, one clause per line with variable n named vn.
+    @staticmethod
+    def _write(file, cnf, assumptions):
+
+        file.writelines(LimbooleBackend._lines(cnf, assumptions))
+
+    #Yields the lines of the limboole formula, see _write.
+    @staticmethod
+    def _lines(cnf, assumptions):
+
+        literal = lambda n: "v"+str(n) if n > 0 else "!v"+str(-n)
+
+        clauses = cnf.clauses+[[n] for n in assumptions]
+
+        #limboole does not accept an empty formula, thus use a tautology instead.
+        if len(clauses) == 0:
+            yield "v1 | !v1"
+
+        for i,n in enumerate(clauses):
+            yield ("&\n" if i > 0 else "")+("("+" | ".join([literal(m) for m in n])+")" if n else "(v1 & !v1)")
+
+    #Turns the output of limboole into the set of true variables.
+    def _model(self, output, returncode):
+
+        if returncode != 0:
+            raise Exception("limboole failed with returncode {}.".format(returncode))
+        elif output.startswith("% UNSATISFIABLE"):
+            return None
+        elif output.startswith("% SATISFIABLE"):
+            return {int(n) for n in re.findall(r"^v(\d+) = 1", output, re.MULTILINE)}
+
+        raise Exception("limboole returned an unexpected result.")
+
+#Races several backends on each CNF, each in a thread of its own, and returns the first answer. All of them solve the very same CNF, z3 included, which runs as a SAT solver here.
+#The retract rounds of solve additionally race the SMT encoding of z3solve for the same round if "smt" is one of the backends, see race.
+#The others get cancelled as soon as there is an answer, i.e. their solver binaries get killed and z3 gets interrupted, see Budget.
+#Which backend won gets counted in wins and recorded along with the size of the CNF and the time it took in results, one dict per call, e.g. to choose a backend from the features of a graph later on.
+#Without any backends given, all available ones race: z3, the SMT encoding, each known DIMACS solver on the PATH and limboole.
+class PortfolioBackend:
+
+    def __init__(self, *backends):
+
+        if not backends:
+            backends = [n for n in DIMACS_SOLVERS if shutil.which(n) != None]
+            if shutil.which("limboole") or shutil.which("limboole.exe"):
+                backends.append("limboole")
+            try:
+                import z3
+                backends.insert(0, "z3")
+                backends.append("smt")
+            except ImportError:
+                pass
+
+        if not backends:
+            raise Exception("There are no backends available to race.")
+
+        #The SMT encoding needs z3py just like Z3Backend
+        self.smt = "smt" in backends
+        if self.smt:
+            import z3
+
+        self.backends = [get_backend(n) for n in backends if n != "smt"]
+        self.names = [self._name(n) for n in self.backends]
+
+        self.wins = {n: 0 for n in self.names+(["smt"] if self.smt else [])}
+        self.results = []
+
+    @staticmethod
+    def _name(backend):
+
+        if isinstance(backend, Z3Backend):
+            return "z3"
+        elif isinstance(backend, LimbooleBackend):
+            return "limboole"
+        elif isinstance(backend, DimacsBackend):
+            return os.path.basename(backend.executable)
+
+        return type(backend).__name__
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        if not self.backends:
+            raise Exception("The SMT encoding can only race the retract rounds of solve, there are no backends to solve a CNF.")
+
+        return self._race(cnf, [functools.partial(n.solve, cnf, assumptions) for n in self.backends], self.names, budget)
+
+    #Races the backends on the CNF of a retract round and, if the portfolio includes "smt", the SMT encoding of the same round, see Graph._z3_race.
+    #Both answer with the mappings of a retract or None: the models of the CNF get turned into mappings via mappings, while smt takes the budget and returns them directly.
+    def race(self, cnf, assumptions, budget, mappings, smt):
+
+        racers = [functools.partial(self._retract, n, cnf, assumptions, mappings) for n in self.backends]
+        names = list(self.names)
+
+        if self.smt:
+            racers.append(smt)
+            names.append("smt")
+
+        return self._race(cnf, racers, names, budget)
+
+    @staticmethod
+    def _retract(backend, cnf, assumptions, mappings, budget):
+
+        model = backend.solve(cnf, assumptions, budget)
+
+        return mappings(model) if model != None else None
+
+    #Runs each racer with the budget of the race and returns the first answer, recording the name of its racer as winner.
+    def _race(self, cnf, racers, names, budget):
+
+        budget = budget or Budget()
+
+        start = time.perf_counter()
+
+        #Each racer gets the same time limits, but a cancel event of the race, which gets set once the race is decided or the calculation got cancelled.
+        race = copy.copy(budget)
+        race.cancel = threading.Event()
+
+        answers = queue.Queue()
+
+        threads = [threading.Thread(target=self._run, args=(i, n, race, answers), daemon=True) for i,n in enumerate(racers)]
+        for n in threads:
+            n.start()
+
+        errors = []
+
+        try:
+            while True:
+
+                try:
+                    i, answer, error = answers.get(timeout=0.05)
+                except queue.Empty:
+                    budget.check()
+                    continue
+
+                if error == None:
+                    break
+
+                errors.append(error)
+
+                if len(errors) == len(racers):
+                    raise next((n for n in errors if isinstance(n, Interrupted)), errors[0])
+        finally:
+            #The losers have to be done before the next call, as a backend keeps the state of its solver.
+            race.cancel.set()
+            for n in threads:
+                n.join()
+
+        self.wins[names[i]] += 1
+        self.results.append({"winner": names[i], "variables": cnf.n_vars, "clauses": len(cnf.clauses), "time": time.perf_counter()-start})
+
+        return answer
+
+    def _run(self, i, racer, budget, answers):
+
+        try:
+            answers.put((i, racer(budget), None))
+        except Exception as e:
+            answers.put((i, None, e))
+
+#Wraps a backend to count the calls to the solver and the time spent in them.
+class TimedBackend:
+
+    def __init__(self, backend):
+
+        self.backend = backend
+        self.calls = 0
+        self.time = 0
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        start = time.perf_counter()
+
+        try:
+            return self.backend.solve(cnf, assumptions, budget)
+        finally:
+            self.calls += 1
+            self.time += time.perf_counter()-start
+
+#Used to turn the backend parameter of the solve methods into a backend.
+#Accepts backend objects, "z3", "limboole", "portfolio" to race all available backends, including the SMT encoding, or the name/path of a DIMACS solver binary.
+#None picks the first backend that is available: z3 in-process, a known DIMACS solver on the PATH or limboole.
+def get_backend(backend=None):
+
+    if hasattr(backend, "solve"):
+        return backend
+    elif backend == "z3":
+        return Z3Backend()
+    elif backend == "limboole":
+        return LimbooleBackend()
+    elif backend == "portfolio":
+        return PortfolioBackend()
+    elif backend != None:
+        return DimacsBackend(backend)
+
+    try:
+        return Z3Backend()
+    except ImportError:
+        pass
+
+    for n in DIMACS_SOLVERS:
+        if shutil.which(n) != None:
+            return DimacsBackend(n)
+
+    return LimbooleBackend()
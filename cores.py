@@ -1,150 +1,367 @@
 import random
 import re
-import subprocess
 import copy
 import os
 import time
 import _io
 
-from graphviz import Digraph
-from tempfile import TemporaryFile, _TemporaryFileWrapper
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from tempfile import _TemporaryFileWrapper
 from datetime import datetime
-from z3 import *
+from cnf import CNF, Budget, Interrupted, get_backend
+from events import Round, profiled
+from fileio import binary_kind, open_replace, open_text, read_graph, write_graph
+from sampling import positions, source
+
+#Objects of class Adjacency store the edges of a directed graph on integer vertex ids in compressed sparse row form.
+#The edges starting at vertex n are found at the positions ptr[n] to ptr[n+1] of tgt, holding their targets in ascending order, and of mask, holding their sets of labels as bitmasks with bit l for label chr(l+65).
+#Using flat arrays takes 16 bytes per edge instead of the several hundred bytes of a dict of dicts of sets.
+class Adjacency:
+
+    __slots__ = ["ptr", "tgt", "mask"]
+
+    def __init__(self, ptr, tgt, mask):
+
+        self.ptr = ptr
+        self.tgt = tgt
+        self.mask = mask
+
+    #Builds the adjacency of n vertices from a dict in the form of {(source, target): mask}.
+    @classmethod
+    def from_edges(cls, n, edges):
+
+        return cls.from_columns(n, [m[0] for m in edges], [m[1] for m in edges], list(edges.values()))
+
+    #Builds the adjacency of n vertices from the columns src, tgt and mask, holding the source, the target and the bitmask of the labels of each edge. Edges listed more than once get their masks merged.
+    #The edges get sorted by source and target once as a whole, which yields the rows in order along with their targets.
+    @classmethod
+    def from_columns(cls, n, src, tgt, mask):
+
+        keys = array("q", [src[i]*n+tgt[i] for i in range(len(src))])
+
+        ptr = array("q", bytes(8*(n+1)))
+        targets = array("i")
+        masks = array("I")
+
+        last = None
+
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            if keys[i] == last:
+                masks[-1] |= mask[i]
+            else:
+                ptr[src[i]+1] += 1
+                targets.append(tgt[i])
+                masks.append(mask[i])
+                last = keys[i]
+
+        for m in range(n):
+            ptr[m+1] += ptr[m]
+
+        return cls(ptr, targets, masks)
+
+    #Arrays get only ever replaced as a whole, never changed, thus copies can share the read-only views of a memory mapped file, see fileio.read_graph(mmap=True), which can't be copied anyway.
+    def __deepcopy__(self, memo):
+
+        return Adjacency(*[n if isinstance(n, memoryview) else array(n.typecode, n) for n in (self.ptr, self.tgt, self.mask)])
+
+    #Positions of the edges starting at vertex n
+    def row(self, n):
+
+        return range(self.ptr[n], self.ptr[n+1])
+
+    #Returns the bitmask of the labels of the edge from n to m, 0 if there is none.
+    def get(self, n, m):
+
+        i = bisect_left(self.tgt, m, self.ptr[n], self.ptr[n+1])
+
+        if i < self.ptr[n+1] and self.tgt[i] == m:
+            return self.mask[i]
+
+        return 0
+
+    #Returns the adjacency with all edges reversed, which keeps the rows sorted since sources get visited in ascending order.
+    def transpose(self):
+
+        n = len(self.ptr)-1
+
+        ptr = array("q", bytes(8*(n+1)))
+
+        for m in self.tgt:
+            ptr[m+1] += 1
+        for m in range(n):
+            ptr[m+1] += ptr[m]
+
+        tgt = array("i", bytes(4*len(self.tgt)))
+        mask = array("I", bytes(4*len(self.tgt)))
+        fill = array("q", ptr)
+
+        for m in range(n):
+            for i in self.row(m):
+                tgt[fill[self.tgt[i]]] = m
+                mask[fill[self.tgt[i]]] = self.mask[i]
+                fill[self.tgt[i]] += 1
+
+        return Adjacency(ptr, tgt, mask)
+
+    #Returns the adjacency without any edges attached to vertices n with alive[n] == 0.
+    def without(self, alive):
+
+        ptr = array("q", [0])
+        tgt = array("i")
+        mask = array("I")
+
+        for n in range(len(self.ptr)-1):
+            if alive[n]:
+                for i in self.row(n):
+                    if alive[self.tgt[i]]:
+                        tgt.append(self.tgt[i])
+                        mask.append(self.mask[i])
+            ptr.append(len(tgt))
+
+        return Adjacency(ptr, tgt, mask)
 
 #Objects of class Graph represent a single specific directed graph and the actions you can perform on it.
 class Graph:
 
     #It has to be instantiated by either parsing a graph-structure from a file, copying a preexisting Graph instance or generation a new one according to specified values.
-    def __init__(self, **kwargs):
+    #Parameter mmap controls whether a graph parsed from a file in the binary format reads its edges straight from the memory mapped file instead of copying them, see fileio.read_graph.
+    def __init__(self, mmap=False, **kwargs):
 
         if not len(kwargs)==1 or not list(kwargs.keys()) <= ["parse", "copy", "gen", ]:
             raise Exception("You have to specify exactly one way to instantiate Graph at a time. Either parse or copy or generate a Graph:\ng = Graph(parse=r\"C:\CoReS\graphs\graph1.txt\")\nh = Graph(copy=g.graph)\ng = Graph(gen=(64,2,1))")
         elif "parse" in kwargs:
-            if (isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"])) or isinstance(kwargs["parse"], _TemporaryFileWrapper) or isinstance(kwargs["parse"], _io.TextIOWrapper):
-                self.graph = self._parse(kwargs["parse"])
+            if isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"]) and binary_kind(kwargs["parse"]) != None:
+                self._load_binary(kwargs["parse"], mmap)
+            elif (isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"])) or isinstance(kwargs["parse"], _TemporaryFileWrapper) or isinstance(kwargs["parse"], _io.TextIOWrapper) or isinstance(kwargs["parse"], _io.StringIO):
+                names, out = self._parse(kwargs["parse"])
+                self._load_adjacency(names, out, out.transpose())
             else:
                 raise Exception("The parameter parse has to be an absolute and valid filepath in the form of a string. E.g.: g = Graph(parse=r\"C:\CoReS\graphs\graph1.txt\")")
         elif "copy" in kwargs:
             if isinstance(kwargs["copy"], Graph):
-                self.graph = copy.deepcopy(kwargs["copy"].graph)
+                self.__dict__.update(copy.deepcopy(kwargs["copy"].__dict__))
             else:
                 raise Exception("The graph parameter should only be used to copy other preexisting Graph instances. E.g.: h = Graph(copy=g)")
         elif "gen" in kwargs:
-            if ((isinstance(kwargs["gen"], tuple) and len(kwargs["gen"])==3) and
-                (isinstance(kwargs["gen"][0], int) and kwargs["gen"][0]>0) and
-                (isinstance(kwargs["gen"][1], int) and kwargs["gen"][1]>0 and kwargs["gen"][1]<=26) and
-                ((isinstance(kwargs["gen"][2], int) or isinstance(kwargs["gen"][2], float)) and kwargs["gen"][2]>=0 and kwargs["gen"][2]<=kwargs["gen"][0]*kwargs["gen"][1])):
-                self.graph = self._generate(*kwargs["gen"])
-            else:
-                raise Exception("The gen parameter has to be of the form of a tuple (nodes_n, labels_n, avg_edges_out) with: int: nodes_n>0, int: 26>=labels_n>0 and float: nodes_n*labels_n>=avg_edges_out>=0. E.g.: g = Graph(gen=(8,2,1))")
+            self._load(*self._generate(*self._check_gen(kwargs["gen"])))
+
+    #Checks the parameters of a generated graph, see _generate, and returns them.
+    @staticmethod
+    def _check_gen(gen):
+
+        if ((isinstance(gen, tuple) and len(gen) in (3, 4)) and
+            (isinstance(gen[0], int) and gen[0]>0) and
+            (isinstance(gen[1], int) and gen[1]>0 and gen[1]<=26) and
+            ((isinstance(gen[2], int) or isinstance(gen[2], float)) and gen[2]>=0 and gen[2]<=gen[0]*gen[1]) and
+            (len(gen) == 3 or gen[3] == None or isinstance(gen[3], int) or isinstance(gen[3], random.Random))):
+            return gen
+
+        raise Exception("The gen parameter has to be of the form of a tuple (nodes_n, labels_n, avg_edges_out) or (nodes_n, labels_n, avg_edges_out, seed) with: int: nodes_n>0, int: 26>=labels_n>0, float: nodes_n*labels_n>=avg_edges_out>=0 and seed an int or a random.Random. E.g.: g = Graph(gen=(8,2,1)) or g = Graph(gen=(8,2,1,42))")
+
+    #Set up the internal representation of a graph from the list of names of its vertices and its edges in the form of {(source, target): mask} on the indices of those names, see Adjacency.
+    #Internally, vertices are dense integer ids indexing the list of their original names, with the edges stored as Adjacency in both directions.
+    #Vertices removed by _reduce keep their id and are recorded as folded onto the vertex they got mapped to, see retraction.
+    def _load(self, names, edges):
+
+        out = Adjacency.from_edges(len(names), edges)
+
+        self._load_adjacency(names, out, out.transpose())
+
+    #Set up the internal representation of a graph from the list of names of its vertices and the Adjacency of its outgoing and of its incoming edges.
+    def _load_adjacency(self, names, out, inc):
+
+        self._names = names
 
-    #Deserialize graph from file
+        self._out = out
+        self._in = inc
+
+        #Whether each vertex id is still part of the graph
+        self._alive = bytearray(b"\x01"*len(names))
+        self._size = len(names)
+
+        #Each vertex id points to the vertex it got folded onto or to itself if it is still part of the graph
+        self._parent = array("q", range(len(names)))
+
+        #For each vertex, the vertices that got folded onto it in order
+        self._folds = {}
+
+        #Label index, see _label_index
+        self._index = None
+
+        #Dict view of the graph, see graph
+        self._graph = None
+
+        #Whether the graph is known to be its own core, see solve
+        self.proven = False
+
+    #The graph in the form of a dict of dicts {source: {target: {label, ...}}}, only kept for compatibility:
+    #Each vertex is named after itself followed by the vertices that got folded onto it, joined by "-".
+    #This view gets built once and kept until the graph changes, see _reduce, thus it must not be changed in place. Changes have no effect on the graph unless assigned back to graph.
+    @property
+    def graph(self):
+
+        if self._graph == None:
+            names = {n: self._name(n) for n in self._vertices()}
+            self._graph = {names[n]: {names[self._out.tgt[i]]: _labels(self._out.mask[i]) for i in self._out.row(n)} for n in names}
+
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+
+        names = list(graph)
+        ids = {n: i for i,n in enumerate(names)}
+
+        self._load(names, {(ids[n], ids[m]): _mask(graph[n][m]) for n in graph for m in graph[n]})
+
+    #Returns the ids of all vertices that are still part of the graph in ascending order.
+    def _vertices(self):
+
+        return [n for n in range(len(self._alive)) if self._alive[n]]
+
+    #Returns the amount of vertices and of labelled edges of the current graph.
+    def counts(self):
+
+        return self._size, sum(bin(n).count("1") for n in self._out.mask)
+
+    #Returns the "-"-joined name of a vertex id, i.e. its own name followed by the names of the vertices that got folded onto it.
+    def _name(self, v):
+
+        names = []
+        stack = [v]
+
+        while stack:
+            n = stack.pop()
+            names.append(self._names[n])
+            stack += reversed(self._folds.get(n, []))
+
+        return "-".join(names)
+
+    #Returns the vertex id that vertex id v got mapped onto by all reductions so far.
+    def _find(self, v):
+
+        root = v
+        while self._parent[root] != root:
+            root = self._parent[root]
+
+        #Path compression
+        while self._parent[v] != root:
+            self._parent[v], v = root, self._parent[v]
+
+        return root
+
+    #Returns the retraction map from the original graph to the current one, in the form of {vertex: vertex it got mapped onto} using the original names of the vertices.
+    def retraction(self):
+
+        return {self._names[n]: self._names[self._find(n)] for n in range(len(self._names))}
+
+    #Deserialize graph from file, which may be gzip compressed, see fileio.open_text.
+    #The file gets read line by line: the vertices of the first line get their ids in a dict, which each edge gets checked against and appended to array columns of sources, targets and label bits with as soon as it is read.
+    #The columns get sorted into the Adjacency once at the end, see Adjacency.from_columns, which is returned along with the names of the vertices.
     @staticmethod
     def _parse(target):
 
-        if isinstance(target, str):
-            data = open(target, "r")
-        elif isinstance(target, _TemporaryFileWrapper) or isinstance(target, _io.TextIOWrapper):
-            data = target
-
-        #See if first line fits the specification
-        line = data.readline()
-        if not re.fullmatch(r"(\d+(\-\d+)*( \d+(\-\d+)*)*|\[[1-9][0-9]*\]) ?(\n)?", line):
-            data.close()
-            raise Exception("First line has to be of the form:\n(\d+(\-\d+)*( \d+(\-\d+)*)*|\[[1-9][0-9]*\]) ?(\\n)?")
-        #Resolve special case of using [x] to refer to vertices 1 to x
-        if "[" in line:
-            nodes = [str(n) for n in range(1, int(line.rstrip("\n").lstrip("[").rstrip("]"))+1)]
-        #If not special case, get list of vertices by splitting first line at whitespace
-        else:
-            nodes = line.split()
-        #Prepare disjunct set of vertices for a following regular expression
-        nodes_or = "|".join(nodes)
-
-        #Check for further error of not all vertices being distinct to each other
-        for i,n in enumerate(nodes):
-            if n in nodes[i+1:len(nodes)]:
-                data.close()
-                raise Exception("Each node has to be distinct")
-
-        #Create graph under consideration of vertices
-        graph = {n: {} for n in nodes}
-
-        #Read in remaining graph (i.e. don't re-parse first line) to get edges
-        edges = data.read()
-
-        #Only care for adding edges to graph, if there's lines for edges in the first place
-        if len(edges)>0:
-
-            #Whole file has been read, we should now close the file
-            data.close()
-            #See if all following lines are according to specification
-            if not re.fullmatch(r"(("+nodes_or+") ("+nodes_or+") [A-Z] ?\n)*(("+nodes_or+") ("+nodes_or+") [A-Z] ?\n?)?", edges):
-                raise Exception("Second to last line have to be in the form of:\n(("+nodes_or+") ("+nodes_or+") [A-Z] ?\\n)*(("+nodes_or+") ("+nodes_or+") [A-Z] ?\\n?)?")
-            #Cut off (optional) rightmost \n and split the string into an array of strings with an entry for each edge
-            edges = edges.rstrip("\n").split("\n")
-
-            edges = set(edges)
-            
-            #Split each edge into an array of its source vertex, target vertex and label.
-            edges = [n.split() for n in edges]
-
-            #Add edges to graph
-            for n in edges:
-                #If fitting entry in second layer exists, add label
-                if n[1] in graph[n[0]]:
-                    graph[n[0]][n[1]].add(n[2])
-                #Else create second layer entry and add label as first element
-                else:
-                    graph[n[0]][n[1]] = set(n[2])
+        with open_text(target) as data:
+
+            #See if first line fits the specification
+            line = data.readline()
+            if not re.fullmatch(r"(\d+(\-\d+)*( \d+(\-\d+)*)*|\[[1-9][0-9]*\]) ?(\n)?", line):
+                raise Exception("Line 1 has to be of the form:\n(\d+(\-\d+)*( \d+(\-\d+)*)*|\[[1-9][0-9]*\]) ?(\\n)?")
+            #Resolve special case of using [x] to refer to vertices 1 to x
+            if "[" in line:
+                nodes = [str(n) for n in range(1, int(line.rstrip("\n").lstrip("[").rstrip("]"))+1)]
+            #If not special case, get list of vertices by splitting first line at whitespace
+            else:
+                nodes = line.split()
+
+            #Check for further error of not all vertices being distinct to each other
+            ids = {}
+            for n in nodes:
+                if n in ids:
+                    raise Exception("Line 1: Each node has to be distinct, but {} is listed more than once".format(n))
+                ids[n] = len(ids)
+
+            #Source, target and bit of the label of each edge line, see Adjacency.from_columns
+            src = array("i")
+            tgt = array("i")
+            mask = array("I")
 
-        return graph
+            #Read in remaining graph (i.e. don't re-parse first line) to get edges
+            for i,line in enumerate(data, 2):
+
+                #See if the line is according to specification
+                edge = _EDGE.fullmatch(line)
+                if edge == None:
+                    raise Exception("Line {} has to be of the form:\nsource target label ?(\\n)?\nwith a single capital letter as label, e.g. 1 2 A".format(i))
+
+                n, m, l = edge.groups()
+                for k in (n, m):
+                    if not k in ids:
+                        raise Exception("Line {}: {} is not one of the vertices of the first line".format(i, k))
+
+                src.append(ids[n])
+                tgt.append(ids[m])
+                mask.append(1<<(ord(l)-65))
+
+        return nodes, Adjacency.from_columns(len(nodes), src, tgt, mask)
 
     #Generating a new Graph
+    #Each possible edge (V,V,L) exists independently with the same chance, see _edges. Parameter seed is an int or a random.Random to make it reproducible, see sampling.source.
     @staticmethod
-    def _generate(nodes_n, labels_n, avg_edges_out):
-
-        #Changing from avg_edges_out to absolute chance of any given edge (V,V,L) to exists
-        ratio = avg_edges_out/(nodes_n*labels_n)
+    def _generate(nodes_n, labels_n, avg_edges_out, seed=None):
 
         graph = {}
 
-        #First layer with a natural number for each vertex in a dict
-        for n in range(nodes_n):
-            graph[str(n+1)] = {}
-            #Second layer with a natural number for a vertex in a dict if there is an edge from the corresponding vertex in the first layer to this one
-            #Only gets created once an edge happens to be generated
-            for m in range(nodes_n):
-                #Third layer with a character for a label in a set if the edge happens to be generated
-                for l in range(labels_n):
-                    #If edge is generated:
-                    if(random.random()<ratio):
-                        #Add label to set
-                        if str(m+1) in graph[str(n+1)]:
-                            graph[str(n+1)][str(m+1)].add(chr(l+65))
-                        #Or create set with label as first element if edge n->m was empty so far
-                        else:
-                            graph[str(n+1)][str(m+1)] = set(chr(l+65))
-
-        return graph
+        #Add the bit of the label of each generated edge to the bitmask of the edge from n to m, see _load
+        for n,m,l in Graph._edges(nodes_n, labels_n, avg_edges_out, source(seed)):
+            graph[(n, m)] = graph.get((n, m), 0) | 1<<l
+
+        return [str(n+1) for n in range(nodes_n)], graph
+
+    #Yields the edges (source, target, label) of a generated graph on the vertex ids 0 to nodes_n-1 and labels 0 to labels_n-1, ordered by source, target and label.
+    #Instead of drawing a random number for each of the V*V*L possible edges, only the positions of the edges that exist get drawn, see sampling.positions, which takes O(V+E) instead of O(V*V*L) time.
+    @staticmethod
+    def _edges(nodes_n, labels_n, avg_edges_out, rng):
+
+        #Each vertex has avg_edges_out outgoing edges on average, thus the graph has nodes_n*avg_edges_out edges on average
+        for k in positions(nodes_n*nodes_n*labels_n, nodes_n*avg_edges_out, rng):
+            yield k//(nodes_n*labels_n), k//labels_n % nodes_n, k % labels_n
+
+    #Generates a graph just like Graph(gen=(nodes_n, labels_n, avg_edges_out, seed)) and writes it straight to target_path in the text format, without building it in memory first.
+    #The vertices are listed as [nodes_n] in the first line, i.e. they are named 1 to nodes_n. Returns target_path.
+    @staticmethod
+    def generate(target_path, nodes_n, labels_n, avg_edges_out, seed=None):
+
+        Graph._check_gen((nodes_n, labels_n, avg_edges_out, seed))
+
+        with open(target_path, "w") as file:
+            file.write("[{}]\n".format(nodes_n))
+            file.writelines("{} {} {}\n".format(n+1, m+1, chr(l+65)) for n,m,l in Graph._edges(nodes_n, labels_n, avg_edges_out, source(seed)))
+
+        return target_path
 
     #Print graph to console
     def print(self, length, style):
 
+        graph = self.graph
+
         #Print length of graph yes/no
         if length==1:
-            print("["+str(len(self.graph))+"]")
+            print("["+str(len(graph))+"]")
 
         #Print graph itself like python prints dicts
         if style==1:
-            print(self.graph)
+            print(graph)
         #Print graph more pretty, but also more verbose
         elif style == 2:
-            for n in self.graph:
+            for n in graph:
                 src = n
-                for m in self.graph[n]:
+                for m in graph[n]:
                     tgt = " ("+m
-                    for l in self.graph[n][m]:
+                    for l in graph[n][m]:
                         tgt += " "+l
                     tgt += ")"
                     src += tgt
@@ -152,7 +369,8 @@ class Graph:
 
     #Visualize graph object with Graphviz
     def visualize(self, target_path=None, color=None):
-        #Digraph, node, edge and render are graphviz functions
+        #Digraph, node, edge and render are graphviz functions, graphviz only gets imported once a graph actually gets visualized
+        from graphviz import Digraph
 
         #If no path given, use time dependant file placed relative to this file
         if target_path == None:
@@ -160,17 +378,18 @@ class Graph:
 
         view = Digraph(format="png")
 
+        names = {n: self._name(n) for n in self._vertices()}
 
         #Add all nodes and edges to visualization
-        for n in self.graph:
+        for n in names.values():
             if color and str(n) in color[0]:
                 view.node(n, color=color[0][str(n)])
             else:
                 view.node(n)
-            for m in self.graph[n]:
-                label = ""
-                for l in sorted(self.graph[n][m]):
-                    label += l
+        for k in names:
+            for i in self._out.row(k):
+                n, m = names[k], names[self._out.tgt[i]]
+                label = "".join(sorted(_labels(self._out.mask[i])))
                 if color and ".".join((n,m,label)) in color[1]:
                     view.edge(n,m,label, color=color[1][".".join((n,m,label))])
                 else:
@@ -183,212 +402,994 @@ class Graph:
             print(e)
             return
 
+    #Deserialize graph from a file in the binary format, see fileio.
+    #The adjacency gets copied into arrays as a whole, or with mmap set stays a read-only view of the memory mapped file, so even large graphs load in next to no time. Only the names of the vertices get read right away then.
+    def _load_binary(self, path, mmap=False):
+
+        names, out, inc = read_graph(path, mmap)
+
+        self._load_adjacency(names, Adjacency(*out), Adjacency(*inc))
+
     #Serialize graph object
-    def serialize(self, target_path=None):
+    #Parameter binary controls whether to write the binary format instead of text, see fileio, which is much faster to write and to parse back via Graph(parse=target_path).
+    def serialize(self, target_path=None, binary=False):
 
         #If no path given, use time dependant file placed relative to this file
         if target_path == None:
-            target_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "graphs", datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')+".txt")
+            target_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "graphs", datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')+(".bin" if binary else ".txt"))
+
+        if binary:
+            self._serialize_binary(target_path)
+            return target_path
+
+        #The file may be the one the graph got loaded from, which gets only replaced once the graph is written, see fileio.open_replace
+        with open_replace(target_path, "w") as file:
+            self._write(file)
+
+        return target_path
+
+    #Writes the current graph in the text format to an open file, see serialize.
+    def _write(self, file):
 
-        file = open(target_path, "w")
+        names = {n: self._name(n) for n in self._vertices()}
 
         #Write all vertices to first line
-        for n in self.graph:
+        for n in names.values():
             file.write(n+" ")
 
         file.write("\n")
 
         #Write all edges-tuples to the following lines
-        for n,m,l in [(n,m,l) for n in self.graph for m in self.graph[n] for l in self.graph[n][m]]:
-            file.write(n+" "+m+" "+l+"\n")
+        for n in names:
+            for i in self._out.row(n):
+                for l in sorted(_labels(self._out.mask[i])):
+                    file.write(names[n]+" "+names[self._out.tgt[i]]+" "+l+"\n")
 
-        file.close()
+    #Writes the current graph in the binary format. Unless vertices got removed, the adjacency gets written as is, otherwise the remaining vertices get renumbered first.
+    def _serialize_binary(self, target_path):
 
-        return target_path
+        vertices = self._vertices()
+
+        if len(vertices) == len(self._names):
+            write_graph(target_path, self._names, self._out, self._in)
+            return
+
+        names, edges = self._subgraph(vertices)
+        out = Adjacency.from_edges(len(names), edges)
 
-    #Reduce the graph object as instructed by the result of a solver
+        write_graph(target_path, [self._name(n) for n in vertices], out, out.transpose())
+
+    #Reduce the graph object as instructed by the result of a solver, i.e. a list of mappings [n, m] of vertex ids.
+    #Each vertex n that doesn't map to itself gets removed along with its edges and recorded as folded onto m.
+    #The adjacency gets compacted once per call, the label index only gets updated for the vertices next to the removed ones.
     def _reduce(self, mappings):
 
         #We take in the mapping for each vertex, but only need to actually handle those don't map to themselves
-        mappings = [n for n in mappings if n[0]!=n[1]]
+        mappings = [n for n in mappings if n[0] != n[1]]
+
+        if not mappings:
+            return
+
+        affected = set()
+
+        for n,m in mappings:
+
+            self._alive[n] = 0
+            self._parent[n] = m
+            self._folds.setdefault(m, []).append(n)
+
+            affected.update(self._out.tgt[i] for i in self._out.row(n))
+            affected.update(self._in.tgt[i] for i in self._in.row(n))
+
+        self._size -= len(mappings)
+
+        self._out = self._out.without(self._alive)
+        self._in = self._in.without(self._alive)
+        self._graph = None
+
+        if self._index != None:
+            for n in self._index.values():
+                for m in mappings:
+                    n[0].discard(m[0])
+                    n[1].discard(m[0])
+            for n in affected:
+                if self._alive[n]:
+                    self._index_vertex(n)
+
+    #Checks whether vertex v dominates vertex u, i.e. whether mapping u onto v and every other vertex onto itself is a homomorphism of the current graph.
+    #Such a mapping is a retraction, so u can be folded onto v without changing the core.
+    def _dominates(self, v, u):
+
+        out, inc = self._out, self._in
+
+        for i in out.row(u):
+            m = out.mask[i]
+            if out.get(v, v if out.tgt[i] == u else out.tgt[i]) & m != m:
+                return False
+
+        for i in inc.row(u):
+            m = inc.mask[i]
+            if inc.tgt[i] != u and out.get(inc.tgt[i], v) & m != m:
+                return False
+
+        return True
+
+    #Returns a vertex dominating vertex u that is not part of excluded, None if there is none.
+    #Any dominator of u has to share the edge between u and each of its neighbours, thus only the vertices adjacent to the neighbour with the fewest edges are candidates.
+    def _dominator(self, u, excluded):
+
+        out, inc = self._out, self._in
+
+        cands = None
+
+        for i in out.row(u):
+            if out.tgt[i] != u and (cands == None or len(inc.row(out.tgt[i])) < len(cands)):
+                cands = inc.row(out.tgt[i])
+                adj = inc
+        for i in inc.row(u):
+            if inc.tgt[i] != u and (cands == None or len(out.row(inc.tgt[i])) < len(cands)):
+                cands = out.row(inc.tgt[i])
+                adj = out
+
+        #Vertices without neighbours other than themselves can only be restricted by their loop
+        if cands == None:
+            cands = (v for v in range(len(self._alive)) if self._alive[v])
+        else:
+            cands = (adj.tgt[i] for i in cands)
+
+        for v in cands:
+            if v != u and not v in excluded and self._dominates(v, u):
+                return v
+
+        return None
+
+    #Polynomial preprocessing that folds dominated vertices onto their dominators until there are none left, see _dominates.
+    #This covers vertices without edges, leaves and pendant paths, which get folded onto an edge of their neighbour one vertex at a time, and twins with the same neighbourhood.
+    #Each round folds as many vertices as possible with a single _reduce: a fold stays valid after other folds of the same round as long as neither its vertex is adjacent to nor its dominator is one of the vertices folded before.
+    #Since removing a vertex only removes edges, only its neighbours can become dominated, thus only they get checked again in the next round.
+    #Parameter observer gets handed an event for each round, see events. Parameter budget is checked before each round, see cnf.Budget.
+    def _fold(self, observer=None, budget=None):
+
+        todo = self._vertices()
+
+        rounds = 0
+
+        while todo:
+
+            if budget != None:
+                budget.check()
+
+            r = Round(observer, "fold", rounds, self)
+
+            folds = []
+            folded = set()
+            blocked = set()
+
+            for u in todo:
+                if u in blocked or not self._alive[u]:
+                    continue
+                v = self._dominator(u, folded)
+                if v != None:
+                    folds.append((u, v))
+                    folded.add(u)
+                    blocked.update(self._out.tgt[i] for i in self._out.row(u))
+                    blocked.update(self._in.tgt[i] for i in self._in.row(u))
+
+            self._reduce(folds)
+
+            r.lap("reduce")
+            r.done(removed=len(folds))
+            rounds += 1
+
+            todo = sorted(n for n in blocked if self._alive[n])
+
+    #Index from each set of labels present in the graph, as bitmask, to the vertices with an outgoing and the vertices with an incoming edge that carries a superset of it, in the form of {mask: [{source, ...}, {target, ...}]}.
+    #It gets built on first use and is kept up to date by _reduce.
+    def _label_index(self):
+
+        if self._index == None:
+
+            self._index = {n: [set(), set()] for n in set(self._out.mask)}
+
+            for n in self._vertices():
+                self._index_vertex(n)
+
+        return self._index
+
+    #Determine the entries of vertex v in the label index from the edges attached to it.
+    def _index_vertex(self, v):
+
+        out = {self._out.mask[i] for i in self._out.row(v)}
+        inc = {self._in.mask[i] for i in self._in.row(v)}
+
+        for n,m in self._index.items():
+            if any(l & n == n for l in out):
+                m[0].add(v)
+            else:
+                m[0].discard(v)
+            if any(l & n == n for l in inc):
+                m[1].add(v)
+            else:
+                m[1].discard(v)
+
+    #Vertices each vertex can possibly be mapped to, judging by the labels of the edges attached to it.
+    #Vertex n can only be mapped to a vertex that has outgoing and incoming edges which carry at least the labels of each outgoing and incoming edge of n, including loops.
+    #Comparing plain degrees would not be sound, as a retract can map several edges of n onto the same edge.
+    #The result gets narrowed down further by arc consistency, see _propagate.
+    def _candidates(self):
+
+        index = self._label_index()
+
+        vertices = self._vertices()
+
+        candidates = {}
+
+        for n in vertices:
+
+            profile = [index[self._out.mask[i]][0] for i in self._out.row(n)]+[index[self._in.mask[i]][1] for i in self._in.row(n)]
+
+            if profile:
+                profile.sort(key=len)
+                candidates[n] = profile[0].intersection(*profile[1:])
+            else:
+                candidates[n] = set(vertices)
+
+            loop = self._out.get(n, n)
+            if loop:
+                candidates[n] = {k for k in candidates[n] if self._out.get(k, k) & loop == loop}
+
+        self._propagate(candidates)
+
+        return candidates
+
+    #Checks whether vertex n can be mapped to vertex k given the candidates of its neighbours:
+    #For each edge between n and a neighbour m, k needs an edge in the same direction carrying at least the same labels to or from a candidate of m.
+    def _supported(self, n, k, candidates):
+
+        for adj in (self._out, self._in):
+            for i in adj.row(n):
+                m, labels = adj.tgt[i], adj.mask[i]
+                if m != n and not any(adj.mask[j] & labels == labels and adj.tgt[j] in candidates[m] for j in adj.row(k)):
+                    return False
+
+        return True
+
+    #Narrows down the candidates until they are arc consistent, i.e. until each candidate is supported by the candidates of all neighbours, see _supported.
+    #Whenever a vertex loses candidates, the candidates of its neighbours may lose their support, thus they get checked again until nothing changes.
+    #Since the identity is a retraction, each vertex always keeps itself as a candidate.
+    def _propagate(self, candidates):
+
+        todo = deque(candidates)
+        queued = set(candidates)
+
+        while todo:
+
+            n = todo.popleft()
+            queued.discard(n)
+
+            keep = {k for k in candidates[n] if self._supported(n, k, candidates)}
+
+            if len(keep) < len(candidates[n]):
+                candidates[n] = keep
+                for adj in (self._out, self._in):
+                    for i in adj.row(n):
+                        if not adj.tgt[i] in queued:
+                            todo.append(adj.tgt[i])
+                            queued.add(adj.tgt[i])
+
+    #Encode the search for a retract of the current graph as a CNF.
+    #Each vertex n and vertex m it can possibly be mapped to, see _candidates, get an integer variable x[n][m] which is true iff n gets mapped to m.
+    #x[n][n] doubles as the fixpoint variable of n, thus being mapped onto a fixpoint takes a single binary clause per candidate instead of a clause over all vertices.
+    #Parameter encoding selects the encoding of the "exactly one image" constraints, see cnf.CNF.at_most_one.
+    #Returns the CNF and x.
+    def _encode(self, encoding="auto"):
+
+        cnf = CNF(encoding)
+
+        vertices = self._vertices()
+
+        candidates = self._candidates()
+
+        x = {n: {m: cnf.var((n, m)) for m in sorted(candidates[n])} for n in vertices}
+
+        for n in vertices:
 
-        #Change remaining mappings such that mappings like [['1', '2'], ['3', '2']] become [['1', '2'], ['3', '2-1']] to combat the graph object vertices namings not being invariant during it's reduction
-        #['1', '2'] changes vertex '2' to be '2-1', thus the mapping ['3', '2'] wouldn't know a vertex '2' anymore, requiring its change to ['3', '2-1']
-        mappings = [[n[0]+"".join(["-"+m[0] for m in mappings[:i] if m[1] == n[0]]),n[1]+"".join(["-"+m[0] for m in mappings[:i] if m[1] == n[1]])] for i,n in enumerate(mappings)]
+            #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of vertices.
+            cnf.exactly_one(list(x[n].values()))
 
-        #Apply the mapping
-        for n in mappings:
+            #Impose the "Retaining the identity of element of the core" property of core finding on the mapping of vertices, i.e. vertices can only be mapped onto fixpoints.
+            for m in x[n]:
+                if m != n:
+                    cnf.add([-x[n][m], x[m][m]])
 
-            #Delete a to-be reduced vertex
-            del self.graph[n[0]]
-            #And attach it's name to the vertex it gets mapped to
-            #Instead of renaming the vertex it gets mapped to, we need to remove (with pop) and reassign it's values to a fittingly named new vertex
-            self.graph[n[1]+"-"+n[0]] = self.graph.pop(n[1])
+        out = self._out
 
-            for m in self.graph:
+        #Impose the morphism property of retracts on the mapping of edges:
+        #If the source n of an edge gets mapped to k, its target m has to be mapped to a target of an edge starting at k that carries at least the same labels.
+        for n in vertices:
+            for i in out.row(n):
+                m, labels = out.tgt[i], out.mask[i]
+                for k in x[n]:
+                    cnf.add([-x[n][k]]+[x[m][out.tgt[j]] for j in out.row(k) if out.mask[j] & labels == labels and out.tgt[j] in x[m]])
 
-                #Delete a to-be reduced vertex in the same way as vertices
-                if n[0] in self.graph[m]:
-                    del self.graph[m][n[0]]
-                if n[1] in self.graph[m]:
-                    self.graph[m][n[1]+"-"+n[0]] = self.graph[m].pop(n[1])
+        return cnf, x
 
-    #Promt limboole for Retract search
-    def _i_limboole(self):
+    #Turn a satisfying assignment of the CNF from _encode into a mapping
+    @staticmethod
+    def _mappings(model, x):
+
+        return [[n, m] for n in x for m in x[n] if x[n][m] in model]
+
+    #Look for a retract of minimum size directly, which is the core, instead of iterating over strictly smaller retracts.
+    #The bound on the amount of vertices of the retract gets found via exponential search down from the amount of vertices, which takes O(log V) solver calls on the same CNF.
+    #Proving that there is no retract within a bound far below the size of the core tends to be much harder than close to it, thus the bounds approach the core from above.
+    #A single counter of the fixpoints, see cnf.CNF.counter, serves all bounds, each one only gets switched on via an assumption, so backends that solve incrementally can reuse everything learned.
+    #If the budget runs out, the smallest retract found so far still gets applied. Its reduction gets reported as part of the last round.
+    def _solve_minimal(self, solver, encoding, observer, budget):
 
-        #Write SAT formula into temporary file
-        tempfile = TemporaryFile(mode="w+")
+        rounds = 0
+        r = Round(observer, "minimal", rounds, self)
 
-        tempfile.write("&\n".join(["("+"|\n".join(["("+"&".join(["!.@{}_@{}".format(str(n),str(l)) for l in self.graph if l!=m])+"&.@{}_@{}&.@{}_@{})".format(str(n),str(m),str(m),str(m)) for m in self.graph])+")" for n in self.graph])+"&\n")        
+        cnf, x = self._encode(encoding)
 
-        edges = [[n,m] for n in self.graph for m in self.graph[n]]
+        fixpoints = [x[n][n] for n in x]
+        counter = cnf.counter(fixpoints)
+        r.lap("encode")
 
-        for n in edges:
-            edges_group = [m for m in edges if (self.graph[m[0]][m[1]] >= self.graph[n[0]][n[1]])]
-            tempfile.write("("+"|".join(["(.@{}_@{}&.@{}_@{})".format(n[0],l[0],n[1],l[1]) for l in edges_group])+")&\n")
+        lo, hi = 1, len(fixpoints)
+        best = None
+        bound = None
+        step = 1
 
-        tempfile.write("("+"|\n".join(["("+"&".join(["!.@{}_@{}".format(str(m),str(n)) for m in self.graph])+")" for n in self.graph])+")")
+        try:
+
+            while lo < hi:
 
-        #For limboole to be able to read the tempfile properly, we have to reset it's seeker
-        tempfile.seek(0)
+                #Each round gets reported once the next one starts, so the last one can include the reduction
+                if bound != None:
+                    r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), bound=bound)
+                    rounds += 1
+                    r = Round(observer, "minimal", rounds, self)
 
-        #Prompt limboole with the generated formula and return the result with a PIPE
-        result = subprocess.run("limboole.exe -s", stdin=tempfile, stdout=subprocess.PIPE, shell=True)
+                #Steps down from the top get twice as large until the first bound without a retract, the bounds between the last two then get bisected
+                bound = max(lo, hi-step) if step else (lo+hi)//2
 
-        #Close tempfile
-        tempfile.close()
+                model = solver.solve(cnf, [-counter[bound]], budget)
+                r.lap("solver")
 
-        #Return returncode and the result-string (after turning it from bytecode to string)
-        return result.returncode, result.stdout.decode()
+                if model != None:
+                    #The retract found may be even smaller than the bound asked for
+                    best = model
+                    hi = len([n for n in fixpoints if n in model])
+                    step *= 2
+                else:
+                    lo = bound+1
+                    step = 0
 
-    #Turn limboole result into a mapping
-    def _o_limboole(self, result):
+        finally:
 
-        #Take all limboole-result assignments and only keep those that actually happen (i.e. = 1)
-        mappings = re.findall(r".(@\d+(?:-\d+)*_@\d+(?:-\d+)*) = 1", result)
+            size = self._size
 
-        #Format them from limboole output to our required format
-        mappings = [[m.lstrip("@") for m in n.split("_")] for n in mappings]
+            if best != None:
+                self._reduce(self._mappings(best, x))
 
-        self._reduce(mappings)
+            if bound != None:
+                r.lap("reduce")
+                r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), bound=bound, removed=size-self._size)
 
-    #Reduce graph object to it's core via limboole
-    def solve(self):
+    #Returns the weakly connected components of the current graph as lists of vertex ids in ascending order.
+    def _components(self):
 
-        #Copy original in case limboole fails during an iteration
-        orig = copy.deepcopy(self.graph)
+        seen = bytearray(len(self._alive))
 
-        core = False
+        components = []
 
-        #Iterate over "finding smaller retract" until we find core
-        while not core:
+        for n in self._vertices():
 
-            #SAT formula only works for more than two vertices, but one vertex is always a core
-            if (len(self.graph)==1):
-                core = True
+            if seen[n]:
                 continue
 
-            #Prompt limboole with our formula, see _i_limboole
-            returncode, result = self._i_limboole()
+            seen[n] = 1
+            component = [n]
+
+            #component grows while being iterated over, i.e. this is a breadth first search
+            for m in component:
+                for adj in (self._out, self._in):
+                    for i in adj.row(m):
+                        if not seen[adj.tgt[i]]:
+                            seen[adj.tgt[i]] = 1
+                            component.append(adj.tgt[i])
+
+            components.append(sorted(component))
+
+        return components
+
+    #Returns the subgraph induced by the given vertex ids in the form taken by _load, i.e. the id vertices[i] becomes i.
+    def _subgraph(self, vertices):
+
+        ids = {n: i for i,n in enumerate(vertices)}
+
+        return [self._names[n] for n in vertices], {(i, ids[self._out.tgt[j]]): self._out.mask[j] for i,n in enumerate(vertices) for j in self._out.row(n) if self._out.tgt[j] in ids}
+
+    #Looks for a homomorphism from the vertex ids a into the vertex ids b of the current graph.
+    #This is a retract of the subgraph induced by a and b in which no vertex of a is a fixpoint, thus it can use the encoding of retracts as is.
+    #Returns the mappings of the vertices of a in the form of _mappings, None if there is no such homomorphism. The search gets reported as round r, see events.
+    def _homomorphism(self, a, b, solver, encoding, r, budget):
+
+        sub = Graph.__new__(Graph)
+        sub._load(*self._subgraph(a+b))
+
+        cnf, x = sub._encode(encoding)
+
+        for n in range(len(a)):
+            cnf.add([-x[n][n]])
+        r.lap("encode")
+
+        model = solver.solve(cnf, (), budget)
+        r.lap("solver")
+
+        r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), removed=len(a) if model != None else 0)
+
+        if model == None:
+            return None
+
+        ids = a+b
+
+        return [(ids[n], ids[m]) for n,m in self._mappings(model, x) if n < len(a)]
+
+    #Calculates the core of a graph consisting of several weakly connected components.
+    #The core of each component gets calculated on its own, in parallel in a pool of processes. Components whose core maps homomorphically into the core of another remaining component get dropped afterwards.
+    #What remains are connected cores without homomorphisms between them, whose disjoint union is the core of the whole graph.
+    #Backend objects may not survive being sent to another process, thus those get used in this process one component after another, just like with processes=1.
+    #The events of the search on each component get collected by the worker processes and handed to the observer afterwards.
+    #The workers keep to the time limits of the budget on their own, cancelling terminates them. Either way, the retracts found for the components so far get applied.
+    def _solve_components(self, components, solver, backend, minimal, encoding, processes, observer, budget):
 
-            #returncode!=0 if limboole crashed
-            if returncode!=0:
-                print("I'm sorry, but CoReS wasn't able to solve your problem.")
-                self.graph = orig
-                return
-            #Check whether Graph could be reduced further
+        jobs = [self._subgraph(n) for n in components]
+
+        results = {}
+
+        try:
+            if processes == 1 or hasattr(backend, "solve"):
+                for i,n in enumerate(jobs):
+                    results[i] = _component_core(*n, solver, minimal, encoding, observer != None, budget)
             else:
-                #If it could, reiterate
-                if result.startswith("% SATISFIABLE"):
-                    self._o_limboole(result)
-                #If it couldn't, end search
-                elif result.startswith("% UNSATISFIABLE"):
-                    core = True
+                from multiprocessing import Pool
 
-    #Used to find the core of the graph via a SMT encoding and a python implementation of Z3.
-    def _z3(self):
+                with Pool(processes) as pool:
+                    pending = [pool.apply_async(_component_core, n+(backend, minimal, encoding, observer != None, budget)) for n in jobs]
+                    for i,n in enumerate(pending):
+                        while not n.ready():
+                            if budget.cancelled():
+                                raise Interrupted("The calculation got cancelled.")
+                            n.wait(0.05)
+                        results[i] = n.get()
+        finally:
+
+            #A retract of some components and the identity on all others is a retract of the whole graph.
+            self._reduce([(components[i][l], components[i][k]) for i,m in results.items() if m != None for k in m[0] for l in m[0][k]])
+
+            for i,m in results.items():
+                for l in (m[2] if m != None else []):
+                    l["component"] = i
+                    observer(l)
+
+        if None in results.values():
+            raise Exception("The core of a component could not be calculated.")
+        elif not all(m[3] for m in results.values()):
+            raise Interrupted("The core of a component could not be proven within the time limit.")
+
+        cores = [[n[k] for k in results[i][1]] for i,n in enumerate(components)]
+
+        #Only check the label sets of the edges beforehand, as a component whose edges carry labels no edge of another component carries can not map into it.
+        masks = [{self._out.mask[i] for n in core for i in self._out.row(n)} for core in cores]
+
+        remaining = list(range(len(cores)))
+        mappings = []
+        rounds = 0
+
+        try:
+            for n in sorted(remaining, key=lambda n: len(cores[n])):
+                for m in remaining:
+                    if m != n and all(any(l & k == k for l in masks[m]) for k in masks[n]):
+                        image = self._homomorphism(cores[n], cores[m], solver, encoding, Round(observer, "drop", rounds, self), budget)
+                        rounds += 1
+                        if image != None:
+                            remaining.remove(n)
+                            mappings += image
+                            break
+        finally:
+            self._reduce(mappings)
+
+    #Reduce graph object to it's core via a SAT encoding
+    #Parameter backend controls which SAT solver is used: "z3" (in-process), "limboole", the name of any DIMACS solver on the PATH or a backend object, see cnf.get_backend.
+    #Parameter minimal controls whether the core should be searched for directly as a retract of minimum size, see _solve_minimal.
+    #Parameter fold controls whether dominated vertices get folded away in polynomial time before the solver gets involved, see _fold.
+    #Parameter processes controls how many processes calculate the cores of the weakly connected components of the graph, see _solve_components. None uses one per CPU.
+    #Parameter observer gets handed an event for each round of the search, e.g. its size and the time spent encoding, solving and reducing, see events.
+    #Parameter profile is a path to write cProfile statistics of the whole calculation to, see events.profiled.
+    #Parameters timeout and round_timeout limit the seconds the whole calculation and each single solver call may take, setting the threading.Event cancel from another thread stops the calculation, see cnf.Budget.
+    #If any of them cuts the calculation short, the graph is left at the smallest retract found so far and proven is False. Otherwise, the graph is its core and proven is True.
+    #Parameter cache is a cache.CoreCache or the path of its directory. The core of a graph found in it gets applied right away, the core of any other graph gets added to it once proven, see _lookup.
+    #Parameter encoding selects the encoding of the "each vertex gets mapped to exactly one vertex" constraints: "auto", "pairwise", "sequential", "commander" or "ladder", see cnf.CNF.at_most_one.
+    #Returns the retraction map from the original graph onto its core or the retract found so far, see retraction, or None if the solver failed.
+    def solve(self, backend=None, minimal=False, fold=True, processes=None, observer=None, profile=None, timeout=None, round_timeout=None, cancel=None, cache=None, encoding="auto"):
+
+        if profile != None:
+            return profiled(profile, self.solve, backend, minimal, fold, processes, observer, None, timeout, round_timeout, cancel, cache, encoding)
+
+        #The cache module only gets imported once a cache actually gets used.
+        if cache != None:
+            from cache import get_cache
+            cache = get_cache(cache)
+
+        if cache != None:
+            key = self._lookup(cache, observer)
+            if key == None:
+                return self.retraction()
+
+        budget = Budget(timeout, round_timeout, cancel)
+
+        #Copy original in case the solver fails during an iteration
+        orig = copy.deepcopy(self.__dict__)
+
+        try:
+
+            solver = get_backend(backend)
+
+            if fold:
+                self._fold(observer, budget)
+
+            components = self._components()
+
+            if len(components) > 1:
+                self._solve_components(components, solver, backend, minimal, encoding, processes, observer, budget)
+            else:
+                self._solve(solver, minimal, encoding, observer, budget)
+
+            self.proven = True
+
+        except Interrupted:
+            #Each round replaces the graph by a retract of itself, thus it already is the smallest retract found so far.
+            self.proven = False
+
+        except Exception as e:
+            print("I'm sorry, but CoReS wasn't able to solve your problem.")
+            print(e)
+            self.__dict__.update(orig)
+            return
+
+        if cache != None and self.proven:
+            self._store(cache, *key)
+
+        return self.retraction()
+
+    #Looks up the core of the current graph in cache by its canonical form, see cache.Canonical, and reduces the graph to it if found. The lookup gets reported as a round of kind "cache", see events.
+    #Returns None if the core was found, otherwise the canonical form and the vertex ids in the order it numbers them, which _store takes to add the core once it got calculated.
+    def _lookup(self, cache, observer):
+
+        from cache import Canonical
+
+        r = Round(observer, "cache", 0, self)
+
+        vertices = self._vertices()
+        ids = {n: i for i,n in enumerate(vertices)}
+
+        form = Canonical("graph", len(vertices), [(self._out.mask[i], (ids[n], ids[self._out.tgt[i]])) for n in vertices for i in self._out.row(n)])
+        retraction = cache.get(form)
+        r.lap("encode")
+
+        if retraction != None:
+            self._reduce([(vertices[n], vertices[m]) for n,m in enumerate(retraction)])
+            self.proven = True
+
+        r.lap("reduce")
+        r.done(hit=retraction != None, removed=len(vertices)-self._size)
+
+        return None if retraction != None else (form, vertices)
+
+    #Adds the core of the graph to cache, i.e. where each of the vertices looked up by _lookup got mapped to.
+    def _store(self, cache, form, vertices):
+
+        ids = {n: i for i,n in enumerate(vertices)}
+
+        cache.put(form, [ids[self._find(n)] for n in vertices])
+
+    #Look for a retract via the CNF of a retract round and returns its mappings, None if there is none.
+    #A portfolio also races the SMT encoding of the same round, see cnf.PortfolioBackend.race and _z3_race.
+    def _retract(self, solver, cnf, x, budget):
+
+        if hasattr(solver, "race"):
+            return solver.race(cnf, (), budget, lambda model: self._mappings(model, x), self._z3_race)
+
+        model = solver.solve(cnf, (), budget)
+
+        return self._mappings(model, x) if model != None else None
+
+    #The search for the core of solve on the graph as a whole, which raises an Exception if the solver fails and Interrupted if the budget runs out.
+    def _solve(self, solver, minimal, encoding, observer, budget):
+
+        if minimal:
+            self._solve_minimal(solver, encoding, observer, budget)
+            return
+
+        rounds = 0
+
+        #Iterate over "finding smaller retract" until we find core, one vertex is always a core
+        while self._size > 1:
+
+            budget.check()
+
+            r = Round(observer, "retract", rounds, self)
+            rounds += 1
+
+            cnf, x = self._encode(encoding)
+
+            #Only search for retracts whose amount of vertices is stricly smaller that of the current graph.
+            cnf.add([-x[n][n] for n in x])
+            r.lap("encode")
+
+            mappings = self._retract(solver, cnf, x, budget)
+            r.lap("solver")
+
+            size = self._size
+
+            #If the graph could be reduced, reiterate
+            if mappings != None:
+                self._reduce(mappings)
+
+            r.lap("reduce")
+            r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), removed=size-self._size)
 
-        #The z3py context does not reset inbetween uses, thus we have to manually create a new one for each iteration.
-        cntxt = Context()
+            #If it couldn't, end search
+            if mappings == None:
+                break
 
-        s = Solver(ctx=cntxt)
+    #Builds the SMT encoding of "a retract of the current graph" and returns the context, the solver and the handles needed to add further constraints to it or to read back a model.
+    def _z3_encode(self):
+
+        #z3py only gets imported once the SMT based approach actually gets used, just like for cnf.Z3Backend.
+        import z3
+
+        #The z3py context does not reset inbetween uses, thus we have to manually create a new one for each encoding.
+        cntxt = z3.Context()
+
+        s = z3.Solver(ctx=cntxt)
 
         #Enumeration datatype for vertices. Each vertex gets one element in the datatype.
-        var = Datatype("var", ctx=cntxt)
+        var = z3.Datatype("var", ctx=cntxt)
 
-        for n in self.graph:
-            var.declare(str(n))
+        for n in self._vertices():
+            var.declare("v"+str(n))
         var = var.create()
 
-        vertices = {n: getattr(var, str(n)) for n in self.graph}
+        vertices = {n: getattr(var, "v"+str(n)) for n in self._vertices()}
+
+        #Only the vertices each vertex can possibly be mapped to, see _candidates, need to be considered.
+        candidates = self._candidates()
 
         edge_d_type = {}
 
         #Record datatypes for edges. Each label "l" has it's own datatype with one constructor which has arguments for accessing the source and target node.
         #Labels are considered in that each edges with a certain label is of the datatype that is associated with that label.
-        for n in {l for n in self.graph for m in self.graph[n] for l in self.graph[n][m]}:
+        for n in {l for n in self._out.mask for l in _labels(n)}:
 
-            edge = Datatype(n, ctx=cntxt)
+            edge = z3.Datatype(n, ctx=cntxt)
             edge.declare("cons_"+n, ("src", var), ("tgt", var))
             edge = edge.create()
 
             edge_d_type[n] = edge
 
-        edge = {n: [] for n in edge_d_type}
+        edge = {n: {} for n in edge_d_type}
 
         #Instantiate all edges
-        for n,m,l in [(n,m,l) for n in self.graph for m in self.graph[n] for l in self.graph[n][m]]:
+        for n,m,l in [(n,self._out.tgt[i],l) for n in vertices for i in self._out.row(n) for l in _labels(self._out.mask[i])]:
+
+            edge[l][(n, m)] = getattr(edge_d_type[l], "cons_"+l)(vertices[n], vertices[m])
 
-            edge[l].append(getattr(edge_d_type[l], "cons_"+l)(vertices[n], vertices[m]))
+        var_morph = z3.Function("var_morph", var, var)
 
-        var_morph = Function("var_morph", var, var)
+        #Restrict the mapping of each vertex to its candidates.
+        s.add(z3.And([z3.Or([var_morph(vertices[n])==vertices[m] for m in candidates[n]], cntxt) for n in vertices if len(candidates[n]) < len(vertices)], cntxt))
 
         #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of vertices.
         #At the same time: Impose the "Retaining the identity of element of the core" property of core finding on the mapping of vertices.
-        s.add(And([Implies(Or([var_morph(vertices[m])==vertices[n] for m in vertices], cntxt), var_morph(vertices[n])==vertices[n]) for n in vertices], cntxt))
-
-        #Only search for retracts whose amount of vertices is stricly smaller that of the original graph.
-        #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
-        s.add(Not(And([var_morph(vertices[n])==vertices[n] for n in vertices], cntxt)))
+        s.add(z3.And([z3.Implies(z3.Or([var_morph(vertices[m])==vertices[n] for m in vertices if n in candidates[m]], cntxt), var_morph(vertices[n])==vertices[n]) for n in vertices], cntxt))
 
         #The morphism of edges to edges is sorted by label, therefore there is an edge-morphism associated with each label.
         for n in edge_d_type:
 
-            edge_morph = Function(n+"_morph", edge_d_type[n], edge_d_type[n])
+            edge_morph = z3.Function(n+"_morph", edge_d_type[n], edge_d_type[n])
 
             #Impose the morphism property of retracts on the mapping of edges with label "n".
-            s.add(And([And(var_morph(edge_d_type[n].src(m)) == edge_d_type[n].src(edge_morph(m)), var_morph(edge_d_type[n].tgt(m)) == edge_d_type[n].tgt(edge_morph(m)), cntxt) for m in edge[n]], cntxt))
+            s.add(z3.And([z3.And(var_morph(edge_d_type[n].src(m)) == edge_d_type[n].src(edge_morph(m)), var_morph(edge_d_type[n].tgt(m)) == edge_d_type[n].tgt(edge_morph(m)), cntxt) for m in edge[n].values()], cntxt))
 
             #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of edges with label "n".
-            s.add(And([Or([edge_morph(m) == k for k in edge[n]], cntxt) for m in edge[n]], cntxt))
+            #An edge can only be mapped to edges between candidates of its source and target.
+            s.add(z3.And([z3.Or([edge_morph(edge[n][m]) == edge[n][k] for k in edge[n] if k[0] in candidates[m[0]] and k[1] in candidates[m[1]]], cntxt) for m in edge[n]], cntxt))
 
-        #Processes the return of z3py into a retract-morphism and applies this morphism to the current graph.
-        if s.check() == sat:
+        return cntxt, s, vertices, var_morph
 
-            model = s.model()
+    #Turns a z3py model into a mapping for each of the given vertices that does not map to itself.
+    @staticmethod
+    def _z3_mappings(model, vertices, var_morph, current):
 
-            r_var = {vertices[k]: k for k in vertices}
+        r_var = {vertices[k]: k for k in vertices}
 
-            mappings = []
+        mappings = []
 
-            for n in vertices:
-                if model.eval(var_morph(vertices[n])!=vertices[n]):
-                    mappings.append([n, r_var[model.eval(var_morph(vertices[n]))]])
+        for n in current:
+            if model.eval(var_morph(vertices[n])!=vertices[n]):
+                mappings.append([n, r_var[model.eval(var_morph(vertices[n]))]])
 
-            self._reduce(mappings)                        
+        return mappings
 
-            return True
+    #Builds the SMT encoding of "a retract of the current graph that is strictly smaller than it", see _z3_encode.
+    def _z3_smaller(self):
 
-        else:
+        import z3
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        #Only search for retracts whose amount of vertices is stricly smaller that of the original graph.
+        #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
+        s.add(z3.Not(z3.And([var_morph(vertices[n])==vertices[n] for n in vertices], cntxt)))
+
+        return cntxt, s, vertices, var_morph
+
+    #The racer of the SMT encoding for the retract rounds of a portfolio, see _retract: returns the mappings of a retract strictly smaller than the current graph, None if there is none.
+    #It gets interrupted via the budget just like z3 as a SAT solver once another racer answered.
+    def _z3_race(self, budget):
+
+        import z3
+
+        cntxt, s, vertices, var_morph = self._z3_smaller()
+
+        if budget.check_z3(s, cntxt) == z3.sat:
+            return self._z3_mappings(s.model(), vertices, var_morph, vertices)
+
+        return None
+
+    #Used to find the core of the graph via a SMT encoding and a python implementation of Z3.
+    #The search gets reported as round r, see events.
+    def _z3(self, r, budget):
+
+        import z3
+
+        #A single vertex is its own core, and z3 can't build the datatype of the vertices without any
+        if self._size < 2:
             return False
 
+        cntxt, s, vertices, var_morph = self._z3_smaller()
+        r.lap("encode")
+
+        result = budget.check_z3(s, cntxt)
+        r.lap("solver")
+
+        size = self._size
+
+        #Processes the return of z3py into a retract-morphism and applies this morphism to the current graph.
+        if result == z3.sat:
+            self._reduce(self._z3_mappings(s.model(), vertices, var_morph, vertices))
+
+        r.lap("reduce")
+        r.done(bytes=lambda: len(s.sexpr()), removed=size-self._size)
+
+        return result == z3.sat
+
+    #Used to find the core of the graph via a SMT encoding that is built only once for the original graph and reused across all iterations.
+    #A retract of a retract of the original graph is itself a retract of the original graph, whose image is part of the vertices that are still left.
+    #Each iteration therefore only has to forbid the vertices reduced so far from being fixpoints, while the same solver instance and everything it learned carries over.
+    def _z3_incremental(self, observer, budget):
+
+        import z3
+
+        r = Round(observer, "retract", 0, self)
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        i = 0
+        while self._size > 1:
+
+            #The "strictly smaller than the current retract" constraint changes with each iteration. Guarding it with a fresh literal that only gets assumed for this check keeps all learned clauses valid.
+            guard = z3.Bool("smaller_"+str(i), cntxt)
+            s.add(z3.Implies(guard, z3.Not(z3.And([var_morph(vertices[n])==vertices[n] for n in self._vertices()], cntxt)), cntxt))
+            i += 1
+            r.lap("encode")
+
+            result = budget.check_z3(s, cntxt, guard)
+            r.lap("solver")
+
+            if result != z3.sat:
+                r.done(bytes=lambda: len(s.sexpr()))
+                break
+
+            mappings = self._z3_mappings(s.model(), vertices, var_morph, self._vertices())
+
+            self._reduce(mappings)
+
+            for n,m in mappings:
+                s.add(var_morph(vertices[n])!=vertices[n])
+
+            r.lap("reduce")
+            r.done(bytes=lambda: len(s.sexpr()), removed=len(mappings))
+            r = Round(observer, "retract", i, self)
+
+    #Used to find the core of the graph directly as a retract of minimum size via SMT/z3py.
+    #The amount of fixpoints is bounded by a cardinality constraint and the bound gets found via binary search.
+    #Each bound is guarded by its own assumption literal, so the encoding and everything learned is reused by all O(log V) checks.
+    #If the budget runs out, the smallest retract found so far still gets applied. Its reduction gets reported as part of the last round.
+    def _z3_minimal(self, observer, budget):
+
+        import z3
+
+        rounds = 0
+        r = Round(observer, "minimal", rounds, self)
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        fixpoints = [var_morph(vertices[n])==vertices[n] for n in vertices]
+
+        lo, hi = 1, len(vertices)
+        best = None
+        bound = None
+
+        try:
+
+            while lo < hi:
+
+                #Each round gets reported once the next one starts, so the last one can include the reduction
+                if bound != None:
+                    r.done(bytes=lambda: len(s.sexpr()), bound=bound)
+                    rounds += 1
+                    r = Round(observer, "minimal", rounds, self)
+
+                bound = (lo+hi)//2
+
+                guard = z3.Bool("at_most_"+str(bound), cntxt)
+                s.add(z3.Implies(guard, z3.AtMost(*fixpoints, bound), cntxt))
+                r.lap("encode")
+
+                result = budget.check_z3(s, cntxt, guard)
+                r.lap("solver")
+
+                if result == z3.sat:
+                    #The retract found may be even smaller than the bound asked for
+                    best = s.model()
+                    hi = len([n for n in fixpoints if z3.is_true(best.eval(n, model_completion=True))])
+                else:
+                    lo = bound+1
+
+        finally:
+
+            size = self._size
+
+            if best != None:
+                self._reduce(self._z3_mappings(best, vertices, var_morph, vertices))
+
+            if bound != None:
+                r.lap("reduce")
+                r.done(bytes=lambda: len(s.sexpr()), bound=bound, removed=size-self._size)
+
+    #Asynchronous version of solve for asyncio: the search runs in the default executor of the event loop while solver binaries get run via asyncio, see aio.
+    #The components of the graph get calculated one after another in the executor instead of in a pool of processes. Cancelling the awaiting task stops the calculation just like cancel does for solve.
+    #Parameter semaphore limits how many calculations using z3 run at once, aio.z3_semaphore() by default. All other parameters work just like for solve.
+    async def solve_async(self, backend=None, minimal=False, fold=True, observer=None, timeout=None, round_timeout=None, cache=None, encoding="auto", semaphore=None):
+
+        import aio
+
+        return await aio.solve(self.solve, backend, semaphore, minimal=minimal, fold=fold, observer=observer, timeout=timeout, round_timeout=round_timeout, cache=cache, encoding=encoding)
+
     #Prompts the iterative search for retracts until the core is found via SMT/z3py.
-    def z3solve(self):
+    #Parameter incremental controls whether the SMT encoding should be built once and reused for all iterations instead of being rebuilt from scratch for each retract, see _z3_incremental.
+    #Parameter minimal controls whether the core should be searched for directly as a retract of minimum size, see _z3_minimal.
+    #Parameter fold controls whether dominated vertices get folded away in polynomial time before the solver gets involved, see _fold.
+    #Parameters observer, profile, timeout, round_timeout, cancel and cache work just like for solve.
+    #Returns the retraction map from the original graph onto its core or the retract found so far, see retraction, or None if the calculation failed, which leaves the graph as it was.
+    def z3solve(self, incremental=False, minimal=False, fold=True, observer=None, profile=None, timeout=None, round_timeout=None, cancel=None, cache=None):
 
-        core = False
-        while not core:
+        if profile != None:
+            return profiled(profile, self.z3solve, incremental, minimal, fold, observer, None, timeout, round_timeout, cancel, cache)
 
-            if self._z3():
-                continue
+        #The cache module only gets imported once a cache actually gets used.
+        if cache != None:
+            from cache import get_cache
+            cache = get_cache(cache)
+
+        if cache != None:
+            key = self._lookup(cache, observer)
+            if key == None:
+                return self.retraction()
+
+        budget = Budget(timeout, round_timeout, cancel)
+
+        #Copy original in case z3 fails during an iteration
+        orig = copy.deepcopy(self.__dict__)
+
+        try:
+
+            if fold:
+                self._fold(observer, budget)
+
+            if minimal:
+                self._z3_minimal(observer, budget)
+            elif incremental:
+                self._z3_incremental(observer, budget)
             else:
-                core=True
\ No newline at end of file
+                core = False
+                rounds = 0
+                while not core:
+
+                    if self._z3(Round(observer, "retract", rounds, self), budget):
+                        rounds += 1
+                        continue
+                    else:
+                        core=True
+
+            self.proven = True
+
+        except Interrupted:
+            self.proven = False
+
+        except Exception as e:
+            print("I'm sorry, but CoReS wasn't able to solve your problem.")
+            print(e)
+            self.__dict__.update(orig)
+            return
+
+        if cache != None and self.proven:
+            self._store(cache, *key)
+
+        return self.retraction()
+
+    #Asynchronous version of z3solve for asyncio, which runs in the default executor of the event loop while holding semaphore, aio.z3_semaphore() by default, see aio.
+    #All other parameters work just like for z3solve.
+    async def z3solve_async(self, incremental=False, minimal=False, fold=True, observer=None, timeout=None, round_timeout=None, cache=None, semaphore=None):
+
+        import aio
+
+        return await aio.z3solve(self.z3solve, semaphore, incremental=incremental, minimal=minimal, fold=fold, observer=observer, timeout=timeout, round_timeout=round_timeout, cache=cache)
+
+#Calculates the core of a single component in a worker process, see Graph._solve_components.
+#Returns the vertices folded onto each vertex in the form of Graph._folds, the ids of the vertices of the core, the events of the search if observe is set and whether the budget sufficed to prove it is the core, None if the solver failed.
+def _component_core(names, edges, backend, minimal, encoding, observe, budget):
+
+    g = Graph.__new__(Graph)
+    g._load(names, edges)
+
+    events = []
+
+    try:
+        g._solve(get_backend(backend), minimal, encoding, events.append if observe else None, budget)
+        proven = True
+    except Interrupted:
+        proven = False
+    except Exception as e:
+        print("I'm sorry, but CoReS wasn't able to solve your problem.")
+        print(e)
+        return None
+
+    return g._folds, g._vertices(), events, proven
+
+#A line of the edges of a graph file: source, target and label, see Graph._parse.
+_EDGE = re.compile(r"(\S+) (\S+) ([A-Z]) ?\n?")
+
+#Turns a set of labels into a bitmask with bit l for label chr(l+65).
+def _mask(labels):
+
+    mask = 0
+    for n in labels:
+        mask |= 1<<(ord(n)-65)
+
+    return mask
+
+#Turns a bitmask with bit l for label chr(l+65) into the set of labels.
+def _labels(mask):
+
+    return {chr(n+65) for n in range(26) if mask>>n & 1}
+
+#python -m cores runs the command line entry point, see cli. The classes get used from the imported module cores instead of __main__, so they pickle the same way for the processes of solve.
+if __name__ == "__main__":
+    import sys
+    import cli
+    sys.exit(cli.main("graph"))
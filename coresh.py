@@ -1,37 +1,50 @@
 import random
 import re
-import subprocess
 import copy
 import os
-import scipy.stats
 import _io
 
-from graphviz import Graph as Gr
-from tempfile import TemporaryFile, _TemporaryFileWrapper
+from array import array
+from collections import deque
+from tempfile import _TemporaryFileWrapper
 from datetime import datetime
-from z3 import *
+from cnf import CNF, Budget, Interrupted, get_backend
+from events import Round, profiled
+from fileio import binary_kind, open_replace, open_text, read_hgraph, write_hgraph
+from sampling import binomial, positions, source
 
+#Vertices, labels and edges are plentiful in larger hypergraphs, thus their classes use __slots__ instead of an instance dict.
 class Vertex:
 
+    __slots__ = ("name",)
+
     def __init__(self, name):
 
         self.name = name
 
 class Edge:
 
+    __slots__ = ("name", "size")
+
     def __init__(self, name, size):
 
         self.name = name
         self.size = size
 
+#The arguments of an edge are a tuple of vertices.
 class EdgeInstance:
 
+    __slots__ = ("edge", "args")
+
     def __init__(self, edge, args):
 
         self.edge = edge
-        self.args = args
+        self.args = tuple(args)
 
 #Objects of class HGraph represent a single specific hypergraph and the actions you can perform on it.
+#hgraph[0] holds the vertices and hgraph[1] the edges. Both are dicts used as insertion-ordered sets (all values are None), so iterating over them works like it did for lists while removing an element only takes O(1).
+#_incident maps each vertex to the set of edges it is an argument of.
+#_parent maps each removed vertex to the vertex it got mapped onto when it got removed, see retraction.
 class HGraph:
 
     #It has to be instantiated by either parsing a hypergraph-structure from a file, copying a preexisting HGraph instance or generation a new one according to specified values.
@@ -40,109 +53,236 @@ class HGraph:
         if not len(kwargs)==1 or not list(kwargs.keys()) <= ["parse", "copy", "gen", ]:
             raise Exception("You have to specify exactly one way to instantiate Graph at a time. Either parse or copy or generate a Graph:\ng = HGraph(parse=r\"C:\CoReS\hgraphs\hgraph1.txt\")\nh = HGraph(copy=g.hgraph)\ng = HGraph(gen=(64,2,2,1))")
         elif "parse" in kwargs:
-            if (isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"])) or isinstance(kwargs["parse"], _TemporaryFileWrapper) or isinstance(kwargs["parse"], _io.TextIOWrapper):
-                self.hgraph = self._parse(kwargs["parse"])
+            if isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"]) and binary_kind(kwargs["parse"]) != None:
+                self._load(*self._parse_binary(kwargs["parse"]))
+            elif (isinstance(kwargs["parse"], str) and os.path.isfile(kwargs["parse"])) or isinstance(kwargs["parse"], _TemporaryFileWrapper) or isinstance(kwargs["parse"], _io.TextIOWrapper) or isinstance(kwargs["parse"], _io.StringIO):
+                self._load(*self._parse(kwargs["parse"]))
             else:
                 raise Exception("The parameter parse has to be an absolute and valid filepath in the form of a string. E.g.: g = HGraph(parse=r\"C:\CoReS\hgraphs\hgraph1.txt\")")
         elif "copy" in kwargs:
             if isinstance(kwargs["copy"], HGraph):
-                self.hgraph = copy.deepcopy(kwargs["copy"].hgraph)
+                self.__dict__.update(copy.deepcopy(kwargs["copy"].__dict__))
             else:
                 raise Exception("The graph parameter should only be used to copy other preexisting HGraph instances. E.g.: h = HGraph(copy=g)")
         elif "gen" in kwargs:
-            if ((isinstance(kwargs["gen"], tuple) and len(kwargs["gen"])==4) and
-                (isinstance(kwargs["gen"][0], int) and kwargs["gen"][0]>=0) and
-                (isinstance(kwargs["gen"][1], int) and kwargs["gen"][1]>=0) and
-                ((isinstance (kwargs["gen"][2], int) or isinstance(kwargs["gen"][2], float)) and kwargs["gen"][2]>=0) and
-                ((isinstance (kwargs["gen"][3], int) or isinstance(kwargs["gen"][3], float)) and kwargs["gen"][3]>=0)):
-                self.hgraph = self._generate(*kwargs["gen"])
-            else:
-                raise Exception("The gen parameter has to be of the form of a tuple (vertex_n, edge_n, avg_edge_args, connectivity) with: int:vertex_n>=0, int:edge_n>=0, float:avg_edge_args>=0 and float:connectivity>=0. For details see github. E.g.: g = HGraph(gen=(8,2,2,1))")
+            self._load(*self._generate(*self._check_gen(kwargs["gen"])))
+
+    #Checks the parameters of a generated hypergraph, see _generate, and returns them.
+    @staticmethod
+    def _check_gen(gen):
+
+        if ((isinstance(gen, tuple) and len(gen) in (4, 5)) and
+            (isinstance(gen[0], int) and gen[0]>=0) and
+            (isinstance(gen[1], int) and gen[1]>=0) and
+            ((isinstance (gen[2], int) or isinstance(gen[2], float)) and gen[2]>=0) and
+            ((isinstance (gen[3], int) or isinstance(gen[3], float)) and gen[3]>=0) and
+            (len(gen) == 4 or gen[4] == None or isinstance(gen[4], int) or isinstance(gen[4], random.Random))):
+            return gen
+
+        raise Exception("The gen parameter has to be of the form of a tuple (vertex_n, edge_n, avg_edge_args, connectivity) or (vertex_n, edge_n, avg_edge_args, connectivity, seed) with: int:vertex_n>=0, int:edge_n>=0, float:avg_edge_args>=0, float:connectivity>=0 and seed an int or a random.Random. For details see github. E.g.: g = HGraph(gen=(8,2,2,1)) or g = HGraph(gen=(8,2,2,1,42))")
+
+    #Sets up the storage of the hypergraph from lists of vertices and edges.
+    def _load(self, vertices, edges):
+
+        self._hgraph = [dict.fromkeys(vertices), dict.fromkeys(edges)]
+
+        self._incident = {n: set() for n in vertices}
+        for n in edges:
+            for m in n.args:
+                self._incident[m].add(n)
+
+        self._parent = {}
+
+        #Whether the hypergraph is known to be its own core, see solve
+        self.proven = False
+
+    @property
+    def hgraph(self):
+
+        return self._hgraph
+
+    #hgraph can still be assigned any pair of iterables of vertices and edges, which rebuilds the incidence index.
+    @hgraph.setter
+    def hgraph(self, value):
+
+        self._load(list(value[0]), list(value[1]))
 
+    #Returns the vertex of the current hypergraph that vertex v got mapped onto by all reductions so far.
+    def _find(self, v):
+
+        while v in self._parent:
+            v = self._parent[v]
+
+        return v
+
+    #Returns the retraction map from the original hypergraph to the current one, in the form of {vertex: vertex it got mapped onto}.
+    def retraction(self):
+
+        return {n: self._find(n) for n in list(self.hgraph[0])+list(self._parent)}
+
+    #Deserialize hypergraph from file, which may be gzip compressed, see fileio.open_text.
+    #The file gets read line by line, section after section. Vertices and labels are kept in dicts by their names, which each edge gets checked against before it becomes an EdgeInstance as soon as it is read.
     @staticmethod
     def _parse(target):
 
+        vertices = {}
+        labels = {}
+        #Used as an insertion-ordered set, so an edge listed more than once only gets added once
+        edges = {}
+
         #For tools using this program as a submodule, it may be usefull to be able to parse from virtual files (TemporaryFile) instead of actual files.
-        if isinstance(target, str):
-            data = open(target, "r")
-        elif isinstance(target, _TemporaryFileWrapper) or isinstance(target, _io.TextIOWrapper):
-            data = target
-
-        regex = re.fullmatch(r"V:(?P<vertices>(\n[a-z0-9_.]+( [a-z0-9_.]+)*)?)\nL:(?P<labels>(\n[a-zA-Z_]+ \d+)*)\nE:(?P<edges>(\n[a-zA-Z_]+( [a-z0-9_.]+)*)*)", data.read())
-
-        if regex == None:
-            raise Exception("The content of the input file does not match the required syntax. Please consult the github for advice.")
-
-        vertices = regex.group("vertices")
-        labels = regex.group("labels")
-        edges = regex.group("edges")
-
-        vertices = re.split(" ", vertices.lstrip("\n"))
-        if vertices == [""]:
-            vertices = []
-        if not _unique_list(vertices):
-            raise Exception("There can be no repetition in the listing of the vertices, they have to be unique.")
-
-        labels = re.split("\n", labels.lstrip("\n"))
-        if labels == [""]:
-            labels = []
-        labels = [n.split() for n in labels]
-        if not _unique_list([n[0] for n in labels]):
-            raise Exception("There can be no repetition in the naming of the labels, they have to be unique.")
-        labels = {n[0]: int(n[1]) for n in labels}
-
-        edges = re.split("\n", edges.lstrip("\n"))
-        if edges == [""]:
-            edges = []
-        edges = set(edges)
-        edges = [n.split() for n in edges]
-        for n in edges:
-            if not n[0] in labels:
-                raise Exception("Label \"{}\" of the listed edge \"{}\" is not part of the listing of labels.".format(n[0], " ".join(n)))
-            if not len(n[1:])==labels[n[0]]:
-                raise Exception("The number of arguments for the listed edge \"{}\" does not match the arrity of label {}, it should be {}.".format(" ".join(n), n[0], labels[n[0]]))
-            for m in n[1:]:
-                if not m in vertices:
-                    raise Exception("Argument \"{}\" in the listed edge \"{}\" is not part of the listing of vertices.".format(m, " ".join(n)))
+        with open_text(target) as data:
+
+            section = None
+
+            for i,line in enumerate(data, 1):
+
+                line = line.rstrip("\n")
+
+                #The sections start with V:, L: and E: in that order
+                if section == None:
+                    if line != "V:":
+                        raise Exception("Line {}: The file has to start with the section of vertices \"V:\". Please consult the github for advice.".format(i))
+                    section = "V"
+                elif section == "V" and line == "L:":
+                    section = "L"
+                elif section == "L" and line == "E:":
+                    section = "E"
+
+                #Files written by earlier versions hold an empty line of vertices if there are none, and edges of arity 0 followed by a space
+                elif section == "V" and line == "" and not vertices:
+                    continue
+                elif section == "V":
+                    if vertices or not _VERTICES.fullmatch(line):
+                        raise Exception("Line {}: The section of vertices has to be a single line of space separated names of regex [a-z0-9_.]+, followed by \"L:\".".format(i))
+                    for n in line.split(" "):
+                        if n in vertices:
+                            raise Exception("Line {}: There can be no repetition in the listing of the vertices, they have to be unique, but \"{}\" is listed more than once.".format(i, n))
+                        vertices[n] = Vertex(n)
+
+                elif section == "L":
+                    label = _LABEL.fullmatch(line)
+                    if label == None:
+                        raise Exception("Line {}: Each line of the section of labels has to be a name of regex [a-zA-Z_]+ followed by its arrity, the section is followed by \"E:\".".format(i))
+                    if label.group(1) in labels:
+                        raise Exception("Line {}: There can be no repetition in the naming of the labels, they have to be unique, but \"{}\" is listed more than once.".format(i, label.group(1)))
+                    labels[label.group(1)] = Edge(label.group(1), int(label.group(2)))
+
+                else:
+                    if line.endswith(" ") and line[:-1] in labels and labels[line[:-1]].size == 0:
+                        line = line[:-1]
+                    if not _EDGE.fullmatch(line):
+                        raise Exception("Line {}: Each line of the section of edges has to be a label of regex [a-zA-Z_]+ followed by space separated arguments of regex [a-z0-9_.]+.".format(i))
+                    n = line.split(" ")
+                    if not n[0] in labels:
+                        raise Exception("Line {}: Label \"{}\" of the listed edge \"{}\" is not part of the listing of labels.".format(i, n[0], line))
+                    if not len(n)-1 == labels[n[0]].size:
+                        raise Exception("Line {}: The number of arguments for the listed edge \"{}\" does not match the arrity of label {}, it should be {}.".format(i, line, n[0], labels[n[0]].size))
+                    for m in n[1:]:
+                        if not m in vertices:
+                            raise Exception("Line {}: Argument \"{}\" in the listed edge \"{}\" is not part of the listing of vertices.".format(i, m, line))
+                    key = tuple(n)
+                    if not key in edges:
+                        edges[key] = EdgeInstance(labels[n[0]], [vertices[m] for m in n[1:]])
+
+        if section != "E":
+            raise Exception("The file has to consist of the sections \"V:\", \"L:\" and \"E:\" in that order. Please consult the github for advice.")
+
+        return list(vertices.values()), list(edges.values())
+
+    #Deserialize hypergraph from a file in the binary format, see fileio.
+    #The arguments of the edges of each label get read as one block.
+    @staticmethod
+    def _parse_binary(path):
+
+        names, labels = read_hgraph(path)
 
-        vertices = {n: Vertex(n) for n in vertices}
+        vertices = [Vertex(n) for n in names]
 
-        labels = {n: Edge(n, labels[n]) for n in labels}
+        edges = []
 
-        edges = [EdgeInstance(labels[n[0]], [vertices[m] for m in n[1:]]) for n in edges]
+        for name, size, count, args in labels:
+            edge = Edge(name, size)
+            if size:
+                #The same iterator repeated size times groups the arguments into tuples of size many
+                edges += [EdgeInstance(edge, n) for n in zip(*[map(vertices.__getitem__, args)]*size)]
+            else:
+                edges += [EdgeInstance(edge, ()) for n in range(count)]
 
-        return [list(vertices.values()),edges]
+        return vertices, edges
 
     #Used to generate randomized hypergraphs according to some provided values.
     #vertex_n for the actual amount of vertices in the hypergraph.
     #edge_n for the amount of different labels in a hypergraph. Note that there can be labels for which no edge ends up being generated.
     #avg_edge_args for the expected value of the average arrity of the labels. Actual arrities range from 0 to vertex_n and are distributed according to a binomial distribution B(vertex_n, avg_edge_args/vertex_n).
     #connectivity used to describe the expected value of "the connectivity" of the resulting graph in some sense. For details see github.
+    #seed is an int or a random.Random to make it reproducible, see sampling.source.
     @staticmethod
-    def _generate(vertex_n, edge_n, avg_edge_args, connectivity):
+    def _generate(vertex_n, edge_n, avg_edge_args, connectivity, seed=None):
 
-        #Note: scipy.stats.binom.ppf can fail for larger vertex_n and/or arrities.
-        #Since _generate is only supposed to be used for testing/benchmarking and not integral to calculating the core, we do not handle this issue at all at this point.
+        rng = source(seed)
 
         vertices = [Vertex(str(n)) for n in range(vertex_n)]
 
-        edges = [Edge(_charify(n), int(scipy.stats.binom.ppf(random.random(),vertex_n,avg_edge_args/vertex_n))) for n in range(edge_n)]
+        edges = [Edge(n, m) for n,m in HGraph._labels(vertex_n, edge_n, avg_edge_args, rng)]
 
-        edge_insts = []
+        edge_insts = [EdgeInstance(edges[n], [vertices[k] for k in m]) for n,m in HGraph._edges(vertex_n, [n.size for n in edges], connectivity, rng)]
 
-        for n in edges:
-            if n.size == 0:
-                edge_insts.append(EdgeInstance(n, []))
-            else:
-                cands = []
-                size = int(scipy.stats.binom.ppf(random.random(), vertex_n**n.size, min(1,((connectivity*2*vertex_n)/(n.size*edge_n))/(vertex_n**n.size))))
-                while len(cands)<size:
-                    cand = EdgeInstance(n, random.choices(vertices, k=n.size))
-                    if not any([cand.args == m.args for m in cands]):
-                        cands.append(cand)
-                edge_insts+=cands
+        return vertices, edge_insts
+
+    #Returns the names and arrities of the labels of a generated hypergraph.
+    @staticmethod
+    def _labels(vertex_n, edge_n, avg_edge_args, rng):
+
+        return [(_charify(n), binomial(vertex_n, avg_edge_args, rng)) for n in range(edge_n)]
+
+    #Yields the edges of a generated hypergraph as the index of their label and the tuple of the indices of their arguments, given the arrity of each label.
+    #A label of arrity 0 gets a single edge. Any other label gets a binomially distributed amount of distinct tuples of arguments out of all vertex_n**size possible ones, which get drawn as positions of that index space, see sampling.positions, and decoded into their arguments digit by digit.
+    #This takes time linear in the amount of edges generated, without ever comparing tuples of arguments to each other.
+    @staticmethod
+    def _edges(vertex_n, sizes, connectivity, rng):
+
+        for i,size in enumerate(sizes):
 
-        return [vertices, edge_insts]
+            if size == 0:
+                yield i, ()
+                continue
+
+            for k in positions(vertex_n**size, (connectivity*2*vertex_n)/(size*len(sizes)), rng):
+                args = []
+                for n in range(size):
+                    k, m = divmod(k, vertex_n)
+                    args.append(m)
+                yield i, tuple(reversed(args))
+
+    #Generates a hypergraph just like HGraph(gen=(vertex_n, edge_n, avg_edge_args, connectivity, seed)) and writes it straight to target_path in the text format, without building it in memory first. Returns target_path.
+    @staticmethod
+    def generate(target_path, vertex_n, edge_n, avg_edge_args, connectivity, seed=None):
+
+        HGraph._check_gen((vertex_n, edge_n, avg_edge_args, connectivity, seed))
+
+        rng = source(seed)
+
+        labels = HGraph._labels(vertex_n, edge_n, avg_edge_args, rng)
+
+        with open(target_path, "w") as file:
+
+            file.write("V:\n")
+            if vertex_n:
+                file.write(" ".join(str(n) for n in range(vertex_n))+"\n")
+
+            file.write("L:\n")
+            file.writelines("{} {}\n".format(*n) for n in labels)
+
+            file.write("E:\n")
+            file.writelines(" ".join([labels[n][0]]+[str(k) for k in m])+"\n" for n,m in HGraph._edges(vertex_n, [n[1] for n in labels], connectivity, rng))
+
+        return target_path
+
+    #Returns the amount of vertices and of edges of the current hypergraph.
+    def counts(self):
+
+        return len(self.hgraph[0]), len(self.hgraph[1])
 
     #Used to pretty-print HGraph instances for testing/debugging
     def print(self):
@@ -161,6 +301,9 @@ class HGraph:
     #Returns the filepath to the generated image.
     def visualize(self, show=False, target_path=None):
 
+        #graphviz only gets imported once a hypergraph actually gets visualized
+        from graphviz import Graph as Gr
+
         if target_path == None:
             target_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "himages", datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f'))
 
@@ -183,123 +326,604 @@ class HGraph:
 
     #Used to serialize the graph into text form in the same format it can be parse from.
     #Gets saved under a folder relative to this file and named according to the current time.
-    def serialize(self, target_path=None):
+    #Parameter binary controls whether to write the binary format instead of text, see fileio, which is much faster to write and to parse back via HGraph(parse=target_path).
+    def serialize(self, target_path=None, binary=False):
 
         if target_path == None:
-            target_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "hgraphs", datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')+".txt")
+            target_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "hgraphs", datetime.now().strftime('%Y-%m-%d-%H-%M-%S-%f')+(".bin" if binary else ".txt"))
+
+        if binary:
+            self._serialize_binary(target_path)
+            return target_path
+
+        #The file may be the one the graph got loaded from, which gets only replaced once the graph is written, see fileio.open_replace
+        with open_replace(target_path, "w") as file:
+            self._write(file)
 
-        file = open(target_path, "w")
+        return target_path
+
+    #Writes the current hypergraph in the text format to an open file, see serialize.
+    def _write(self, file):
 
         file.write("V:")
 
-        file.write("\n"+" ".join([n.name for n in self.hgraph[0]]))
+        #Without any vertices, the line of vertices gets left out, just like the arguments of edges of arity 0
+        if self.hgraph[0]:
+            file.write("\n"+" ".join([n.name for n in self.hgraph[0]]))
 
         file.write("\nL:")
 
-        for n in {n.edge for n in self.hgraph[1]}:
+        for n in dict.fromkeys(n.edge for n in self.hgraph[1]):
             file.write("\n"+n.name+" "+str(n.size))
 
         file.write("\nE:")
 
         for n in self.hgraph[1]:
-            file.write("\n"+n.edge.name+" "+" ".join([m.name for m in n.args]))
+            file.write("\n"+" ".join([n.edge.name]+[m.name for m in n.args]))
 
-        file.flush()
-        file.close()
+    #Writes the current hypergraph in the binary format, with the edges grouped by their label.
+    def _serialize_binary(self, target_path):
 
-        return target_path
+        ids = {n: i for i,n in enumerate(self.hgraph[0])}
 
-    #Used to find the core of the hypergraph via a SAT encoding and limboole.
-    def _i_limboole(self):
+        #Arguments of the edges of each label as flat array of vertex indices along with the amount of edges
+        labels = {}
 
-        tempfile = TemporaryFile(mode="w+")
+        for n in self.hgraph[1]:
+            if not n.edge in labels:
+                labels[n.edge] = [0, array("i")]
+            labels[n.edge][0] += 1
+            labels[n.edge][1].extend(ids[m] for m in n.args)
 
-        #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of vertices.
-        #At the same time: Impose the "Retaining the identity of element of the core" property of core finding on the mapping of vertices.
-        tempfile.write("&\n".join(["("+"|\n".join(["("+"&".join(["!@"+n.name+"@"+l.name for l in self.hgraph[0] if l!=m])+"&@"+n.name+"@"+m.name+"&@"+m.name+"@"+m.name+")" for m in self.hgraph[0]])+")" for n in self.hgraph[0]])+"&\n")
+        write_hgraph(target_path, [n.name for n in self.hgraph[0]], [(n.name, n.size, labels[n][0], labels[n][1]) for n in labels])
 
-        #This if clause is to prevent generating formulae that are invalid input to limboole, specifically empty brackets "()".
-        if len(self.hgraph[1])!=0 and any([n.edge.size != 0 for n in self.hgraph[1]]):
+    #Encodes the search for a retract of the current hypergraph as a CNF.
+    #Each pair of vertices (n, m) gets an integer variable x[n][m] which is true iff n gets mapped to m. x[n][n] doubles as the fixpoint variable of n, just like for Graph._encode.
+    #Parameter encoding selects the encoding of the "exactly one image" constraints, see cnf.CNF.at_most_one.
+    #Returns the CNF and x.
+    def _encode(self, encoding="auto"):
 
-            #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of edges after having filtered the edges by label.
-            #In the SAT formula, edges can therefore inherently only be mapped to edges of the same label.
-            tempfile.write("&\n".join(["("+"|\n".join(["("+"&".join(["@"+l[0].name+"@"+l[1].name for l in zip(n.args, m.args)])+")" for m in self.hgraph[1] if m.edge == n.edge])+")" for n in self.hgraph[1] if n.edge.size != 0])+"&\n")
+        cnf = CNF(encoding)
 
-        #Only search for retracts whose amount of vertices is stricly smaller that of the original graph.
-        #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
-        tempfile.write("("+"|\n".join(["("+"&".join(["!@"+m.name+"@"+n.name for m in self.hgraph[0]])+")" for n in self.hgraph[0]])+")")
+        #Only the vertices each vertex can possibly be mapped to, see _candidates, get a variable. They keep the order of the vertices to make the encoding deterministic.
+        candidates = self._candidates()
+        order = {n: i for i,n in enumerate(self.hgraph[0])}
+
+        x = {n: {m: cnf.var((n, m)) for m in sorted(candidates[n], key=order.get)} for n in self.hgraph[0]}
 
-        tempfile.seek(0)
+        for n in self.hgraph[0]:
+
+            #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of vertices.
+            cnf.exactly_one(list(x[n].values()))
+
+            #Impose the "Retaining the identity of element of the core" property of core finding on the mapping of vertices, i.e. vertices can only be mapped onto fixpoints.
+            for m in x[n]:
+                if m != n:
+                    cnf.add([-x[n][m], x[m][m]])
 
-        result = subprocess.run("limboole.exe -s", stdin=tempfile, stdout=subprocess.PIPE, shell=True)
+        labels = {}
+        for n in self.hgraph[1]:
+            if n.edge.size != 0:
+                labels.setdefault(n.edge, []).append(n)
+
+        #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of edges after having filtered the edges by label.
+        #Edge n can be mapped to edge m of the same label iff each argument of n gets mapped to the argument of m at the same position, which gets tracked by an auxiliary variable.
+        #Edges whose arguments are not all candidates of the arguments at the same position can never be an image and get skipped.
+        for n in labels:
+            for m in labels[n]:
+                images = []
+                for l in labels[n]:
+                    if not all(k[1] in x[k[0]] for k in zip(m.args, l.args)):
+                        continue
+                    image = cnf.new()
+                    for k in zip(m.args, l.args):
+                        cnf.add([-image, x[k[0]][k[1]]])
+                    images.append(image)
+                cnf.add(images)
+
+        return cnf, x
+
+    #Vertices each vertex can possibly be mapped to, judging by the labels of the edges it is an argument of.
+    #Vertex n can only be mapped to a vertex that, for each edge n is an argument of, is an argument at the same position of an edge with the same label.
+    #The result gets narrowed down further by arc consistency, see _propagate.
+    def _candidates(self):
+
+        index = {}
+        for n in self.hgraph[1]:
+            for i,m in enumerate(n.args):
+                index.setdefault((n.edge, i), set()).add(m)
 
-        tempfile.close()
+        candidates = {}
 
-        return result.returncode, result.stdout.decode()
+        for n in self.hgraph[0]:
+
+            profile = [index[(m.edge, i)] for m in self._incident[n] for i,l in enumerate(m.args) if l is n]
+
+            if profile:
+                profile.sort(key=len)
+                candidates[n] = profile[0].intersection(*profile[1:])
+            else:
+                candidates[n] = set(self.hgraph[0])
 
-    #Processes the return of limboole into a retract-morphism and applies this morphism to the current hypergraph.
-    def _o_limboole(self, result, am):
+        self._propagate(candidates)
 
-        mappings = re.findall(r"@((?:[a-z0-9_.])+)@((?:[a-z0-9_.])+) = 1", result)
+        return candidates
 
-        mappings = [n for n in mappings if n[0]!=n[1]]
+    #Checks whether vertex n can be mapped to vertex k given the candidates of the other vertices:
+    #Each edge n is an argument of needs an image, i.e. an edge with the same label that has k at each position of n and a candidate of the argument at the same position everywhere else.
+    def _supported(self, n, k, candidates):
 
-        lex = {n.name: n for n in self.hgraph[0]}
+        for m in self._incident[n]:
+            if not any(l.edge is m.edge and all(j is k if i is n else j in candidates[i] for i,j in zip(m.args, l.args)) for l in self._incident[k]):
+                return False
 
-        mappings = [[lex[n[0]], lex[n[1]]] for n in mappings]
+        return True
 
-        if am:
-            for n in mappings:
+    #Narrows down the candidates until they are arc consistent, i.e. until each candidate is supported by the candidates of all other arguments of the edges, see _supported.
+    #Whenever a vertex loses candidates, the candidates of the vertices it shares an edge with may lose their support, thus they get checked again until nothing changes.
+    #Since the identity is a retraction, each vertex always keeps itself as a candidate.
+    def _propagate(self, candidates):
+
+        todo = deque(candidates)
+        queued = set(candidates)
+
+        while todo:
+
+            n = todo.popleft()
+            queued.discard(n)
+
+            keep = {k for k in candidates[n] if self._supported(n, k, candidates)}
+
+            if len(keep) < len(candidates[n]):
+                candidates[n] = keep
+                for m in self._incident[n]:
+                    for l in m.args:
+                        if not l in queued:
+                            todo.append(l)
+                            queued.add(l)
+
+    #Turns a satisfying assignment of the CNF from _encode into a retract-morphism.
+    @staticmethod
+    def _mappings(model, x):
+
+        return [[n, m] for n in x for m in x[n] if x[n][m] in model]
+
+    #Applies a retract-morphism to the current hypergraph, removing each vertex that does not get mapped to itself along with all edges attached to it.
+    #Parameter am controls whether the names of the removed vertices get attached to the vertices they get mapped to.
+    #Thanks to the incidence index, removing k vertices only touches their incident edges, i.e. takes O(sum of their degrees * arrity) instead of O(k*E).
+    def _reduce(self, mappings, am=True):
+
+        for n in mappings:
+            if n[0] == n[1]:
+                continue
+            if am:
                 n[1].name += "."+n[0].name
-                self.hgraph[0].remove(n[0])
-                for m in [l for l in self.hgraph[1]]:
-                    if n[0] in m.args:
-                        self.hgraph[1].remove(m)
-        else:
-            for n in mappings:
-                self.hgraph[0].remove(n[0])
-                for m in [l for l in self.hgraph[1]]:
-                    if n[0] in m.args:
-                        self.hgraph[1].remove(m)
-
-    #Prompts the iterative search for retracts until the core is found via SAT/limboole.
+            self._parent[n[0]] = n[1]
+            self._remove(n[0])
+
+    #Removes vertex v along with all edges attached to it.
+    def _remove(self, v):
+
+        del self.hgraph[0][v]
+
+        for n in self._incident.pop(v):
+            del self.hgraph[1][n]
+            for m in n.args:
+                if m != v:
+                    self._incident[m].discard(n)
+
+    #Checks whether vertex v dominates vertex u, i.e. whether mapping u onto v and every other vertex onto itself is a homomorphism of the current hypergraph.
+    #Such a mapping is a retraction, so u can be folded onto v without changing the core. present is the set of (label, args) of all current edges.
+    def _dominates(self, v, u, present):
+
+        return all((n.edge, tuple([v if m is u else m for m in n.args])) in present for n in self._incident[u])
+
+    #Returns a vertex dominating vertex u that is not part of excluded, None if there is none.
+    #The image of an edge of u has to share its label and its other arguments, thus only the vertices in the same position of edges of the neighbour with the fewest edges are candidates.
+    def _dominator(self, u, excluded, present):
+
+        cands = None
+
+        for n in self._incident[u]:
+            for m in n.args:
+                if m is not u and (cands == None or len(self._incident[m]) < len(cands)):
+                    i = n.args.index(u)
+                    cands = [l.args[i] for l in self._incident[m] if l.edge is n.edge]
+
+        #Vertices without neighbours other than themselves can only be restricted by their edges to themselves
+        if cands == None:
+            cands = self.hgraph[0]
+
+        for v in cands:
+            if v is not u and not v in excluded and self._dominates(v, u, present):
+                return v
+
+        return None
+
+    #Polynomial preprocessing that folds dominated vertices onto their dominators until there are none left, see _dominates.
+    #This covers vertices without edges, leaves and pendant paths, which get folded onto an edge of their neighbour one vertex at a time, and twins with the same neighbourhood.
+    #Just like for Graph, each round folds as many vertices as possible with a single _reduce and only the neighbours of folded vertices get checked again in the next round.
+    #Parameter observer gets handed an event for each round, see events. Parameter budget is checked before each round, see cnf.Budget.
+    def _fold(self, am=True, observer=None, budget=None):
+
+        present = {(n.edge, n.args) for n in self.hgraph[1]}
+
+        todo = list(self.hgraph[0])
+
+        rounds = 0
+
+        while todo:
+
+            if budget != None:
+                budget.check()
+
+            r = Round(observer, "fold", rounds, self)
+
+            folds = []
+            folded = set()
+            #Used as an insertion-ordered set to keep the order of the next round deterministic
+            blocked = {}
+
+            for u in todo:
+                if u in blocked or not u in self.hgraph[0]:
+                    continue
+                v = self._dominator(u, folded, present)
+                if v != None:
+                    folds.append((u, v))
+                    folded.add(u)
+                    blocked.update(dict.fromkeys(m for n in self._incident[u] for m in n.args))
+
+            for n in folded:
+                for m in self._incident[n]:
+                    present.discard((m.edge, m.args))
+
+            self._reduce(folds, am)
+
+            r.lap("reduce")
+            r.done(removed=len(folds))
+            rounds += 1
+
+            todo = [n for n in blocked if n in self.hgraph[0]]
+
+    #Looks for a retract of minimum size directly, which is the core, instead of iterating over strictly smaller retracts.
+    #The bound on the amount of vertices of the retract gets found via exponential search down from the amount of vertices, which takes O(log V) solver calls on the same CNF.
+    #Proving that there is no retract within a bound far below the size of the core tends to be much harder than close to it, thus the bounds approach the core from above.
+    #A single counter of the fixpoints, see cnf.CNF.counter, serves all bounds, each one only gets switched on via an assumption, so backends that solve incrementally can reuse everything learned.
+    #If the budget runs out, the smallest retract found so far still gets applied. Its reduction gets reported as part of the last round.
+    def _solve_minimal(self, solver, am, encoding, observer, budget):
+
+        rounds = 0
+        r = Round(observer, "minimal", rounds, self)
+
+        cnf, x = self._encode(encoding)
+
+        fixpoints = [x[n][n] for n in x]
+        counter = cnf.counter(fixpoints)
+        r.lap("encode")
+
+        lo, hi = 1, len(fixpoints)
+        best = None
+        bound = None
+        step = 1
+
+        try:
+
+            while lo < hi:
+
+                #Each round gets reported once the next one starts, so the last one can include the reduction
+                if bound != None:
+                    r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), bound=bound)
+                    rounds += 1
+                    r = Round(observer, "minimal", rounds, self)
+
+                #Steps down from the top get twice as large until the first bound without a retract, the bounds between the last two then get bisected
+                bound = max(lo, hi-step) if step else (lo+hi)//2
+
+                model = solver.solve(cnf, [-counter[bound]], budget)
+                r.lap("solver")
+
+                if model != None:
+                    #The retract found may be even smaller than the bound asked for
+                    best = model
+                    hi = len([n for n in fixpoints if n in model])
+                    step *= 2
+                else:
+                    lo = bound+1
+                    step = 0
+
+        finally:
+
+            size = len(self.hgraph[0])
+
+            if best != None:
+                self._reduce(self._mappings(best, x), am)
+
+            if bound != None:
+                r.lap("reduce")
+                r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), bound=bound, removed=size-len(self.hgraph[0]))
+
+    #Returns the weakly connected components of the current hypergraph as lists of vertices, i.e. the classes of vertices linked by sharing edges.
+    def _components(self):
+
+        seen = set()
+
+        components = []
+
+        for n in self.hgraph[0]:
+
+            if n in seen:
+                continue
+
+            seen.add(n)
+            component = [n]
+
+            #component grows while being iterated over, i.e. this is a breadth first search
+            for m in component:
+                for l in self._incident[m]:
+                    for k in l.args:
+                        if not k in seen:
+                            seen.add(k)
+                            component.append(k)
+
+            components.append(component)
+
+        return components
+
+    #Returns the vertices and the edges of the subhypergraph induced by the given vertices in the form taken by _load.
+    def _subgraph(self, vertices):
+
+        vertices = set(vertices)
+
+        return [n for n in self.hgraph[0] if n in vertices], [n for n in self.hgraph[1] if n.args and n.args[0] in vertices and all(m in vertices for m in n.args)]
+
+    #Looks for a homomorphism from the vertices a into the vertices b of the current hypergraph.
+    #This is a retract of the subhypergraph induced by a and b in which no vertex of a is a fixpoint, thus it can use the encoding of retracts as is.
+    #Returns the mappings of the vertices of a in the form of _mappings, None if there is no such homomorphism. The search gets reported as round r, see events.
+    def _homomorphism(self, a, b, solver, encoding, r, budget):
+
+        sub = HGraph.__new__(HGraph)
+        sub._load(a+b, list({m: None for n in a+b for m in self._incident[n]}))
+
+        cnf, x = sub._encode(encoding)
+
+        for n in a:
+            cnf.add([-x[n][n]])
+        r.lap("encode")
+
+        model = solver.solve(cnf, (), budget)
+        r.lap("solver")
+
+        r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), removed=len(a) if model != None else 0)
+
+        if model == None:
+            return None
+
+        a = set(a)
+
+        return [n for n in self._mappings(model, x) if n[0] in a]
+
+    #Calculates the core of a hypergraph consisting of several weakly connected components, just like Graph._solve_components.
+    #The cores of the components get calculated on copies of their vertices in the worker processes, which report back the vertices of the core along with their names and the events of their search.
+    #Just like for Graph, the retracts found for the components so far get applied even if the budget runs out or the calculation gets cancelled.
+    def _solve_components(self, components, solver, backend, minimal, am, encoding, processes, observer, budget):
+
+        jobs = [self._subgraph(n) for n in components]
+
+        results = {}
+
+        try:
+            if processes == 1 or hasattr(backend, "solve"):
+                for i,n in enumerate(jobs):
+                    results[i] = _component_core(*n, solver, minimal, am, encoding, observer != None, budget)
+            else:
+                from multiprocessing import Pool
+
+                with Pool(processes) as pool:
+                    pending = [pool.apply_async(_component_core, n+(backend, minimal, am, encoding, observer != None, budget)) for n in jobs]
+                    for i,n in enumerate(pending):
+                        while not n.ready():
+                            if budget.cancelled():
+                                raise Interrupted("The calculation got cancelled.")
+                            n.wait(0.05)
+                        results[i] = n.get()
+        finally:
+
+            for i,m in results.items():
+
+                if m == None:
+                    continue
+
+                for j,l in enumerate(jobs[i][0]):
+                    if j in m[0]:
+                        l.name = m[0][j]
+                    else:
+                        self._parent[l] = jobs[i][0][m[3][j]]
+                        self._remove(l)
+
+                for l in m[1]:
+                    l["component"] = i
+                    observer(l)
+
+        if None in results.values():
+            raise Exception("The core of a component could not be calculated.")
+        elif not all(m[2] for m in results.values()):
+            raise Interrupted("The core of a component could not be proven within the time limit.")
+
+        cores = [[l for j,l in enumerate(n[0]) if j in results[i][0]] for i,n in enumerate(jobs)]
+
+        #Only check the labels of the edges beforehand, as a component with edges of a label no edge of another component carries can not map into it.
+        labels = [{m.edge for n in core for m in self._incident[n]} for core in cores]
+
+        remaining = list(range(len(cores)))
+        rounds = 0
+
+        for n in sorted(remaining, key=lambda n: len(cores[n])):
+            for m in remaining:
+                if m != n and labels[n] <= labels[m]:
+                    image = self._homomorphism(cores[n], cores[m], solver, encoding, Round(observer, "drop", rounds, self), budget)
+                    rounds += 1
+                    if image != None:
+                        remaining.remove(n)
+                        self._reduce(image, am)
+                        break
+
+    #Prompts the iterative search for retracts until the core is found via a SAT encoding.
     #Parameter am controls whether vertices that are not part of the core should have their names attached to the vertices they get mapped to. This may or may not be desired depending on the application.
-    def solve(self, am=True):
+    #Parameter backend controls which SAT solver is used: "z3" (in-process), "limboole", the name of any DIMACS solver on the PATH or a backend object, see cnf.get_backend.
+    #Parameter minimal controls whether the core should be searched for directly as a retract of minimum size, see _solve_minimal.
+    #Parameter fold controls whether dominated vertices get folded away in polynomial time before the solver gets involved, see _fold.
+    #Parameter processes controls how many processes calculate the cores of the weakly connected components of the hypergraph, see _solve_components. None uses one per CPU.
+    #Parameter observer gets handed an event for each round of the search, e.g. its size and the time spent encoding, solving and reducing, see events.
+    #Parameter profile is a path to write cProfile statistics of the whole calculation to, see events.profiled.
+    #Parameters timeout and round_timeout limit the seconds the whole calculation and each single solver call may take, setting the threading.Event cancel from another thread stops the calculation, see cnf.Budget.
+    #If any of them cuts the calculation short, the hypergraph is left at the smallest retract found so far and proven is False. Otherwise, the hypergraph is its core and proven is True.
+    #Parameter cache is a cache.CoreCache or the path of its directory. The core of a hypergraph found in it gets applied right away, the core of any other hypergraph gets added to it once proven, see _lookup.
+    #Parameter encoding selects the encoding of the "each vertex gets mapped to exactly one vertex" constraints, see Graph.solve.
+    #Returns whether the core or a retract of it could be calculated.
+    def solve(self, am=True, backend=None, minimal=False, fold=True, processes=None, observer=None, profile=None, timeout=None, round_timeout=None, cancel=None, cache=None, encoding="auto"):
+
+        if profile != None:
+            return profiled(profile, self.solve, am, backend, minimal, fold, processes, observer, None, timeout, round_timeout, cancel, cache, encoding)
+
+        #The cache module only gets imported once a cache actually gets used.
+        if cache != None:
+            from cache import get_cache
+            cache = get_cache(cache)
+
+        if cache != None:
+            key = self._lookup(cache, am, observer)
+            if key == None:
+                return True
+
+        budget = Budget(timeout, round_timeout, cancel)
 
         #In case the calculation of the core fails, restore the original graph.
-        orig = copy.deepcopy(self.hgraph)
+        orig = copy.deepcopy(self.__dict__)
 
-        core = False
+        try:
 
-        #Look for retracts and retracts of those retracts until you can no longer find any. The final retract is a core of the original graph.
-        while not core:
+            solver = get_backend(backend)
 
-            if len(self.hgraph[0])==0 or len(self.hgraph[0])==1:
-                core = True
-                continue
+            if fold:
+                self._fold(am, observer, budget)
 
-            returncode, result = self._i_limboole()
+            components = self._components()
 
-            if returncode!=0:
-                print("I'm sorry, but CoReS wasn't able to solve your problem.")
-                self.graph = orig
-                return
+            if len(components) > 1:
+                self._solve_components(components, solver, backend, minimal, am, encoding, processes, observer, budget)
             else:
-                if result.startswith("% SATISFIABLE"):
-                    self._o_limboole(result, am)
-                elif result.startswith("% UNSATISFIABLE"):
-                    core = True
+                self._solve(solver, minimal, am, encoding, observer, budget)
 
-    #Used to find the core of the hypergraph via a SMT encoding and a python implementation of Z3.
-    def _z3(self):
+            self.proven = True
+
+        except Interrupted:
+            #Each round replaces the hypergraph by a retract of itself, thus it already is the smallest retract found so far.
+            self.proven = False
+
+        except Exception as e:
+            print("I'm sorry, but CoReS wasn't able to solve your problem.")
+            print(e)
+            self.__dict__.update(orig)
+            return False
 
-        #The z3py context does not reset inbetween uses, thus we have to manually create a new one for each iteration.
-        cntxt = Context()
+        if cache != None and self.proven:
+            self._store(cache, *key)
 
-        s = Solver(ctx=cntxt)
+        return True
+
+    #Looks up the core of the current hypergraph in cache just like Graph._lookup, reducing the hypergraph to it if found.
+    #Returns None if the core was found, otherwise the canonical form and the vertices in the order it numbers them, see _store.
+    def _lookup(self, cache, am, observer):
+
+        from cache import Canonical
+
+        r = Round(observer, "cache", 0, self)
+
+        vertices = list(self.hgraph[0])
+        ids = {n: i for i,n in enumerate(vertices)}
+
+        form = Canonical("hgraph", len(vertices), [((n.edge.name, n.edge.size), tuple(ids[m] for m in n.args)) for n in self.hgraph[1]])
+        retraction = cache.get(form)
+        r.lap("encode")
+
+        if retraction != None:
+            self._reduce([(vertices[n], vertices[m]) for n,m in enumerate(retraction)], am)
+            self.proven = True
+
+        r.lap("reduce")
+        r.done(hit=retraction != None, removed=len(vertices)-len(self.hgraph[0]))
+
+        return None if retraction != None else (form, vertices)
+
+    #Adds the core of the hypergraph to cache, i.e. where each of the vertices looked up by _lookup got mapped to.
+    def _store(self, cache, form, vertices):
+
+        ids = {n: i for i,n in enumerate(vertices)}
+
+        cache.put(form, [ids[self._find(n)] for n in vertices])
+
+    #Looks for a retract via the CNF of a retract round and returns its mappings, None if there is none.
+    #A portfolio also races the SMT encoding of the same round, see cnf.PortfolioBackend.race and _z3_race.
+    def _retract(self, solver, cnf, x, budget):
+
+        if hasattr(solver, "race"):
+            return solver.race(cnf, (), budget, lambda model: self._mappings(model, x), self._z3_race)
+
+        model = solver.solve(cnf, (), budget)
+
+        return self._mappings(model, x) if model != None else None
+
+    #The search for the core of solve on the hypergraph as a whole, which raises an Exception if the solver fails and Interrupted if the budget runs out.
+    def _solve(self, solver, minimal, am, encoding, observer, budget):
+
+        if minimal:
+            self._solve_minimal(solver, am, encoding, observer, budget)
+            return
+
+        rounds = 0
+
+        #Look for retracts and retracts of those retracts until you can no longer find any. The final retract is a core of the original graph.
+        while len(self.hgraph[0]) > 1:
+
+            budget.check()
+
+            r = Round(observer, "retract", rounds, self)
+            rounds += 1
+
+            cnf, x = self._encode(encoding)
+
+            #Only search for retracts whose amount of vertices is stricly smaller that of the current hypergraph.
+            #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
+            cnf.add([-x[n][n] for n in x])
+            r.lap("encode")
+
+            mappings = self._retract(solver, cnf, x, budget)
+            r.lap("solver")
+
+            size = len(self.hgraph[0])
+
+            if mappings != None:
+                self._reduce(mappings, am)
+
+            r.lap("reduce")
+            r.done(variables=cnf.n_vars, clauses=len(cnf.clauses), removed=size-len(self.hgraph[0]))
+
+            if mappings == None:
+                break
+
+    #Builds the SMT encoding of "a retract of the current hypergraph" and returns the context, the solver and the handles needed to add further constraints to it or to read back a model.
+    def _z3_encode(self):
+
+        #z3py only gets imported once the SMT based approach actually gets used, just like for cnf.Z3Backend.
+        import z3
+
+        #The z3py context does not reset inbetween uses, thus we have to manually create a new one for each encoding.
+        cntxt = z3.Context()
+
+        s = z3.Solver(ctx=cntxt)
 
         #Enumeration datatype for vertices. Each vertex gets one element in the datatype.
-        var = Datatype("var", ctx=cntxt)
+        var = z3.Datatype("var", ctx=cntxt)
 
         for n in self.hgraph[0]:
             var.declare(n.name)
@@ -307,13 +931,16 @@ class HGraph:
 
         vertices = {n: getattr(var, n.name) for n in self.hgraph[0]}
 
+        #Only the vertices each vertex can possibly be mapped to, see _candidates, need to be considered.
+        candidates = self._candidates()
+
         edge_d_type = {}
 
         #Record datatypes for edges. Each label "l" has it's own datatype with one constructor which has arr(l) arguments.
         #Labels are considered in that each edges with a certain label is of the datatype that is associated with that label.
         for n in {n.edge for n in self.hgraph[1] if n.edge.size != 0}:
 
-            edge = Datatype(n.name, ctx=cntxt)
+            edge = z3.Datatype(n.name, ctx=cntxt)
             edge.declare("cons_"+n.name, *tuple(("arg_"+str(m), var) for m in range(n.size)))
             edge = edge.create()
 
@@ -326,71 +953,304 @@ class HGraph:
 
             edge[n.edge][n] = getattr(edge_d_type[n.edge], "cons_"+n.edge.name)(*tuple(vertices[m] for m in n.args))
 
-        var_morph = Function("var_morph", var, var)
+        var_morph = z3.Function("var_morph", var, var)
+
+        #Restrict the mapping of each vertex to its candidates.
+        s.add(z3.And([z3.Or([var_morph(vertices[n])==vertices[m] for m in vertices if m in candidates[n]], cntxt) for n in vertices if len(candidates[n]) < len(vertices)], cntxt))
 
         #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of vertices.
         #At the same time: Impose the "Retaining the identity of element of the core" property of core finding on the mapping of vertices.
-        s.add(And([Implies(Or([var_morph(vertices[m])==vertices[n] for m in vertices], cntxt), var_morph(vertices[n])==vertices[n]) for n in vertices], cntxt))
-
-        #Only search for retracts whose amount of vertices is stricly smaller that of the original graph.
-        #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
-        s.add(Not(And([var_morph(vertices[n])==vertices[n] for n in vertices], cntxt)))
+        s.add(z3.And([z3.Implies(z3.Or([var_morph(vertices[m])==vertices[n] for m in vertices if n in candidates[m]], cntxt), var_morph(vertices[n])==vertices[n]) for n in vertices], cntxt))
 
         #The morphism of edges to edges is sorted by label, therefore there is an edge-morphism associated with each label.
         for n in edge_d_type:
 
-            func = Function(n.name+"_morph", edge_d_type[n], edge_d_type[n])
+            func = z3.Function(n.name+"_morph", edge_d_type[n], edge_d_type[n])
 
             #Impose the morphism property of retracts on the mapping of edges with label "n".
-            s.add(And([And([var_morph(getattr(edge_d_type[n], "arg_"+str(l))(edge[n][m])) == getattr(edge_d_type[n], "arg_"+str(l))(func(edge[n][m])) for l in range(n.size)], cntxt) for m in edge[n]], cntxt))
+            s.add(z3.And([z3.And([var_morph(getattr(edge_d_type[n], "arg_"+str(l))(edge[n][m])) == getattr(edge_d_type[n], "arg_"+str(l))(func(edge[n][m])) for l in range(n.size)], cntxt) for m in edge[n]], cntxt))
 
             #Impose the "Map each element of the domain to exactly one element of the codomain" property of functions on the mapping of edges with label "n".
-            s.add(And([Or([func(edge[n][m]) == edge[n][k] for k in edge[n]], cntxt) for m in edge[n]], cntxt))
+            #An edge can only be mapped to edges whose arguments are candidates of its arguments at the same position.
+            s.add(z3.And([z3.Or([func(edge[n][m]) == edge[n][k] for k in edge[n] if all(j in candidates[i] for i,j in zip(m.args, k.args))], cntxt) for m in edge[n]], cntxt))
+
+        return cntxt, s, vertices, var_morph
+
+    #Turns a z3py model into a mapping for each of the given vertices that does not map to itself.
+    @staticmethod
+    def _z3_mappings(model, vertices, var_morph, current):
+
+        r_var = {vertices[k]: k for k in vertices}
+
+        return [[n, r_var[model.eval(var_morph(vertices[n]))]] for n in current if model.eval(var_morph(vertices[n])!=vertices[n])]
+
+    #Processes a z3py model into a retract-morphism and applies this morphism to the given vertices of the current hypergraph.
+    #Returns the vertices that got reduced.
+    def _z3_reduce(self, model, vertices, var_morph, current):
+
+        mappings = self._z3_mappings(model, vertices, var_morph, current)
+
+        self._reduce(mappings)
+
+        return [n[0] for n in mappings]
+
+    #Builds the SMT encoding of "a retract of the current hypergraph that is strictly smaller than it", see _z3_encode.
+    def _z3_smaller(self):
+
+        import z3
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        #Only search for retracts whose amount of vertices is stricly smaller that of the original graph.
+        #This isn't a direct requirement of retract/cores, but matches which the approach of iteratively looking for retracts instead of the core directly.
+        s.add(z3.Not(z3.And([var_morph(vertices[n])==vertices[n] for n in vertices], cntxt)))
+
+        return cntxt, s, vertices, var_morph
 
-        #Processes the return of z3py into a retract-morphism and applies this morphism to the current hypergraph.
-        if s.check() == sat:
+    #The racer of the SMT encoding for the retract rounds of a portfolio, see _retract: returns the mappings of a retract strictly smaller than the current hypergraph, None if there is none.
+    #It gets interrupted via the budget just like z3 as a SAT solver once another racer answered.
+    def _z3_race(self, budget):
 
-            model = s.model()
+        import z3
 
-            r_var = {vertices[k]: k for k in vertices}
+        cntxt, s, vertices, var_morph = self._z3_smaller()
 
-            for n in vertices:
-                if model.eval(var_morph(vertices[n])!=vertices[n]):
+        if budget.check_z3(s, cntxt) == z3.sat:
+            return self._z3_mappings(s.model(), vertices, var_morph, vertices)
 
-                    tgt = r_var[model.eval(var_morph(vertices[n]))]
+        return None
 
-                    tgt.name += "."+n.name
-                    self.hgraph[0].remove(n)
-                    for l in [m for m in self.hgraph[1]]:
-                        if n in l.args:
-                            self.hgraph[1].remove(l)
+    #Used to find the core of the hypergraph via a SMT encoding and a python implementation of Z3.
+    #The search gets reported as round r, see events.
+    def _z3(self, r, budget):
 
-            return True
+        import z3
 
-        else:
+        #A single vertex is its own core, and z3 can't build the datatype of the vertices without any, just like for _z3_incremental
+        if len(self.hgraph[0]) < 2:
             return False
 
+        cntxt, s, vertices, var_morph = self._z3_smaller()
+        r.lap("encode")
+
+        result = budget.check_z3(s, cntxt)
+        r.lap("solver")
+
+        removed = self._z3_reduce(s.model(), vertices, var_morph, vertices) if result == z3.sat else []
+
+        r.lap("reduce")
+        r.done(bytes=lambda: len(s.sexpr()), removed=len(removed))
+
+        return result == z3.sat
+
+    #Used to find the core of the hypergraph via a SMT encoding that is built only once for the original hypergraph and reused across all iterations.
+    #A retract of a retract of the original hypergraph is itself a retract of the original hypergraph, whose image is part of the vertices that are still left.
+    #Each iteration therefore only has to forbid the vertices reduced so far from being fixpoints, while the same solver instance and everything it learned carries over.
+    def _z3_incremental(self, observer, budget):
+
+        import z3
+
+        if len(self.hgraph[0]) < 2:
+            return
+
+        r = Round(observer, "retract", 0, self)
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        i = 0
+        while len(self.hgraph[0]) > 1:
+
+            #The "strictly smaller than the current retract" constraint changes with each iteration. Guarding it with a fresh literal that only gets assumed for this check keeps all learned clauses valid.
+            guard = z3.Bool("smaller_"+str(i), cntxt)
+            s.add(z3.Implies(guard, z3.Not(z3.And([var_morph(vertices[n])==vertices[n] for n in self.hgraph[0]], cntxt)), cntxt))
+            i += 1
+            r.lap("encode")
+
+            result = budget.check_z3(s, cntxt, guard)
+            r.lap("solver")
+
+            if result != z3.sat:
+                r.done(bytes=lambda: len(s.sexpr()))
+                break
+
+            removed = self._z3_reduce(s.model(), vertices, var_morph, list(self.hgraph[0]))
+
+            for n in removed:
+                s.add(var_morph(vertices[n])!=vertices[n])
+
+            r.lap("reduce")
+            r.done(bytes=lambda: len(s.sexpr()), removed=len(removed))
+            r = Round(observer, "retract", i, self)
+
+    #Used to find the core of the hypergraph directly as a retract of minimum size via SMT/z3py.
+    #The amount of fixpoints is bounded by a cardinality constraint and the bound gets found via binary search.
+    #Each bound is guarded by its own assumption literal, so the encoding and everything learned is reused by all O(log V) checks.
+    #If the budget runs out, the smallest retract found so far still gets applied. Its reduction gets reported as part of the last round.
+    def _z3_minimal(self, observer, budget):
+
+        import z3
+
+        if len(self.hgraph[0]) < 2:
+            return
+
+        rounds = 0
+        r = Round(observer, "minimal", rounds, self)
+
+        cntxt, s, vertices, var_morph = self._z3_encode()
+
+        fixpoints = [var_morph(vertices[n])==vertices[n] for n in vertices]
+
+        lo, hi = 1, len(vertices)
+        best = None
+        bound = None
+
+        try:
+
+            while lo < hi:
+
+                #Each round gets reported once the next one starts, so the last one can include the reduction
+                if bound != None:
+                    r.done(bytes=lambda: len(s.sexpr()), bound=bound)
+                    rounds += 1
+                    r = Round(observer, "minimal", rounds, self)
+
+                bound = (lo+hi)//2
+
+                guard = z3.Bool("at_most_"+str(bound), cntxt)
+                s.add(z3.Implies(guard, z3.AtMost(*fixpoints, bound), cntxt))
+                r.lap("encode")
+
+                result = budget.check_z3(s, cntxt, guard)
+                r.lap("solver")
+
+                if result == z3.sat:
+                    #The retract found may be even smaller than the bound asked for
+                    best = s.model()
+                    hi = len([n for n in fixpoints if z3.is_true(best.eval(n, model_completion=True))])
+                else:
+                    lo = bound+1
+
+        finally:
+
+            removed = self._z3_reduce(best, vertices, var_morph, list(self.hgraph[0])) if best != None else []
+
+            if bound != None:
+                r.lap("reduce")
+                r.done(bytes=lambda: len(s.sexpr()), bound=bound, removed=len(removed))
+
+    #Asynchronous version of solve for asyncio: the search runs in the default executor of the event loop while solver binaries get run via asyncio, see aio.
+    #The components of the hypergraph get calculated one after another in the executor instead of in a pool of processes. Cancelling the awaiting task stops the calculation just like cancel does for solve.
+    #Parameter semaphore limits how many calculations using z3 run at once, aio.z3_semaphore() by default. All other parameters work just like for solve.
+    async def solve_async(self, am=True, backend=None, minimal=False, fold=True, observer=None, timeout=None, round_timeout=None, cache=None, encoding="auto", semaphore=None):
+
+        import aio
+
+        return await aio.solve(self.solve, backend, semaphore, am=am, minimal=minimal, fold=fold, observer=observer, timeout=timeout, round_timeout=round_timeout, cache=cache, encoding=encoding)
+
     #Prompts the iterative search for retracts until the core is found via SMT/z3py.
-    def z3solve(self):
+    #Parameter incremental controls whether the SMT encoding should be built once and reused for all iterations instead of being rebuilt from scratch for each retract, see _z3_incremental.
+    #Parameter minimal controls whether the core should be searched for directly as a retract of minimum size, see _z3_minimal.
+    #Parameter fold controls whether dominated vertices get folded away in polynomial time before the solver gets involved, see _fold.
+    #Parameters observer, profile, timeout, round_timeout, cancel and cache work just like for solve.
+    #Returns whether the core or a retract of it could be calculated, just like solve. If the calculation fails, the hypergraph is left as it was.
+    def z3solve(self, incremental=False, minimal=False, fold=True, observer=None, profile=None, timeout=None, round_timeout=None, cancel=None, cache=None):
 
-        core = False
-        while not core:
+        if profile != None:
+            return profiled(profile, self.z3solve, incremental, minimal, fold, observer, None, timeout, round_timeout, cancel, cache)
 
-            if self._z3():
-                continue
+        #The cache module only gets imported once a cache actually gets used.
+        if cache != None:
+            from cache import get_cache
+            cache = get_cache(cache)
+
+        if cache != None:
+            key = self._lookup(cache, True, observer)
+            if key == None:
+                return True
+
+        budget = Budget(timeout, round_timeout, cancel)
+
+        #In case the calculation of the core fails, restore the original graph.
+        orig = copy.deepcopy(self.__dict__)
+
+        try:
+
+            if fold:
+                self._fold(observer=observer, budget=budget)
+
+            if minimal:
+                self._z3_minimal(observer, budget)
+            elif incremental:
+                self._z3_incremental(observer, budget)
             else:
-                core=True
+                core = False
+                rounds = 0
+                while not core:
+
+                    if self._z3(Round(observer, "retract", rounds, self), budget):
+                        rounds += 1
+                        continue
+                    else:
+                        core=True
+
+            self.proven = True
 
-#Checks whether each element of an iterable is unique with respect to all other elements of the iterable.
-def _unique_list(lst):
-    head = set()
-    return not any(n in head or head.add(n) for n in lst)
+        except Interrupted:
+            self.proven = False
 
-#Used to map the natural numbers + 0 to strings consisting of capital characters starting at P. Used to provide names for labels during generation of hypergraphs.
+        except Exception as e:
+            print("I'm sorry, but CoReS wasn't able to solve your problem.")
+            print(e)
+            self.__dict__.update(orig)
+            return False
+
+        if cache != None and self.proven:
+            self._store(cache, *key)
+
+        return True
+
+    #Asynchronous version of z3solve for asyncio, which runs in the default executor of the event loop while holding semaphore, aio.z3_semaphore() by default, see aio.
+    #All other parameters work just like for z3solve.
+    async def z3solve_async(self, incremental=False, minimal=False, fold=True, observer=None, timeout=None, round_timeout=None, cache=None, semaphore=None):
+
+        import aio
+
+        return await aio.z3solve(self.z3solve, semaphore, incremental=incremental, minimal=minimal, fold=fold, observer=observer, timeout=timeout, round_timeout=round_timeout, cache=cache)
+
+#Calculates the core of a single component in a worker process, see HGraph._solve_components.
+#Returns the names of the vertices of the core by their position in vertices, the events of the search if observe is set, whether the budget sufficed to prove it is the core
+#and the position of the vertex each other vertex got mapped onto, None if the solver failed.
+def _component_core(vertices, edges, backend, minimal, am, encoding, observe, budget):
+
+    h = HGraph.__new__(HGraph)
+    h._load(vertices, edges)
+
+    events = []
+
+    try:
+        h._solve(get_backend(backend), minimal, am, encoding, events.append if observe else None, budget)
+        proven = True
+    except Interrupted:
+        proven = False
+    except Exception as e:
+        print("I'm sorry, but CoReS wasn't able to solve your problem.")
+        print(e)
+        return None
+
+    ids = {n: i for i,n in enumerate(vertices)}
+
+    return {i: n.name for i,n in enumerate(vertices) if n in h.hgraph[0]}, events, proven, {i: ids[h._find(n)] for i,n in enumerate(vertices) if not n in h.hgraph[0]}
+
+#Lines of the sections of a hypergraph file, see HGraph._parse.
+_VERTICES = re.compile(r"[a-z0-9_.]+( [a-z0-9_.]+)*")
+_LABEL = re.compile(r"([a-zA-Z_]+) (\d+)")
+_EDGE = re.compile(r"[a-zA-Z_]+( [a-z0-9_.]+)*")
+
+#Used to map the natural numbers + 0 to strings consisting of capital characters starting at A, i.e. A to Z, AA to AZ and so on. Used to provide names for labels during generation of hypergraphs.
 def _charify(c):
 
     if c>25:
-        return HGraph._charify((c//26)-1)+chr((c%26)+65)
+        return _charify((c//26)-1)+chr((c%26)+65)
     else:
         return chr(c+65)
 
@@ -412,4 +1272,10 @@ def substitute(snippet):
 
         return tag
     else:
-        return snippet
\ No newline at end of file
+        return snippet
+
+#python -m coresh runs the command line entry point, see cli. The classes get used from the imported module coresh instead of __main__, so they pickle the same way for the processes of solve.
+if __name__ == "__main__":
+    import sys
+    import cli
+    sys.exit(cli.main("hgraph"))
@@ -0,0 +1,90 @@
+import cProfile
+import json
+import time
+
+#Instrumentation of the search for the core.
+#The solve and z3solve methods take an observer, i.e. a callable that gets handed one event per round in the form of a dict:
+#kind: what the round did, "cache", "fold", "retract", "minimal" or "drop", see below
+#round: number of the round within its kind, starting at 0
+#vertices, edges: size of the graph at the start of the round
+#variables, clauses: size of the CNF handed to the solver, or bytes: size of the SMT encoding in SMT-LIB format
+#encode_time, solver_time, reduce_time: seconds spent building the encoding, in the solver and applying the retract found
+#removed: amount of vertices removed by the round
+#Rounds of kind "retract" search for a strictly smaller retract, those of kind "minimal" for a retract within the bound given as "bound" and those of kind "drop" for a homomorphism from one component into another.
+#The round of kind "cache" looks up the core in a cache.CoreCache, its encode_time is the time spent on the canonical form of the graph and "hit" tells whether the core was found.
+#Events of the search on a single weakly connected component carry the index of the component as "component".
+
+#Measures the phases of a single round and hands them to the observer as one event once the round is done.
+#Without an observer, nothing gets measured, so rounds cost next to nothing unless someone is listening.
+class Round:
+
+    def __init__(self, observer, kind, number, graph):
+
+        self.observer = observer
+
+        if observer == None:
+            return
+
+        self.event = {"kind": kind, "round": number}
+        self.event["vertices"], self.event["edges"] = graph.counts()
+        self.event.update({"encode_time": 0.0, "solver_time": 0.0, "reduce_time": 0.0, "removed": 0})
+
+        self.start = time.perf_counter()
+
+    #Adds the time since the round started or since the last lap to phase, one of "encode", "solver" and "reduce".
+    def lap(self, phase):
+
+        if self.observer == None:
+            return
+
+        now = time.perf_counter()
+        self.event[phase+"_time"] += now-self.start
+        self.start = now
+
+    #Hands the event along with the given fields to the observer.
+    #Fields given as callables get called first, so sizes that are expensive to determine only get computed if someone is listening.
+    def done(self, **fields):
+
+        if self.observer == None:
+            return
+
+        self.event.update({n: m() if callable(m) else m for n,m in fields.items()})
+        self.observer(self.event)
+
+#Observer that writes each event as one line of JSON to a file, e.g. g.solve(observer=JsonLines(open("trace.jsonl", "w"))).
+class JsonLines:
+
+    def __init__(self, file):
+
+        self.file = file
+
+    def __call__(self, event):
+
+        self.file.write(json.dumps(event)+"\n")
+        self.file.flush()
+
+#Observer that sums up the time spent in each phase and the size of the CNFs handed to the solver over all rounds, e.g. to time a whole calculation per phase, see benchmark and batch.
+class Phases:
+
+    def __init__(self):
+
+        self.times = {"encode": 0.0, "solver": 0.0, "reduce": 0.0}
+        self.formula = {"variables": 0, "clauses": 0}
+
+    def __call__(self, event):
+
+        for n in self.times:
+            self.times[n] += event[n+"_time"]
+
+        for n in self.formula:
+            self.formula[n] += event.get(n, 0)
+
+#Calls function under cProfile and writes the statistics to path in the format of pstats, which can be inspected via python -m pstats path.
+def profiled(path, function, *args, **kwargs):
+
+    profile = cProfile.Profile()
+
+    try:
+        return profile.runcall(function, *args, **kwargs)
+    finally:
+        profile.dump_stats(path)
@@ -0,0 +1,206 @@
+import contextlib
+import gzip
+import mmap
+import os
+import secrets
+import struct
+import sys
+
+from array import array
+
+#Reading and writing of the files Graph and HGraph get parsed from and serialized to.
+
+#Opens a file to parse, given either as path or as an already open text file, for reading as text.
+#Paths to gzip compressed files, recognized by their first two bytes, get decompressed on the fly, so they can be parsed line by line just like plain ones.
+def open_text(target):
+
+    if not isinstance(target, str):
+        return target
+
+    with open(target, "rb") as file:
+        magic = file.read(2)
+
+    if magic == b"\x1f\x8b":
+        return gzip.open(target, "rt")
+
+    return open(target, "r")
+
+#Opens path for writing in the given mode, but writes to a temporary file next to it that only replaces path via os.replace once everything got written.
+#This keeps path intact until then, which matters when a graph gets written back to the file it got loaded from with mmap=True, as it still reads from that file, see read_graph.
+#If writing fails, the temporary file gets removed again and path stays as it was.
+@contextlib.contextmanager
+def open_replace(path, mode):
+
+    tmp = os.path.join(os.path.dirname(os.path.abspath(path)), "."+os.path.basename(path)+"."+secrets.token_hex(4)+".tmp")
+
+    try:
+        with open(tmp, mode.replace("w", "x")) as file:
+            yield file
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+#Binary format of graphs and hypergraphs, written by serialize(binary=True) and recognized by parse= on its own.
+#All numbers are little-endian and each array starts at a multiple of 8 bytes, so they can be used straight from a memory map without copying them, see read_graph.
+#Each file starts with MAGIC, a byte b"G" for a Graph or b"H" for a HGraph and the version of the format as unsigned short.
+#Graph, followed by the amount of vertices n, of edges m and the length of the names in bytes as unsigned long longs:
+#The adjacency of the outgoing and of the incoming edges, each as ptr (n+1 long longs), tgt (m ints) and mask (m unsigned ints), see cores.Adjacency, then the names of the vertices in utf-8, separated by newlines.
+#HGraph, followed by the amount of vertices, of labels and the lengths of the names of the vertices and of the labels in bytes as unsigned long longs:
+#For each label its arity and amount of edges as unsigned long longs, then for each label the arguments of its edges as ints indexing the vertices, arity many per edge, then the names of the vertices and of the labels in utf-8, separated by newlines.
+MAGIC = b"CoReS"
+VERSION = 1
+
+_HEADER = struct.Struct("<5scH")
+_GRAPH = struct.Struct("<QQQ")
+_HGRAPH = struct.Struct("<QQQQ")
+_LABEL = struct.Struct("<QQ")
+
+#Returns "graph" or "hgraph" if the file at path is in the binary format, None if it isn't.
+def binary_kind(path):
+
+    with open(path, "rb") as file:
+        header = file.read(_HEADER.size)
+
+    if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return None
+
+    return {b"G": "graph", b"H": "hgraph"}.get(_HEADER.unpack(header)[1])
+
+#Hypergraph files start with their listing of vertices "V:", graph files with the vertices themselves. Files in the binary format say what they are in their header.
+def is_hgraph(path):
+
+    if binary_kind(path) != None:
+        return binary_kind(path) == "hgraph"
+
+    with open_text(path) as file:
+        return file.readline().strip() == "V:"
+
+#Writes the array as little-endian and pads it to a multiple of 8 bytes.
+def _write_array(file, data):
+
+    if sys.byteorder == "big":
+        data = array(data.format if isinstance(data, memoryview) else data.typecode, data)
+        data.byteswap()
+
+    file.write(data)
+    file.write(bytes(-memoryview(data).nbytes % 8))
+
+def _write_names(file, names):
+
+    file.write(names)
+    file.write(bytes(-len(names) % 8))
+
+#Maps the file at path into memory and checks its header. Returns the memory map, the offset behind the header and the counts following it.
+def _open_binary(path, kind, counts):
+
+    with open(path, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if data[:len(MAGIC)] != MAGIC or _HEADER.unpack_from(data)[1] != kind:
+        raise Exception("The file \"{}\" is not a {} in the binary format.".format(path, "Graph" if kind == b"G" else "HGraph"))
+
+    version = _HEADER.unpack_from(data)[2]
+    if version != VERSION:
+        raise Exception("The file \"{}\" is in version {} of the binary format, only version {} is supported.".format(path, version, VERSION))
+
+    return data, _HEADER.size+counts.size, counts.unpack_from(data, _HEADER.size)
+
+#Returns length items of type typecode at offset of the memory map and the offset behind it, padded to a multiple of 8 bytes.
+#Unless copy is set, the items are a read-only view of the memory map. On big-endian machines, the items always get copied into an array and swapped.
+def _read_array(data, offset, typecode, length, copy):
+
+    size = array(typecode).itemsize*length
+
+    if copy:
+        view = array(typecode)
+        view.frombytes(data[offset:offset+size])
+    else:
+        view = memoryview(data)[offset:offset+size].cast(typecode)
+
+    if sys.byteorder == "big":
+        view = array(typecode, view) if not copy else view
+        view.byteswap()
+
+    return view, offset+size+(-size % 8)
+
+#Returns the count names of length bytes at offset of the memory map and the offset behind them, padded to a multiple of 8 bytes.
+def _read_names(data, offset, length, count):
+
+    return data[offset:offset+length].decode("utf-8").split("\n") if count else [], offset+length+(-length % 8)
+
+#Writes the vertex names and the adjacency of the outgoing and incoming edges of a Graph in the binary format to path.
+def write_graph(path, names, out, inc):
+
+    names = "\n".join(names).encode("utf-8")
+
+    with open_replace(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, b"G", VERSION))
+        file.write(_GRAPH.pack(len(out.ptr)-1, len(out.tgt), len(names)))
+        for n in (out, inc):
+            _write_array(file, n.ptr)
+            _write_array(file, n.tgt)
+            _write_array(file, n.mask)
+        _write_names(file, names)
+
+#Reads a Graph in the binary format from path.
+#Returns the names of the vertices and the ptr, tgt and mask arrays of the outgoing and of the incoming edges.
+#The arrays get copied out of the file, unless mmap is set: then they are read-only views of the memory mapped file, which load in next to no time, but rely on the file staying as it is for as long as they are in use.
+#Replacing the file via os.replace, like serialize does, is safe, truncating or overwriting it in place is not.
+def read_graph(path, mmap=False):
+
+    data, offset, (n, m, length) = _open_binary(path, b"G", _GRAPH)
+
+    adjacency = []
+
+    for i in range(2):
+        ptr, offset = _read_array(data, offset, "q", n+1, not mmap)
+        tgt, offset = _read_array(data, offset, "i", m, not mmap)
+        mask, offset = _read_array(data, offset, "I", m, not mmap)
+        adjacency.append((ptr, tgt, mask))
+
+    names, offset = _read_names(data, offset, length, n)
+
+    if not mmap:
+        data.close()
+
+    return names, adjacency[0], adjacency[1]
+
+#Writes a HGraph in the binary format to path, given the names of its vertices and a list of its labels as (name, arity, amount of edges, arguments), with the arguments of all edges of a label as flat array of ints indexing the vertices.
+def write_hgraph(path, vertices, labels):
+
+    blob = "\n".join(vertices).encode("utf-8")
+    names = "\n".join(n[0] for n in labels).encode("utf-8")
+
+    with open_replace(path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, b"H", VERSION))
+        file.write(_HGRAPH.pack(len(vertices), len(labels), len(blob), len(names)))
+        for n in labels:
+            file.write(_LABEL.pack(n[1], n[2]))
+        for n in labels:
+            _write_array(file, n[3])
+        _write_names(file, blob)
+        _write_names(file, names)
+
+#Reads a HGraph in the binary format from path.
+#Returns the names of the vertices and a list of its labels in the form taken by write_hgraph, with the arguments copied out of the file or as read-only views of the memory mapped file if mmap is set, see read_graph.
+def read_hgraph(path, mmap=False):
+
+    data, offset, (n, k, vertices_length, names_length) = _open_binary(path, b"H", _HGRAPH)
+
+    sizes = [_LABEL.unpack_from(data, offset+i*_LABEL.size) for i in range(k)]
+    offset += k*_LABEL.size
+
+    args = []
+    for size, count in sizes:
+        view, offset = _read_array(data, offset, "i", size*count, not mmap)
+        args.append(view)
+
+    vertices, offset = _read_names(data, offset, vertices_length, n)
+    names, offset = _read_names(data, offset, names_length, k)
+
+    if not mmap:
+        data.close()
+
+    return vertices, [(names[i], sizes[i][0], sizes[i][1], args[i]) for i in range(k)]
@@ -102,10 +102,12 @@ class Gui:
 
 			if not self.graph == None:
 
-				for n in self.graph.graph:
+				graph = self.graph.graph
+
+				for n in graph:
 					self.text.insert(END, n+" ")
 
-				for (n,m,l) in [(n,m,l) for n in self.graph.graph for m in self.graph.graph[n] for l in self.graph.graph[n][m]]:
+				for (n,m,l) in [(n,m,l) for n in graph for m in graph[n] for l in graph[n][m]]:
 					self.text.insert(END, "\n"+n+" "+m+" "+l)
 
 		else:
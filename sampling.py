@@ -0,0 +1,67 @@
+import math
+import random
+
+#Random sampling for the generators of Graph and HGraph.
+
+#Turns the seed parameter of the generators into a source of randomness: a random.Random instance is used as is, any other seed gets a random.Random of its own and None falls back to the global state of the random module, which random.seed controls.
+def source(seed=None):
+
+    if isinstance(seed, random.Random):
+        return seed
+    elif seed != None:
+        return random.Random(seed)
+
+    return random
+
+#Yields positions out of 0 to total-1 in ascending order, each one independently with the same chance, such that expected of them are yielded on average, i.e. a binomially distributed amount of distinct positions.
+#This takes O(1) per position yielded instead of per position, which allows for total to be astronomically large, e.g. all possible argument tuples of a hyperedge.
+#Usually, the gap to the next position gets drawn directly from its geometric distribution via inversion of a single uniform random number (geometric skip sampling).
+#If the gaps are too large to be drawn exactly as float, the amount of positions gets drawn from the Poisson distribution the binomial one converges to instead, with the positions themselves drawn uniformly and kept distinct via a set.
+def positions(total, expected, rng):
+
+    if expected <= 0 or total <= 0:
+        return
+    elif expected >= total:
+        yield from range(total)
+        return
+    elif expected*2**30 < total:
+        yield from sorted(_distinct(total, min(total, poisson(expected, rng)), rng))
+        return
+
+    log_q = math.log1p(-expected/total)
+
+    k = -1
+
+    while True:
+        #1-random() lies in (0, 1], thus its logarithm is finite
+        k += 1+int(math.log(1-rng.random())/log_q)
+        if k >= total:
+            return
+        yield k
+
+#Returns count distinct positions out of 0 to total-1, drawn uniformly. Positions drawn twice simply get drawn again, which is expected O(count) as long as count is far below total.
+def _distinct(total, count, rng):
+
+    drawn = set()
+
+    while len(drawn) < count:
+        drawn.add(rng.randrange(total))
+
+    return drawn
+
+#Returns a Poisson distributed amount with the given mean, i.e. the amount of arrivals of a Poisson process of rate 1 until time mean, whose gaps are exponentially distributed. Takes O(mean) time.
+def poisson(mean, rng):
+
+    count = 0
+    time = rng.expovariate(1)
+
+    while time < mean:
+        count += 1
+        time += rng.expovariate(1)
+
+    return count
+
+#Returns a binomially distributed amount, i.e. the amount of positions of positions(total, expected, rng).
+def binomial(total, expected, rng):
+
+    return sum(1 for n in positions(total, expected, rng))
@@ -0,0 +1,281 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import CoreCache
+from cnf import TimedBackend, get_backend
+from cores import Graph
+from coresh import HGraph, Vertex, Edge, EdgeInstance
+from fileio import is_hgraph
+
+#Long-running service that calculates cores on request, keeping a pool of worker processes with their imports and solvers warm:
+#python service.py --processes 4                  #JSON lines on stdin and stdout
+#python service.py --socket /tmp/cores.sock       #JSON lines over a local Unix socket, one stream per connection
+#Each line is a request in the form of a JSON object, which gets answered by one line once its core is calculated. Answers get written as soon as they are ready, thus not necessarily in the order of the requests. They carry the id of their request.
+#A request holds exactly one of:
+#graph/hgraph: the graph as text in the format of Graph/HGraph files, or as JSON: {"vertices": [name, ...], "edges": [[source, target, label], ...]} for a graph,
+#              {"vertices": [name, ...], "labels": {label: arity, ...}, "edges": [[label, argument, ...], ...]} for a hypergraph
+#path: the path of a graph or hypergraph file, in any format parse takes
+#Optionally it holds an "id", the "method" "solve" (default) or "z3solve", the "backend" and "encoding" of solve, "minimal", "fold", "timeout", "round_timeout" and "am" for hypergraphs, just like the parameters of solve.
+#The answer holds the id, the type of graph, the amount of vertices and edges of the graph and of its core, whether the core is proven, the amount of solver calls ("rounds"), the core in the same form as the graph was given in,
+#the retraction from the names of the original vertices onto the names of those of the core and the time spent waiting in the queue, parsing, solving, in the solver itself and serializing, or the error that occurred.
+#A request {"id": ..., "ping": true} gets answered right away with {"id": ..., "pong": true}.
+
+#Backends of the worker process by their name, each built on first use and kept warm for all following requests.
+_backends = {}
+
+#Cache of the worker process, see cache.CoreCache, None if no cache is used.
+_cache = None
+
+#Set up a worker process. Ctrl-C is left to the service process, which shuts the pool down.
+def _init(cache, cache_size):
+
+    global _cache
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if cache != None:
+        _cache = CoreCache(cache, cache_size)
+
+def _backend(name):
+
+    if not name in _backends:
+        _backends[name] = get_backend(name)
+
+    return _backends[name]
+
+#Builds a Graph from its JSON form.
+def _graph(data):
+
+    graph = {str(n): {} for n in data["vertices"]}
+
+    if len(graph) != len(data["vertices"]):
+        raise Exception("The vertices have to be distinct.")
+
+    for n in data["edges"]:
+        if len(n) != 3 or not str(n[0]) in graph or not str(n[1]) in graph or not (isinstance(n[2], str) and len(n[2]) == 1 and "A" <= n[2] <= "Z"):
+            raise Exception("Edge {} has to be of the form [source, target, label] with vertices of the graph and a single capital letter as label.".format(json.dumps(n)))
+        graph[str(n[0])].setdefault(str(n[1]), set()).add(n[2])
+
+    g = Graph.__new__(Graph)
+    g.graph = graph
+
+    return g
+
+#Builds a HGraph from its JSON form.
+def _hgraph(data):
+
+    vertices = {str(n): Vertex(str(n)) for n in data["vertices"]}
+
+    if len(vertices) != len(data["vertices"]):
+        raise Exception("The vertices have to be distinct.")
+
+    labels = {n: Edge(n, m) for n,m in data["labels"].items()}
+
+    edges = {}
+
+    for n in data["edges"]:
+        if not n or not n[0] in labels or len(n)-1 != labels[n[0]].size or not all(str(m) in vertices for m in n[1:]):
+            raise Exception("Edge {} has to be of the form [label, argument, ...] with a label of the hypergraph and as many of its vertices as the label has arity.".format(json.dumps(n)))
+        edges.setdefault((n[0], tuple(str(m) for m in n[1:])), EdgeInstance(labels[n[0]], [vertices[str(m)] for m in n[1:]]))
+
+    h = HGraph.__new__(HGraph)
+    h.hgraph = (vertices.values(), edges.values())
+
+    return h
+
+#Returns the JSON form of a Graph or HGraph, see _graph and _hgraph.
+def _json(g):
+
+    if isinstance(g, HGraph):
+        return {"vertices": [n.name for n in g.hgraph[0]], "labels": {n.edge.name: n.edge.size for n in g.hgraph[1]}, "edges": [[n.edge.name]+[m.name for m in n.args] for n in g.hgraph[1]]}
+
+    graph = g.graph
+
+    return {"vertices": list(graph), "edges": [[n, m, l] for n in graph for m in graph[n] for l in sorted(graph[n][m])]}
+
+#Calculates the core of a single request in a worker process and returns its answer.
+def _run(request, queued):
+
+    answer = {"id": request.get("id")}
+    times = {"wait": time.time()-queued}
+
+    #The solve methods report failures on stdout, which is the stream of answers in the service process and gets caught here.
+    messages = io.StringIO()
+
+    try:
+
+        with contextlib.redirect_stdout(messages):
+
+            start = time.perf_counter()
+
+            given = [n for n in ("graph", "hgraph", "path") if n in request]
+            if len(given) != 1:
+                raise Exception("A request has to hold exactly one of graph, hgraph and path.")
+
+            if given[0] == "path":
+                answer["type"] = "hgraph" if is_hgraph(request["path"]) else "graph"
+                g = HGraph(parse=request["path"]) if answer["type"] == "hgraph" else Graph(parse=request["path"])
+            elif isinstance(request[given[0]], str):
+                answer["type"] = given[0]
+                g = HGraph(parse=io.StringIO(request["hgraph"])) if given[0] == "hgraph" else Graph(parse=io.StringIO(request["graph"]))
+            else:
+                answer["type"] = given[0]
+                g = _hgraph(request["hgraph"]) if given[0] == "hgraph" else _graph(request["graph"])
+
+            times["parse"] = time.perf_counter()-start
+
+            answer["vertices"], answer["edges"] = g.counts()
+
+            options = {n: request[n] for n in ("minimal", "fold", "timeout", "round_timeout") if n in request}
+
+            if isinstance(g, HGraph):
+                names = {n: n.name for n in g.hgraph[0]}
+                if "am" in request and request.get("method") != "z3solve":
+                    options["am"] = request["am"]
+
+            if "encoding" in request and request.get("method") != "z3solve":
+                options["encoding"] = request["encoding"]
+
+            start = time.perf_counter()
+            if request.get("method", "solve") == "z3solve":
+                solved = g.z3solve(cache=_cache, **options) not in (None, False)
+                answer["rounds"] = None
+            elif request.get("method", "solve") == "solve":
+                backend = TimedBackend(_backend(request.get("backend")))
+                solved = g.solve(backend=backend, processes=1, cache=_cache, **options) not in (None, False)
+                answer["rounds"] = backend.calls
+                times["solver"] = backend.time
+            else:
+                raise Exception("The method has to be either solve or z3solve.")
+            times["solve"] = time.perf_counter()-start
+
+            if not solved:
+                raise Exception(messages.getvalue().strip())
+
+            answer["core_vertices"], answer["core_edges"] = g.counts()
+            answer["proven"] = g.proven
+
+            start = time.perf_counter()
+            if given[0] == "path" or isinstance(request[given[0]], str):
+                core = io.StringIO()
+                g._write(core)
+                answer["core"] = core.getvalue()
+            else:
+                answer["core"] = _json(g)
+            if isinstance(g, HGraph):
+                answer["retraction"] = {names[n]: names[m] for n,m in g.retraction().items()}
+            else:
+                answer["retraction"] = g.retraction()
+            times["serialize"] = time.perf_counter()-start
+
+    except Exception as e:
+        answer["error"] = str(e)
+
+    answer["time"] = times
+
+    return answer
+
+#Answers the requests of a stream of JSON lines on a pool of worker processes, writing each answer to write as soon as it is ready.
+#Returns once all answers have been written.
+def serve(lines, write, pool):
+
+    done = threading.Condition()
+    pending = 0
+
+    def answer(answer):
+        with done:
+            write(json.dumps(answer)+"\n")
+
+    def finish(job, id):
+        nonlocal pending
+        answer(job.result() if job.exception() == None else {"id": id, "error": str(job.exception())})
+        with done:
+            pending -= 1
+            done.notify()
+
+    for n in lines:
+
+        if not n.strip():
+            continue
+
+        try:
+            request = json.loads(n)
+            if not isinstance(request, dict):
+                raise ValueError("A request has to be a JSON object.")
+        except ValueError as e:
+            answer({"id": None, "error": str(e)})
+            continue
+
+        if request.get("ping"):
+            answer({"id": request.get("id"), "pong": True})
+            continue
+
+        with done:
+            pending += 1
+
+        pool.submit(_run, request, time.time()).add_done_callback(lambda job, id=request.get("id"): finish(job, id))
+
+    with done:
+        done.wait_for(lambda: pending == 0)
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Calculate cores on request, answering JSON lines on stdin/stdout or a Unix socket.")
+    parser.add_argument("-s", "--socket", help="path of a Unix socket to listen on instead of stdin/stdout")
+    parser.add_argument("-p", "--processes", type=int, help="amount of worker processes, one per CPU by default")
+    parser.add_argument("--cache", help="directory of a cache of cores shared by all workers, see cache.CoreCache")
+    parser.add_argument("--cache-size", type=int, default=1<<30, help="bytes the cache may take up before the least recently used cores get removed (default: 1 GiB)")
+    args = parser.parse_args(argv)
+
+    with ProcessPoolExecutor(args.processes, initializer=_init, initargs=(args.cache, args.cache_size)) as pool:
+
+        if args.socket == None:
+
+            def write(line):
+                sys.stdout.write(line)
+                sys.stdout.flush()
+
+            serve(sys.stdin, write, pool)
+
+            return 0
+
+        import socketserver
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def handle(self):
+
+                def write(line):
+                    try:
+                        self.wfile.write(line.encode())
+                        self.wfile.flush()
+                    except OSError:
+                        #The client is gone, its answers get dropped
+                        pass
+
+                serve(io.TextIOWrapper(self.rfile, encoding="utf-8"), write, pool)
+
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(args.socket)
+
+        with socketserver.ThreadingUnixStreamServer(args.socket, Handler) as server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(args.socket)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
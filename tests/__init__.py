@@ -0,0 +1,46 @@
+import glob
+import os
+import shutil
+import unittest
+
+#Tests of CoReS, run from the root of the repository via python -m pytest tests or python -m unittest discover -s tests -t .
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+#The bundled graphs and hypergraphs
+GRAPHS = sorted(glob.glob(os.path.join(ROOT, "graphs", "*.txt")))
+HGRAPHS = sorted(glob.glob(os.path.join(ROOT, "hgraphs", "*.txt")))
+
+#Sizes of the cores of the bundled graphs and hypergraphs as (vertices, edges), as calculated by z3solve before any of the optimizations, which every way of calculating them has to agree on.
+#hgraph12 is empty, which the original z3solve failed on.
+CORES = {
+    "graph1.txt": (5, 4), "graph2.txt": (8, 7), "graph3.txt": (1, 1), "graph4.txt": (8, 8), "graph5.txt": (1, 1),
+    "graph6.txt": (1, 1), "graph7.txt": (2, 2), "graph8.txt": (4, 3), "graph9.txt": (27, 35), "graph10.txt": (5, 4),
+    "hgraph1.txt": (3, 3), "hgraph2.txt": (2, 1), "hgraph3.txt": (1, 1), "hgraph4.txt": (2, 2), "hgraph5.txt": (2, 4), "hgraph6.txt": (1, 0),
+    "hgraph7.txt": (1, 2), "hgraph8.txt": (6, 10), "hgraph9.txt": (7, 9), "hgraph10.txt": (4, 2), "hgraph11.txt": (3, 3), "hgraph12.txt": (0, 0),
+}
+
+#Returns the size of the core of the bundled graph or hypergraph at path, see CORES.
+def core_size(path):
+
+    return CORES[os.path.basename(path)]
+
+#Returns the name of a DIMACS solver on the PATH, skipping the calling test if there is none.
+def dimacs_solver():
+
+    from cnf import DIMACS_SOLVERS
+
+    for n in DIMACS_SOLVERS:
+        if shutil.which(n) != None:
+            return n
+
+    raise unittest.SkipTest("No DIMACS solver on the PATH.")
+
+#Skips the calling test if z3py isn't installed.
+def require_z3():
+
+    try:
+        import z3
+        z3.Solver
+    except (ImportError, AttributeError):
+        raise unittest.SkipTest("z3py is not installed.")
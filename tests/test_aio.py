@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from cnf import DimacsBackend
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, core_size, dimacs_solver, require_z3
+
+def parse(path):
+
+    return HGraph(parse=path) if path in HGRAPHS else Graph(parse=path)
+
+#Backend without solve_async, which counts how many of its calls run at once
+class Counting:
+
+    def __init__(self, backend):
+
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+
+        try:
+            time.sleep(0.01)
+            return self.backend.solve(cnf, assumptions, budget)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+class AsyncTest(unittest.TestCase):
+
+    #Calculations awaited at the same time find the same cores as solve
+    def test_solve(self):
+
+        backend = dimacs_solver()
+        graphs = [parse(n) for n in GRAPHS+HGRAPHS]
+
+        async def main():
+            return await asyncio.gather(*[n.solve_async(backend=backend) for n in graphs])
+
+        results = asyncio.run(main())
+
+        for path,g,r in zip(GRAPHS+HGRAPHS, graphs, results):
+            with self.subTest(path=path):
+                self.assertEqual(g.counts(), core_size(path))
+                self.assertTrue(g.proven)
+                self.assertNotEqual(r, None)
+
+    def test_z3solve(self):
+
+        require_z3()
+
+        graphs = [parse(n) for n in GRAPHS+HGRAPHS]
+
+        async def main():
+            semaphore = asyncio.BoundedSemaphore(2)
+            return await asyncio.gather(*[n.z3solve_async(semaphore=semaphore) for n in graphs])
+
+        asyncio.run(main())
+
+        for path,g in zip(GRAPHS+HGRAPHS, graphs):
+            with self.subTest(path=path):
+                self.assertEqual(g.counts(), core_size(path))
+
+    #Backends without solve_async run in the executor, at most as many at once as the semaphore allows
+    def test_semaphore(self):
+
+        backend = Counting(DimacsBackend(dimacs_solver()))
+        graphs = [parse(n) for n in GRAPHS]
+
+        async def main():
+            semaphore = asyncio.BoundedSemaphore(1)
+            await asyncio.gather(*[n.solve_async(backend=backend, semaphore=semaphore) for n in graphs])
+
+        asyncio.run(main())
+
+        self.assertEqual(backend.most, 1)
+        self.assertTrue(all(g.counts() == core_size(n) for n,g in zip(GRAPHS, graphs)))
+
+    #The event loop stays free while a solver binary runs, and cancelling the task stops it, leaving the graph at a retract that is not proven to be the core
+    def test_cancel(self):
+
+        g = parse(GRAPHS[0])
+
+        async def main():
+            task = asyncio.ensure_future(g.solve_async(backend=DimacsBackend("sleep", "30")))
+            start = time.monotonic()
+            for i in range(20):
+                await asyncio.sleep(0.01)
+            ticks = time.monotonic()-start
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return ticks
+
+        start = time.monotonic()
+        self.assertLess(asyncio.run(main()), 5)
+        self.assertLess(time.monotonic()-start, 10)
+        self.assertFalse(g.proven)
+        self.assertLessEqual(g.counts()[0], parse(GRAPHS[0]).counts()[0])
@@ -0,0 +1,192 @@
+import itertools
+import random
+import time
+import unittest
+
+from cnf import CNF, DimacsBackend, Interrupted, LimbooleBackend, PortfolioBackend, Z3Backend, get_backend
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, core_size, dimacs_solver, require_z3
+
+#A backend that always fails, which must not keep the race from being won by another one
+class Failing:
+
+    def solve(self, cnf, assumptions=(), budget=None):
+
+        raise Exception("failure")
+
+#Returns random CNFs of 3 literals per clause over 6 variables, around the threshold at which they stop being satisfiable
+def formulas(count):
+
+    rng = random.Random(0)
+
+    for i in range(count):
+        formula = CNF()
+        for n in range(6):
+            formula.new()
+        for n in range(rng.randint(20, 32)):
+            formula.add([rng.choice((-1, 1))*m for m in rng.sample(range(1, 7), 3)])
+        yield formula
+
+def satisfied(formula, model, assumptions=()):
+
+    return all(any((abs(m) in model) == (m > 0) for m in n) for n in formula.clauses+[[n] for n in assumptions])
+
+def satisfiable(formula, assumptions=()):
+
+    return any(satisfied(formula, {n+1 for n,v in enumerate(values) if v}, assumptions) for values in itertools.product((False, True), repeat=formula.n_vars))
+
+#Each backend has to find a model exactly if there is one, under the given assumptions.
+class BackendTest(unittest.TestCase):
+
+    def assertSolves(self, backend):
+
+        for formula in formulas(40):
+            for assumptions in ((), (1, -2)):
+                model = backend.solve(formula, assumptions)
+                self.assertEqual(model != None, satisfiable(formula, assumptions))
+                if model != None:
+                    self.assertTrue(satisfied(formula, model, assumptions))
+
+    def test_dimacs(self):
+
+        self.assertSolves(DimacsBackend(dimacs_solver()))
+
+    def test_z3(self):
+
+        require_z3()
+        self.assertSolves(Z3Backend())
+
+    #z3 keeps its solver as long as it gets the same CNF, only adding the clauses added since
+    def test_z3_incremental(self):
+
+        require_z3()
+
+        backend = Z3Backend()
+        formula = CNF()
+        a, b = formula.new(), formula.new()
+        formula.add([a, b])
+
+        self.assertTrue(satisfied(formula, backend.solve(formula, [-a])))
+        formula.add([-b])
+        self.assertEqual(backend.solve(formula, [-a]), None)
+        self.assertEqual(backend.solve(formula), {a})
+
+    def test_missing_solver(self):
+
+        with self.assertRaises(Exception):
+            DimacsBackend("no-such-solver")
+
+    def test_dimacs_format(self):
+
+        formula = CNF()
+        a, b = formula.new(), formula.new()
+        formula.add([a, -b])
+        formula.add([b])
+
+        self.assertEqual("".join(formula.lines([-a])), "p cnf 2 3\n1 -2 0\n2 0\n-1 0\n")
+
+    def test_limboole_format(self):
+
+        formula = CNF()
+        a, b = formula.new(), formula.new()
+        formula.add([a, -b])
+        formula.add([])
+
+        self.assertEqual("".join(LimbooleBackend._lines(formula, [b])), "(v1 | !v2)&\n(v1 & !v1)&\n(v2)")
+        self.assertEqual("".join(LimbooleBackend._lines(CNF(), [])), "v1 | !v1")
+
+class PortfolioTest(unittest.TestCase):
+
+    def test_race(self):
+
+        backend = dimacs_solver()
+
+        for path in GRAPHS:
+            with self.subTest(path=path):
+
+                portfolio = PortfolioBackend(backend, Failing())
+
+                g = Graph(parse=path)
+                g.solve(backend=portfolio, fold=False)
+                h = Graph(parse=path)
+                h.solve(backend=backend, fold=False)
+
+                self.assertEqual(g.counts(), h.counts())
+                self.assertEqual(sum(portfolio.wins.values()), len(portfolio.results))
+                self.assertEqual(portfolio.wins["Failing"], 0)
+                self.assertTrue(all(n["winner"] == portfolio.names[0] for n in portfolio.results))
+
+    def test_all_fail(self):
+
+        formula = CNF()
+        formula.add([formula.new()])
+
+        with self.assertRaisesRegex(Exception, "failure"):
+            PortfolioBackend(Failing(), Failing()).solve(formula)
+
+    #The SMT encoding races the retract rounds and its wins get counted under their own key.
+    #Other searches, e.g. for the homomorphisms between components, take a CNF only, thus there is a SAT solver in the race as well.
+    def test_smt(self):
+
+        require_z3()
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+
+                portfolio = PortfolioBackend("smt", dimacs_solver())
+
+                g = HGraph(parse=path) if path in HGRAPHS else Graph(parse=path)
+                g.solve(backend=portfolio, fold=False)
+
+                self.assertEqual(g.counts(), core_size(path))
+                self.assertEqual(set(portfolio.wins), {"smt", portfolio.names[0]})
+                self.assertEqual(sum(portfolio.wins.values()), len(portfolio.results))
+
+        #Without any SAT solver that could win, the SMT encoding wins every retract round
+        portfolio = PortfolioBackend("smt", Failing())
+        g = Graph(parse=GRAPHS[0])
+        g.solve(backend=portfolio, fold=False)
+
+        self.assertEqual(g.counts(), core_size(GRAPHS[0]))
+        self.assertEqual(portfolio.wins, {"smt": len(portfolio.results), "Failing": 0})
+        self.assertGreater(portfolio.wins["smt"], 0)
+
+    #The losers of the race get cancelled via the budget, the SMT encoding included
+    def test_smt_cancelled(self):
+
+        require_z3()
+
+        cancelled = []
+
+        def smt(budget):
+            start = time.monotonic()
+            while not budget.cancelled() and time.monotonic()-start < 10:
+                time.sleep(0.01)
+            cancelled.append(budget.cancelled())
+            raise Interrupted("cancelled")
+
+        formula = CNF()
+        a = formula.new()
+        formula.add([a])
+
+        portfolio = PortfolioBackend("smt", dimacs_solver())
+
+        self.assertEqual(portfolio.race(formula, (), None, lambda model: [[a, a]] if a in model else [], smt), [[a, a]])
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(portfolio.wins["smt"], 0)
+
+    #The SMT encoding needs a graph, thus it can't solve a CNF on its own
+    def test_smt_only(self):
+
+        require_z3()
+
+        formula = CNF()
+        formula.add([formula.new()])
+
+        with self.assertRaises(Exception):
+            PortfolioBackend("smt").solve(formula)
+
+    def test_get_backend(self):
+
+        self.assertIsInstance(get_backend("portfolio"), PortfolioBackend)
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import batch
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, ROOT, core_size, dimacs_solver, require_z3
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    #Runs batch.main with the given arguments and returns its exit code and the records it wrote by file
+    def run_main(self, *args):
+
+        path = os.path.join(self.directory, "records.jsonl")
+        code = batch.main(list(args)+["--records", path])
+
+        with open(path) as file:
+            records = [json.loads(n) for n in file]
+
+        return code, {n["file"]: n for n in records}
+
+    #Each bundled file gets a record with the size of its core and a file holding the core, which parses back to the same size
+    def test_fixtures(self):
+
+        out = os.path.join(self.directory, "cores")
+        code, records = self.run_main(os.path.join(ROOT, "graphs"), os.path.join(ROOT, "hgraphs", "*.txt"), "--out", out, "--backend", dimacs_solver(), "-p", "2")
+
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(records), sorted(GRAPHS+HGRAPHS))
+
+        for path,n in records.items():
+            with self.subTest(path=path):
+                self.assertNotIn("error", n)
+                self.assertEqual(n["type"], "hgraph" if path in HGRAPHS else "graph")
+                self.assertEqual((n["core_vertices"], n["core_edges"]), core_size(path))
+                self.assertGreaterEqual(n["rounds"], 0)
+                core = (HGraph if path in HGRAPHS else Graph)(parse=n["core"])
+                self.assertEqual(core.counts(), core_size(path))
+                self.assertEqual(n["core"], os.path.join(out, os.path.relpath(path, ROOT)))
+                self.assertTrue(all(n["time"][m] >= 0 for m in ("parse", "encode", "solver", "reduce", "solve", "write")))
+
+    #Files of the same name in different directories get their cores written to different paths
+    def test_same_name(self):
+
+        inputs = []
+        for n,m in (("a", GRAPHS[0]), ("b", GRAPHS[1])):
+            os.makedirs(os.path.join(self.directory, n))
+            inputs.append(shutil.copy(m, os.path.join(self.directory, n, "graph.txt")))
+
+        out = os.path.join(self.directory, "cores")
+        code, records = self.run_main(*inputs, "--out", out, "--backend", dimacs_solver(), "-p", "1")
+
+        self.assertEqual(code, 0)
+        for n,m,l in zip(inputs, ("a", "b"), GRAPHS):
+            self.assertEqual(records[n]["core"], os.path.join(out, m, "graph.txt"))
+            self.assertEqual(Graph(parse=records[n]["core"]).counts(), core_size(l))
+
+    #The SMT approach gets timed per phase as well
+    def test_smt_phases(self):
+
+        require_z3()
+
+        code, records = self.run_main(GRAPHS[0], "--smt", "--no-fold", "-p", "1")
+
+        self.assertEqual(code, 0)
+        self.assertGreater(records[GRAPHS[0]]["time"]["solver"], 0)
+        self.assertEqual(set(records[GRAPHS[0]]["time"]), {"parse", "encode", "solver", "reduce", "solve"})
+
+    #A file that can't be parsed gets a record holding the error and makes the exit code 1, the other files still get solved
+    def test_error(self):
+
+        path = os.path.join(self.directory, "broken.txt")
+        with open(path, "w") as file:
+            file.write("1 2\n1 3 A\n")
+
+        code, records = self.run_main(path, GRAPHS[0], "--backend", dimacs_solver(), "-p", "1")
+
+        self.assertEqual(code, 1)
+        self.assertIn("error", records[path])
+        self.assertEqual((records[GRAPHS[0]]["core_vertices"], records[GRAPHS[0]]["core_edges"]), core_size(GRAPHS[0]))
+
+    def test_files(self):
+
+        self.assertEqual(batch._files([os.path.join(ROOT, "graphs"), os.path.join(ROOT, "hgraphs", "hgraph1*.txt")]), GRAPHS+sorted(n for n in HGRAPHS if os.path.basename(n).startswith("hgraph1")))
+        self.assertEqual(batch._files([GRAPHS[0], os.path.join(ROOT, "graphs")]), GRAPHS)
+
+    def test_targets(self):
+
+        self.assertEqual(batch._targets(GRAPHS[:1], "cores"), [os.path.join("cores", os.path.basename(GRAPHS[0]))])
+        self.assertEqual(batch._targets([GRAPHS[0], HGRAPHS[0]], "cores"), [os.path.join("cores", "graphs", os.path.basename(GRAPHS[0])), os.path.join("cores", "hgraphs", os.path.basename(HGRAPHS[0]))])
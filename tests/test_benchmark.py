@@ -0,0 +1,106 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import benchmark
+from tests import GRAPHS, HGRAPHS, core_size, dimacs_solver
+
+class CasesTest(unittest.TestCase):
+
+    #Returns the text of each generated case by its key
+    def generated(self, seeds):
+
+        args = argparse.Namespace(no_fixtures=True, no_gen=False, full=False, seeds=seeds)
+        texts = {}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for key,path,hyper in benchmark._cases(args, tmp):
+                with open(path) as file:
+                    texts[key] = file.read()
+
+        return texts
+
+    def test_seeds(self):
+
+        first = self.generated([0, 1])
+
+        self.assertEqual(len(first), 2*(len(benchmark.GRAPH_SWEEP)+len(benchmark.HGRAPH_SWEEP)))
+        self.assertEqual(self.generated([0, 1]), first)
+
+        #Cases of different seeds get different graphs
+        for n in benchmark.GRAPH_SWEEP:
+            self.assertNotEqual(first["Graph(gen={}) seed=0".format(n)], first["Graph(gen={}) seed=1".format(n)])
+
+#Results of a single case in the form of benchmark._run
+def result(core=(1, 1), solve=1.0, peak_memory=1<<20):
+
+    return {"parse": 0.01, "encode": 0.1, "solver": solve-0.2, "reduce": 0.1, "solve": solve, "variables": 10, "clauses": 20, "peak_memory": peak_memory, "core": list(core)}
+
+class CompareTest(unittest.TestCase):
+
+    def test_regressions(self):
+
+        baseline = {"same": result(), "core": result(), "slower": result(), "memory": result(), "new": result()}
+        results = {"same": result(solve=1.1), "core": result(core=(2, 1)), "slower": result(solve=2.0), "memory": result(peak_memory=1<<22), "gone": result()}
+        del baseline["new"]
+
+        regressions = benchmark.compare(results, baseline, 0.25, 0.05)
+
+        self.assertEqual(sorted(n.split(":")[0] for n in regressions), ["core", "memory", "slower", "slower"])
+        self.assertIn("core changed from [1, 1] to [2, 1]", regressions[0])
+
+    #Times that grew by less than min_time never count, no matter how much they grew relative to the baseline
+    def test_min_time(self):
+
+        self.assertEqual(benchmark.compare({"tiny": result(solve=0.04)}, {"tiny": result(solve=0.01)}, 0.25, 0.05), [])
+        self.assertEqual(len(benchmark.compare({"tiny": result(solve=0.04)}, {"tiny": result(solve=0.01)}, 0.25, 0.0)), 2)
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    #Runs benchmark.main with the given arguments, returns its exit code and what it printed
+    def run_main(self, *args):
+
+        output = io.StringIO()
+
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            code = benchmark.main(list(args))
+
+        return code, output.getvalue()
+
+    #The results on the fixtures hold their cores, and comparing them to themselves finds no regression unlike comparing them to a baseline with other cores
+    def test_fixtures(self):
+
+        out = os.path.join(self.directory, "results.json")
+        code, output = self.run_main("--no-gen", "--backends", dimacs_solver(), "--out", out)
+
+        self.assertEqual(code, 0)
+
+        with open(out) as file:
+            results = json.load(file)["results"]
+
+        self.assertEqual(len(results), len(GRAPHS)+len(HGRAPHS))
+        for n in GRAPHS+HGRAPHS:
+            key = "{}/{} backend={}".format(os.path.basename(os.path.dirname(n)), os.path.basename(n), dimacs_solver())
+            self.assertEqual(tuple(results[key]["core"]), core_size(n))
+
+        code, output = self.run_main("--no-gen", "--backends", dimacs_solver(), "--baseline", out, "--threshold", "100", "--min-time", "10")
+        self.assertEqual(code, 0)
+        self.assertIn("No regressions", output)
+
+        results[key]["core"] = [0, 0]
+        with open(out, "w") as file:
+            json.dump({"results": results}, file)
+
+        code, output = self.run_main("--no-gen", "--backends", dimacs_solver(), "--baseline", out, "--threshold", "100", "--min-time", "10")
+        self.assertEqual(code, 1)
+        self.assertEqual(output.count("Regression: "), 1)
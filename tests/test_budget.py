@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+import unittest
+
+from cnf import Budget, DimacsBackend, Interrupted
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, ROOT, core_size, dimacs_solver, require_z3
+
+#A solver that never answers in time, standing in for a hard instance
+def hanging():
+
+    return DimacsBackend("sleep", "30")
+
+class BudgetTest(unittest.TestCase):
+
+    def test_limits(self):
+
+        self.assertEqual(Budget().remaining(), None)
+        self.assertEqual(Budget(round_timeout=2).remaining(), 2)
+        self.assertLessEqual(Budget(10, 2).remaining(), 2)
+        self.assertLessEqual(Budget(1, 2).remaining(), 1)
+
+        Budget(10).check()
+        with self.assertRaises(Interrupted):
+            Budget(0).check()
+
+        cancel = threading.Event()
+        budget = Budget(cancel=cancel)
+        budget.check()
+        cancel.set()
+        with self.assertRaises(Interrupted):
+            budget.check()
+
+    #The solver process gets killed once the budget runs out instead of being waited for
+    def test_kill(self):
+
+        start = time.monotonic()
+        with self.assertRaises(Interrupted):
+            Budget(round_timeout=0.2).run(["sleep", "30"], None)
+        self.assertLess(time.monotonic()-start, 10)
+
+#Returns a new Graph or HGraph parsed from path along with its edges, see AnytimeTest.assertRetract
+def parse(path):
+
+    if path in HGRAPHS:
+        g = HGraph(parse=path)
+        return g, [(n.edge, n.args) for n in g.hgraph[1]]
+
+    g = Graph(parse=path)
+    return g, g.graph
+
+#Cutting the calculation short leaves the graph at a retract of itself, which is not proven to be the core.
+class AnytimeTest(unittest.TestCase):
+
+    #Asserts that the retraction maps the edges of the original graph, as returned by parse, onto edges of the graph left behind, which is not proven to be its core.
+    #The empty hypergraph is its own core without a single round, thus it is proven right away.
+    def assertRetract(self, g, edges):
+
+        r = g.retraction()
+
+        if isinstance(g, HGraph):
+            self.assertEqual(g.proven, not r)
+            present = {(n.edge, n.args) for n in g.hgraph[1]}
+            self.assertTrue(all((n, tuple(r[l] for l in m)) in present for n,m in edges))
+        else:
+            self.assertFalse(g.proven)
+            self.assertEqual(set(r), set(edges))
+            self.assertTrue(all(edges[r[n]].get(r[m], set()) >= edges[n][m] for n in edges for m in edges[n]))
+
+    #A timeout of 0 stops before the first round
+    def test_timeout(self):
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+                g, edges = parse(path)
+                vertices = g.counts()
+                g.solve(backend=dimacs_solver(), timeout=0)
+                self.assertRetract(g, edges)
+                self.assertEqual(g.counts(), vertices)
+
+    def test_z3solve(self):
+
+        require_z3()
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+                g, edges = parse(path)
+                g.z3solve(timeout=0)
+                self.assertRetract(g, edges)
+
+    #Folding needs no solver, thus it still gets applied when the solver runs out of time. graph6 and hgraph3 fold all the way down to their cores.
+    def test_round_timeout(self):
+
+        for path in (os.path.join(ROOT, "graphs", "graph6.txt"), os.path.join(ROOT, "hgraphs", "hgraph3.txt"), GRAPHS[0], HGRAPHS[0]):
+            g, edges = parse(path)
+            start = time.monotonic()
+            g.solve(backend=hanging(), round_timeout=0.2)
+            self.assertLess(time.monotonic()-start, 10)
+            if path in (GRAPHS[0], HGRAPHS[0]):
+                self.assertRetract(g, edges)
+            else:
+                self.assertEqual(g.counts(), core_size(path))
+
+    #Setting cancel from another thread stops the solver right away
+    def test_cancel(self):
+
+        for path in (GRAPHS[0], HGRAPHS[0]):
+            g, edges = parse(path)
+            cancel = threading.Event()
+            timer = threading.Timer(0.2, cancel.set)
+            timer.start()
+            start = time.monotonic()
+            g.solve(backend=hanging(), cancel=cancel)
+            timer.join()
+            self.assertLess(time.monotonic()-start, 10)
+            self.assertRetract(g, edges)
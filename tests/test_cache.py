@@ -0,0 +1,163 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+import cache
+from cache import Canonical, CoreCache
+from cores import Graph
+from tests import GRAPHS, dimacs_solver
+
+#Undirected edges as pairs of directed edges with label 1
+def undirected(pairs):
+
+    return [(1, (a, b)) for a,b in pairs]+[(1, (b, a)) for a,b in pairs]
+
+def cycle(n, offset=0):
+
+    return undirected([(offset+m, offset+(m+1)%n) for m in range(n)])
+
+#Renames the vertices by the permutation p and shuffles the edges
+def rename(edges, p, rng):
+
+    edges = [(label, tuple(p[m] for m in args)) for label,args in edges]
+    rng.shuffle(edges)
+
+    return edges
+
+#K3,3 next to the prism, both 3-regular on 6 vertices, so refinement alone can't tell any two vertices apart
+TWO_CUBIC = undirected([(a, b) for a in range(3) for b in range(3, 6)]+[(6, 7), (7, 8), (8, 6), (9, 10), (10, 11), (11, 9), (6, 9), (7, 10), (8, 11)])
+
+class CanonicalTest(unittest.TestCase):
+
+    def assertInvariant(self, n, edges, renamings=10):
+
+        rng = random.Random(n)
+        form = Canonical("graph", n, edges)
+
+        self.assertTrue(form.exhaustive)
+        self.assertEqual(sorted(form.order), list(range(n)))
+        self.assertEqual([form.index[m] for m in form.order], list(range(n)))
+
+        for i in range(renamings):
+            p = list(range(n))
+            rng.shuffle(p)
+            other = Canonical("graph", n, rename(edges, p, rng))
+            self.assertEqual(other.key, form.key)
+            self.assertEqual(other.edges, form.edges)
+
+    def test_asymmetric(self):
+
+        rng = random.Random(0)
+        edges = [(rng.randint(1, 3), (rng.randrange(30), rng.randrange(30))) for i in range(80)]
+
+        self.assertInvariant(30, edges)
+
+    def test_symmetric(self):
+
+        petersen = undirected([(m, (m+1)%5) for m in range(5)]+[(m, m+5) for m in range(5)]+[(m+5, (m+2)%5+5) for m in range(5)])
+        grid = undirected([(4*m+l, 4*m+l+1) for m in range(4) for l in range(3)]+[(4*m+l, 4*m+l+4) for m in range(3) for l in range(4)])
+
+        self.assertInvariant(12, cycle(12))
+        self.assertInvariant(12, cycle(6)+cycle(6, 6))
+        self.assertInvariant(10, petersen)
+        self.assertInvariant(16, grid)
+        self.assertInvariant(12, TWO_CUBIC)
+        self.assertInvariant(50, [(1, (0, m)) for m in range(1, 40)])
+
+    def test_hyperedges(self):
+
+        edges = [(("E", 3), (0, 1, 2)), (("E", 3), (2, 3, 4)), (("E", 3), (4, 5, 0)), (("F", 1), (1,)), (("F", 1), (3,)), (("F", 1), (5,))]
+
+        self.assertInvariant(6, edges)
+
+    def test_empty(self):
+
+        self.assertEqual(Canonical("graph", 0, []).edges, [])
+        self.assertInvariant(5, [])
+
+    #Beyond MAX_LEAVES the numbering may depend on the names of the vertices, which the variants of an entry make up for.
+    def test_budget(self):
+
+        with mock.patch.object(cache, "MAX_LEAVES", 1):
+            forms = [Canonical("graph", 12, TWO_CUBIC), Canonical("graph", 12, rename(TWO_CUBIC, [(m+6)%12 for m in range(12)], random.Random(0)))]
+
+        self.assertFalse(forms[0].exhaustive)
+        self.assertEqual(forms[0].key, forms[1].key)
+        self.assertNotEqual(forms[0].edges, forms[1].edges)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        c = CoreCache(directory)
+
+        c.put(forms[0], list(range(12)))
+        self.assertEqual(c.get(forms[1]), None)
+        c.put(forms[1], list(range(12)))
+
+        self.assertEqual(c.get(forms[0]), list(range(12)))
+        self.assertEqual(c.get(forms[1]), list(range(12)))
+        self.assertEqual((c.hits, c.misses), (2, 1))
+
+class CoreCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    #The retraction comes back in terms of the names of the graph it gets looked up with
+    def test_renamed_hit(self):
+
+        rng = random.Random(1)
+        #A directed path through all vertices leaves no automorphisms, under which the retraction would have to look the same
+        edges = [(3, (m, m+1)) for m in range(19)]+[(rng.randint(1, 2), (rng.randrange(20), rng.randrange(20))) for i in range(20)]
+        retraction = [rng.randrange(20) for m in range(20)]
+
+        p = list(range(20))
+        rng.shuffle(p)
+
+        c = CoreCache(self.directory)
+        c.put(Canonical("graph", 20, edges), retraction)
+
+        self.assertEqual(c.get(Canonical("graph", 20, rename(edges, p, rng))), [p[retraction[m]] for m in sorted(range(20), key=lambda m: p[m])])
+        self.assertEqual(c.get(Canonical("hgraph", 20, edges)), None)
+        self.assertEqual((c.hits, c.misses), (1, 1))
+
+    def test_solve_hit(self):
+
+        backend = dimacs_solver()
+
+        g = Graph(parse=GRAPHS[0])
+        g.solve(backend=backend, cache=self.directory)
+
+        h = Graph(parse=GRAPHS[0])
+        c = CoreCache(self.directory)
+        h.solve(backend=backend, cache=c)
+
+        self.assertEqual(c.hits, 1)
+        self.assertEqual(h.counts(), g.counts())
+        self.assertEqual(h.retraction(), g.retraction())
+
+    def test_least_recently_used(self):
+
+        #Paths with different labels, whose entries all take up the same space
+        forms = [Canonical("graph", 3, [(label, (0, 1)), (label, (1, 2))]) for label in range(1, 5)]
+
+        c = CoreCache(self.directory)
+        for n in forms[:3]:
+            c.put(n, [0, 1, 2])
+
+        paths = [c._path(n) for n in forms]
+        for i,n in enumerate(paths[:3]):
+            os.utime(n, (1000*(i+1), 1000*(i+1)))
+
+        #Reading the oldest entry makes the second one the least recently used
+        self.assertEqual(c.get(forms[0]), [0, 1, 2])
+
+        c.max_bytes = 3*os.path.getsize(paths[0])
+        c.put(forms[3], [0, 1, 2])
+
+        self.assertEqual([os.path.exists(n) for n in paths], [True, False, True, True])
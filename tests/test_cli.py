@@ -0,0 +1,107 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import cli
+
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, ROOT, dimacs_solver, require_z3
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    #Runs cli.main and returns its exit code and what it printed.
+    def main(self, kind, *argv):
+
+        out = io.StringIO()
+
+        with contextlib.redirect_stdout(out):
+            code = cli.main(kind, list(argv))
+
+        return code, out.getvalue()
+
+    def test_parse(self):
+
+        code, out = self.main("graph", "parse", GRAPHS[0])
+
+        self.assertEqual(code, 0)
+        self.assertIn("{} vertices, {} edges".format(*Graph(parse=GRAPHS[0]).counts()), out)
+
+    def test_parse_invalid(self):
+
+        path = os.path.join(self.tmp.name, "bad.txt")
+        with open(path, "w") as file:
+            file.write("not a graph\n")
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(self.main("graph", "parse", path)[0], 1)
+
+    def test_serialize(self):
+
+        path = os.path.join(self.tmp.name, "graph.bin")
+
+        self.assertEqual(self.main("graph", "serialize", GRAPHS[0], path, "--binary")[0], 0)
+        self.assertEqual(Graph(parse=path).graph, Graph(parse=GRAPHS[0]).graph)
+
+    def test_solve(self):
+
+        path = os.path.join(self.tmp.name, "core.txt")
+
+        code, out = self.main("graph", "solve", GRAPHS[0], "--backend", dimacs_solver(), "--out", path)
+
+        g = Graph(parse=GRAPHS[0])
+        g.solve(backend=dimacs_solver())
+
+        self.assertEqual(code, 0)
+        self.assertIn("core: {} vertices, {} edges, proven".format(*g.counts()), out)
+        self.assertEqual(Graph(parse=path).graph, g.graph)
+
+    #HGraph.z3solve reports success just like HGraph.solve, so the core gets written.
+    def test_solve_smt_hgraph(self):
+
+        require_z3()
+
+        path = os.path.join(self.tmp.name, "core.txt")
+
+        code, out = self.main("hgraph", "solve", HGRAPHS[-1], "--smt", "--out", path)
+
+        h = HGraph(parse=HGRAPHS[-1])
+        h.z3solve()
+
+        self.assertEqual(code, 0)
+        self.assertIn("core: {} vertices, {} edges, proven".format(*h.counts()), out)
+        self.assertEqual(HGraph(parse=path).counts(), h.counts())
+
+    def test_no_am_with_smt(self):
+
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.main("hgraph", "solve", HGRAPHS[0], "--smt", "--no-am")
+
+#Runs python with the given arguments from the root of the repository and returns what it printed
+def python(*args):
+
+    return subprocess.run([sys.executable]+list(args), cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True).stdout
+
+class EntryPointTest(unittest.TestCase):
+
+    #Parsing, serializing and the SAT encoding don't import z3, scipy or graphviz
+    def test_lazy_imports(self):
+
+        out = python("-c", "import sys, cores, coresh, cli\ncores.Graph(parse=sys.argv[1]).solve(backend=sys.argv[2])\nprint(sorted(n for n in ('z3', 'scipy', 'graphviz') if n in sys.modules))", GRAPHS[0], dimacs_solver())
+
+        self.assertEqual(out.strip().splitlines()[-1], "[]")
+
+    def test_modules(self):
+
+        self.assertIn("{} vertices, {} edges".format(*Graph(parse=GRAPHS[0]).counts()), python("-m", "cores", "parse", GRAPHS[0]))
+        self.assertIn("{} vertices, {} edges".format(*HGraph(parse=HGRAPHS[0]).counts()), python("-m", "coresh", "parse", HGRAPHS[0]))
+        self.assertIn("core: ", python("-m", "cores", "solve", GRAPHS[0], "--backend", dimacs_solver()))
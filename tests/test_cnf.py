@@ -0,0 +1,106 @@
+import itertools
+import unittest
+
+import cnf
+from cnf import CNF, ENCODINGS
+
+#Returns whether the clauses are satisfiable under the partial assignment, a dict from variables to bools, by plain backtracking
+def satisfiable(clauses, assignment):
+
+    remaining = []
+
+    for n in clauses:
+        if any(assignment.get(abs(m)) == (m > 0) for m in n):
+            continue
+        free = [m for m in n if not abs(m) in assignment]
+        if not free:
+            return False
+        remaining.append(free)
+
+    if not remaining:
+        return True
+
+    m = abs(min(remaining, key=len)[0])
+
+    return satisfiable(remaining, {**assignment, m: True}) or satisfiable(remaining, {**assignment, m: False})
+
+#Returns the assignments of the literals, as tuples of bools, under which the CNF can be satisfied by some assignment of its other variables
+def models(formula, literals):
+
+    return {values for values in itertools.product((False, True), repeat=len(literals)) if satisfiable(formula.clauses, {abs(n): v == (n > 0) for n,v in zip(literals, values)})}
+
+#Returns all assignments of k literals with at most/exactly bound of them true
+def counted(k, bound, exact=False):
+
+    return {values for values in itertools.product((False, True), repeat=k) if (sum(values) == bound if exact else sum(values) <= bound)}
+
+#Every encoding has to allow exactly the assignments with at most/exactly one true literal, for positive and negative literals alike.
+class EncodingTest(unittest.TestCase):
+
+    def literals(self, formula, k):
+
+        return [formula.new()*(-1 if i%3 == 2 else 1) for i in range(k)]
+
+    def test_at_most_one(self):
+
+        for encoding in ENCODINGS:
+            for k in range(cnf.PAIRWISE_LIMIT+3):
+                with self.subTest(encoding=encoding, k=k):
+                    formula = CNF(encoding)
+                    literals = self.literals(formula, k)
+                    formula.at_most_one(literals)
+                    self.assertEqual(models(formula, literals), counted(k, 1))
+
+    def test_exactly_one(self):
+
+        for encoding in ENCODINGS:
+            for k in range(1, cnf.PAIRWISE_LIMIT+3):
+                with self.subTest(encoding=encoding, k=k):
+                    formula = CNF(encoding)
+                    literals = self.literals(formula, k)
+                    formula.exactly_one(literals)
+                    self.assertEqual(models(formula, literals), counted(k, 1, True))
+
+    #auto switches from pairwise clauses to a sequential counter above PAIRWISE_LIMIT literals
+    def test_auto(self):
+
+        for k in (cnf.PAIRWISE_LIMIT, cnf.PAIRWISE_LIMIT+1):
+            formula = CNF()
+            formula.at_most_one([formula.new() for i in range(k)])
+            self.assertEqual(formula.n_vars > k, k > cnf.PAIRWISE_LIMIT)
+
+    def test_unknown_encoding(self):
+
+        with self.assertRaises(Exception):
+            CNF("binary")
+
+#The outputs of the sequential counter tell how many of the literals are true, a single counter serves every bound.
+class CounterTest(unittest.TestCase):
+
+    def test_counter(self):
+
+        for k in range(6):
+            with self.subTest(k=k):
+                formula = CNF()
+                literals = [formula.new()*(-1 if i%2 else 1) for i in range(k)]
+                outputs = formula.counter(literals)
+                self.assertEqual(len(outputs), k)
+                for bound in range(k):
+                    formula.add([-outputs[bound]])
+                    self.assertEqual(models(formula, literals), counted(k, bound))
+                    formula.clauses.pop()
+
+    #Bounds get switched on via assumptions only, thus the CNF stays the same for all of them
+    def test_assumptions(self):
+
+        formula = CNF()
+        literals = [formula.new() for i in range(4)]
+        outputs = formula.counter(literals)
+        clauses = len(formula.clauses)
+
+        for bound in range(4):
+            formula.add([-outputs[bound]])
+            self.assertEqual(models(formula, literals), counted(4, bound))
+            formula.clauses.pop()
+
+        self.assertEqual(len(formula.clauses), clauses)
@@ -0,0 +1,321 @@
+import copy
+import io
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+from unittest import mock
+
+from cores import Adjacency, Graph
+from tests import GRAPHS, core_size, dimacs_solver, require_z3
+
+class SolveTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.backend = dimacs_solver()
+
+    #Asserts that solve with the given parameters finds the core of each bundled file and returns the solved Graphs
+    def assertCores(self, **kwargs):
+
+        solved = []
+
+        for path in GRAPHS:
+            with self.subTest(path=path, **kwargs):
+                g = Graph(parse=path)
+                g.solve(backend=self.backend, **kwargs)
+                self.assertEqual(g.counts(), core_size(path))
+                self.assertTrue(g.proven)
+                solved.append(g)
+
+        return solved
+
+    #The CNF encoding finds the same cores with a DIMACS solver and with z3 in-process
+    def test_backends(self):
+
+        self.assertCores()
+
+        require_z3()
+        self.backend = "z3"
+        self.assertCores()
+
+    #Searching for a retract of minimum size directly finds the same cores as iterating over retracts
+    def test_minimal(self):
+
+        self.assertCores(minimal=True)
+        self.assertCores(minimal=True, fold=False)
+
+    #Calculating the cores of the components in a pool of processes finds the same cores as calculating them one after another
+    def test_processes(self):
+
+        for processes in (1, 2):
+            self.assertCores(processes=processes, fold=False)
+            self.assertCores(processes=processes, minimal=True)
+
+#Returns all retractions of the current graph as dicts, by trying every map of its vertices onto each other.
+#A retraction maps each vertex onto a fixpoint and each edge onto an edge carrying at least the same labels.
+def retractions(g):
+
+    vertices = g._vertices()
+    edges = [(n, g._out.tgt[i], g._out.mask[i]) for n in vertices for i in g._out.row(n)]
+
+    for images in itertools.product(vertices, repeat=len(vertices)):
+        r = dict(zip(vertices, images))
+        if all(r[r[n]] == r[n] for n in vertices) and all(g._out.get(r[n], r[m]) & l == l for n,m,l in edges):
+            yield r
+
+#Small generated graphs with loops and several labels, small enough to try every map of their vertices
+def small_graphs():
+
+    for seed in range(30):
+        yield Graph(gen=(2+seed%4, 1+seed%3, 0.5+seed%4/2, seed))
+
+class LabelIndexTest(unittest.TestCase):
+
+    #Builds the label index of the current graph from scratch
+    def expected(self, g, masks):
+
+        vertices = g._vertices()
+
+        return {n: [{m for m in vertices if any(g._out.mask[i] & n == n for i in g._out.row(m))}, {m for m in vertices if any(g._in.mask[i] & n == n for i in g._in.row(m))}] for n in masks}
+
+    #The index stays the same as one built from scratch while _reduce folds vertices away
+    def test_reduce(self):
+
+        require_z3()
+
+        for path in GRAPHS:
+            g = Graph(parse=path)
+            g._label_index()
+            ids = {g._name(n): n for n in g._vertices()}
+            g._reduce([[ids[n], ids[m]] for n,m in Graph(parse=path).z3solve().items()])
+            self.assertEqual(g._index, self.expected(g, g._index))
+
+    #No vertex loses a vertex it gets mapped to by any retraction as candidate
+    def test_candidates(self):
+
+        for g in small_graphs():
+            candidates = g._candidates()
+            for r in retractions(g):
+                self.assertTrue(all(r[n] in candidates[n] for n in r), (g.graph, r, candidates))
+
+class RetractionTest(unittest.TestCase):
+
+    #The retraction map of each approach maps the original graph onto its core, keeping the vertices of the core fixed
+    def test_retraction(self):
+
+        backend = dimacs_solver()
+
+        for path in GRAPHS:
+            original = Graph(parse=path).graph
+            for name,solve in (("solve", lambda g: g.solve(backend=backend)), ("z3solve", Graph.z3solve)):
+                with self.subTest(path=path, method=name):
+                    if name == "z3solve":
+                        require_z3()
+                    g = Graph(parse=path)
+                    r = solve(g)
+                    self.assertEqual(r, g.retraction())
+                    self.assertEqual(set(r), set(original))
+                    self.assertEqual(len(set(r.values())), g.counts()[0])
+                    self.assertTrue(all(r[r[n]] == r[n] for n in r))
+                    self.assertTrue(all(original[r[n]].get(r[m], set()) >= original[n][m] for n in original for m in original[n]))
+                    #Each vertex of the core is named after itself followed by the vertices folded onto it
+                    self.assertEqual(sorted(m for n in g.graph for m in n.split("-")), sorted(original))
+                    self.assertEqual({n.split("-")[0] for n in g.graph}, set(r.values()))
+
+class AdjacencyTest(unittest.TestCase):
+
+    def setUp(self):
+
+        rng = random.Random(0)
+        self.edges = {(rng.randrange(12), rng.randrange(12)): rng.randrange(1, 1<<26) for i in range(40)}
+        self.adjacency = Adjacency.from_edges(12, self.edges)
+
+    #Each row holds the edges of its vertex sorted by target, in both directions
+    def test_rows(self):
+
+        for adj,edges in ((self.adjacency, self.edges), (self.adjacency.transpose(), {(m, n): l for (n,m),l in self.edges.items()})):
+            for n in range(12):
+                row = [(adj.tgt[i], adj.mask[i]) for i in adj.row(n)]
+                self.assertEqual(row, sorted((m, l) for (k,m),l in edges.items() if k == n))
+            self.assertEqual({(n, m): adj.get(n, m) for n in range(12) for m in range(12) if adj.get(n, m)}, edges)
+
+    #Edges listed out of order and more than once end up in the same rows, with their masks merged
+    def test_columns(self):
+
+        columns = [(n, m, l) for (n,m),l in self.edges.items()]
+        columns += [(n, m, 1) for n,m,l in columns]
+        random.Random(1).shuffle(columns)
+
+        adj = Adjacency.from_columns(12, *[[n[i] for n in columns] for i in range(3)])
+
+        self.assertEqual((adj.ptr, adj.tgt), (self.adjacency.ptr, self.adjacency.tgt))
+        self.assertEqual(list(adj.mask), [n | 1 for n in self.adjacency.mask])
+
+    def test_without(self):
+
+        alive = [n%3 for n in range(12)]
+        adj = self.adjacency.without(alive)
+
+        self.assertEqual(len(adj.ptr), 13)
+        self.assertEqual({(n, m): adj.get(n, m) for n in range(12) for m in range(12) if adj.get(n, m)}, {(n, m): l for (n,m),l in self.edges.items() if alive[n] and alive[m]})
+
+    def test_deepcopy(self):
+
+        other = copy.deepcopy(self.adjacency)
+        other.mask[0] ^= 1
+
+        self.assertNotEqual(other.mask[0], self.adjacency.mask[0])
+
+    #The dict of dicts of sets of labels survives as property, which turns into label masks and back
+    def test_graph_property(self):
+
+        graph = {"a": {"b": {"A", "Z"}, "a": {"C"}}, "b": {}, "c": {"a": {"B"}}}
+
+        g = Graph.__new__(Graph)
+        g.graph = graph
+
+        self.assertEqual(g.graph, graph)
+        #Edges get counted per label
+        self.assertEqual(g.counts(), (3, 4))
+        self.assertEqual(g._out.get(0, 1), 1 | 1<<25)
+
+    #The view gets built once and only built anew once the graph changes
+    def test_graph_view(self):
+
+        g = Graph(parse=GRAPHS[0])
+        view = g.graph
+
+        self.assertIs(g.graph, view)
+
+        g.solve(backend=dimacs_solver())
+
+        self.assertIsNot(g.graph, view)
+        self.assertEqual(len(g.graph), g.counts()[0])
+        self.assertEqual(set(view), set(Graph(parse=GRAPHS[0]).graph))
+
+class FoldTest(unittest.TestCase):
+
+    def test_cores(self):
+
+        backend = dimacs_solver()
+
+        for path in GRAPHS:
+            with self.subTest(path=path):
+                original = Graph(parse=path).graph
+                g = Graph(parse=path)
+                g._fold()
+                #Folding only applies retractions, thus it keeps the core
+                r = g.retraction()
+                self.assertTrue(all(r[r[n]] == r[n] for n in r))
+                self.assertTrue(all(original[r[n]].get(r[m], set()) >= original[n][m] for n in original for m in original[n]))
+                g.solve(backend=backend, fold=False)
+                self.assertEqual(g.counts(), core_size(path))
+                h = Graph(parse=path)
+                h.solve(backend=backend, fold=False)
+                self.assertEqual(h.counts(), core_size(path))
+
+    #Isolated vertices, twins and leaves of a vertex with a loop fold away
+    def test_dominated(self):
+
+        g = Graph.__new__(Graph)
+        g.graph = {"a": {"c": {"A"}}, "b": {"c": {"A"}}, "c": {}, "d": {}}
+        g._fold()
+        self.assertEqual(g.counts(), (2, 1))
+
+        g.graph = {"a": {"a": {"A"}, "b": {"A"}, "c": {"A"}}, "b": {}, "c": {}}
+        g._fold()
+        self.assertEqual(g.counts(), (1, 1))
+        self.assertEqual(sorted(list(g.graph)[0].split("-")), ["a", "b", "c"])
+
+class ArcConsistencyTest(unittest.TestCase):
+
+    #Asserts that each vertex keeps itself as candidate and that each candidate k of a vertex n has, for each edge between n and a neighbour m, an edge in the same direction with at least the same labels between k and a candidate of m
+    def assertConsistent(self, g, candidates):
+
+        for n in g._vertices():
+            self.assertIn(n, candidates[n])
+            for k in candidates[n]:
+                for i in g._out.row(n):
+                    m, l = g._out.tgt[i], g._out.mask[i]
+                    if m != n:
+                        self.assertTrue(any(g._out.get(k, j) & l == l for j in candidates[m]))
+                for i in g._in.row(n):
+                    m, l = g._in.tgt[i], g._in.mask[i]
+                    if m != n:
+                        self.assertTrue(any(g._out.get(j, k) & l == l for j in candidates[m]))
+
+    def test_consistent(self):
+
+        for g in list(small_graphs())+[Graph(parse=n) for n in GRAPHS]:
+            self.assertConsistent(g, g._candidates())
+
+    #Propagation only ever removes candidates, and it removes some that the label profiles alone keep
+    def test_pruning(self):
+
+        graphs = list(small_graphs())+[Graph(parse=n) for n in GRAPHS]
+        candidates = [g._candidates() for g in graphs]
+
+        with mock.patch.object(Graph, "_propagate", lambda self, candidates: None):
+            profiles = [g._candidates() for g in graphs]
+
+        self.assertTrue(all(n[m] <= l[m] for n,l in zip(candidates, profiles) for m in n))
+        self.assertTrue(any(n != l for n,l in zip(candidates, profiles)))
+
+class ComponentTest(unittest.TestCase):
+
+    #The components partition the vertices and no edge runs between two of them
+    def test_components(self):
+
+        for g in list(small_graphs())+[Graph(parse=n) for n in GRAPHS]:
+            components = g._components()
+            self.assertEqual(sorted(n for m in components for n in m), g._vertices())
+            component = {n: i for i,m in enumerate(components) for n in m}
+            self.assertTrue(all(component[n] == component[g._out.tgt[i]] for n in g._vertices() for i in g._out.row(n)))
+
+    #A path maps into a cycle, thus it gets dropped, while neither of two directed cycles of coprime lengths maps into the other
+    def test_drop(self):
+
+        backend = dimacs_solver()
+
+        for processes in (1, 2):
+            g = Graph.__new__(Graph)
+            g.graph = {"a": {"b": {"A"}}, "b": {"c": {"A"}}, "c": {}, "d": {"e": {"A"}}, "e": {"f": {"A"}}, "f": {"d": {"A"}}}
+            r = g.solve(backend=backend, fold=False, processes=processes)
+            self.assertEqual(g.counts(), (3, 3))
+            self.assertEqual(set(r.values()), {"d", "e", "f"})
+            self.assertTrue(g.proven)
+
+            g.graph = {"a": {"b": {"A"}}, "b": {"a": {"A"}}, "d": {"e": {"A"}}, "e": {"f": {"A"}}, "f": {"d": {"A"}}}
+            g.solve(backend=backend, fold=False, processes=processes)
+            self.assertEqual(g.counts(), (5, 5))
+
+class ParseTest(unittest.TestCase):
+
+    def parse(self, text):
+
+        return Graph(parse=io.StringIO(text)).graph
+
+    def test_forms(self):
+
+        self.assertEqual(self.parse("[3]\n1 2 A\n1 2 B\n3 3 C"), {"1": {"2": {"A", "B"}}, "2": {}, "3": {"3": {"C"}}})
+        self.assertEqual(self.parse("1-2 3 \n1-2 3 A \n1-2 3 A\n"), {"1-2": {"3": {"A"}}, "3": {}})
+        self.assertEqual(self.parse("1\n"), {"1": {}})
+
+    #Each error names the line it was found on
+    def test_errors(self):
+
+        for text,message in (("a b\n", "Line 1 "), ("1 2 1\n", "Line 1: Each node"), ("1 2\n1 2 A\n1 2\n", "Line 3 "), ("1 2\n1 2 AB\n", "Line 2 "), ("1 2\n1 3 A\n", "Line 2: 3 ")):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(Exception, "^"+message):
+                    self.parse(text)
+
+    #Serializing a graph and parsing it back gives the same graph
+    def test_roundtrip(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in GRAPHS:
+                g = Graph(parse=n)
+                self.assertEqual(Graph(parse=g.serialize(os.path.join(tmp, "graph.txt"))).graph, g.graph)
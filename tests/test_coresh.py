@@ -0,0 +1,246 @@
+import io
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+from coresh import Edge, EdgeInstance, HGraph, Vertex
+from tests import HGRAPHS, core_size, dimacs_solver, require_z3
+
+#Returns all retractions of the hypergraph as dicts, by trying every map of its vertices onto each other.
+#A retraction maps each vertex onto a fixpoint and each edge onto an edge with the same label.
+def retractions(h):
+
+    vertices = list(h.hgraph[0])
+    present = {(n.edge, n.args) for n in h.hgraph[1]}
+
+    for images in itertools.product(vertices, repeat=len(vertices)):
+        r = dict(zip(vertices, images))
+        if all(r[r[n]] is r[n] for n in vertices) and all((n.edge, tuple(r[m] for m in n.args)) in present for n in h.hgraph[1]):
+            yield r
+
+#Small generated hypergraphs with labels of different arrities, small enough to try every map of their vertices
+def small_hgraphs():
+
+    for seed in range(30):
+        yield HGraph(gen=(2+seed%4, 1+seed%3, 1+seed%3/2, 0.5, seed))
+
+class SolveTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.backend = dimacs_solver()
+
+    #Asserts that solve with the given parameters finds the core of each bundled file and returns the solved HGraphs
+    def assertCores(self, **kwargs):
+
+        solved = []
+
+        for path in HGRAPHS:
+            with self.subTest(path=path, **kwargs):
+                g = HGraph(parse=path)
+                g.solve(backend=self.backend, **kwargs)
+                self.assertEqual(g.counts(), core_size(path))
+                self.assertTrue(g.proven)
+                solved.append(g)
+
+        return solved
+
+    #The CNF encoding finds the same cores with a DIMACS solver and with z3 in-process
+    def test_backends(self):
+
+        self.assertCores()
+
+        require_z3()
+        self.backend = "z3"
+        self.assertCores()
+
+    #Searching for a retract of minimum size directly finds the same cores as iterating over retracts
+    def test_minimal(self):
+
+        self.assertCores(minimal=True)
+        self.assertCores(minimal=True, fold=False)
+
+    #Calculating the cores of the components in a pool of processes finds the same cores as calculating them one after another
+    def test_processes(self):
+
+        for processes in (1, 2):
+            self.assertCores(processes=processes, fold=False)
+            self.assertCores(processes=processes, minimal=True)
+
+class IncidenceTest(unittest.TestCase):
+
+    #The index of incident edges stays the same as one built from scratch while vertices get removed, and no edge refers to a removed vertex
+    def test_solve(self):
+
+        backend = dimacs_solver()
+
+        for path in HGRAPHS:
+            with self.subTest(path=path):
+                h = HGraph(parse=path)
+                vertices = list(h.hgraph[0])
+                edges = [(n.edge, n.args) for n in h.hgraph[1]]
+                h.solve(backend=backend, am=False)
+                self.assertEqual(h._incident, {n: {m for m in h.hgraph[1] if n in m.args} for n in h.hgraph[0]})
+                #The retraction maps each edge onto an edge of the core
+                r = h.retraction()
+                self.assertEqual(set(r), set(vertices))
+                present = {(n.edge, n.args) for n in h.hgraph[1]}
+                self.assertTrue(all((n, tuple(r[l] for l in m)) in present for n,m in edges))
+
+    #Assigning hgraph rebuilds the index
+    def test_setter(self):
+
+        a, b = Vertex("a"), Vertex("b")
+        p = Edge("P", 2)
+        e = EdgeInstance(p, [a, b])
+
+        h = HGraph.__new__(HGraph)
+        h.hgraph = ([a, b], [e])
+
+        self.assertEqual(list(h.hgraph[0]), [a, b])
+        self.assertEqual(h._incident, {a: {e}, b: {e}})
+        self.assertEqual(e.args, (a, b))
+
+        with self.assertRaises(AttributeError):
+            a.label = "A"
+
+class FoldTest(unittest.TestCase):
+
+    def test_cores(self):
+
+        backend = dimacs_solver()
+
+        for path in HGRAPHS:
+            with self.subTest(path=path):
+                h = HGraph(parse=path)
+                edges = [(n.edge, n.args) for n in h.hgraph[1]]
+                h._fold(am=False)
+                #Folding only applies retractions, thus it keeps the core
+                r = h.retraction()
+                present = {(n.edge, n.args) for n in h.hgraph[1]}
+                self.assertTrue(all((n, tuple(r[l] for l in m)) in present for n,m in edges))
+                h.solve(backend=backend, fold=False)
+                self.assertEqual(h.counts(), core_size(path))
+                h = HGraph(parse=path)
+                h.solve(backend=backend, fold=False)
+                self.assertEqual(h.counts(), core_size(path))
+
+class ArcConsistencyTest(unittest.TestCase):
+
+    #No vertex loses a vertex it gets mapped to by any retraction as candidate, nor itself
+    def test_candidates(self):
+
+        for h in small_hgraphs():
+            candidates = h._candidates()
+            for r in retractions(h):
+                self.assertTrue(all(r[n] in candidates[n] for n in r))
+
+    #Each candidate k of a vertex n has an image with k in place of n and a candidate of each other argument, for each edge n is an argument of
+    def test_consistent(self):
+
+        for h in list(small_hgraphs())+[HGraph(parse=n) for n in HGRAPHS]:
+            candidates = h._candidates()
+            for n in h.hgraph[0]:
+                self.assertIn(n, candidates[n])
+                for k in candidates[n]:
+                    for m in h._incident[n]:
+                        self.assertTrue(any(l.edge is m.edge and all(j is k if i is n else j in candidates[i] for i,j in zip(m.args, l.args)) for l in h.hgraph[1]))
+
+class ComponentTest(unittest.TestCase):
+
+    #The components partition the vertices and no edge has arguments in two of them
+    def test_components(self):
+
+        for h in list(small_hgraphs())+[HGraph(parse=n) for n in HGRAPHS]:
+            components = h._components()
+            self.assertEqual(sorted(id(n) for m in components for n in m), sorted(id(n) for n in h.hgraph[0]))
+            component = {n: i for i,m in enumerate(components) for n in m}
+            self.assertTrue(all(len({component[m] for m in n.args}) <= 1 for n in h.hgraph[1]))
+
+    #A path maps into a cycle, thus it gets dropped
+    def test_drop(self):
+
+        backend = dimacs_solver()
+        r = Edge("R", 2)
+
+        for processes in (1, 2):
+            vertices = [Vertex(n) for n in "abcdef"]
+            a, b, c, d, e, f = vertices
+            h = HGraph.__new__(HGraph)
+            h.hgraph = (vertices, [EdgeInstance(r, n) for n in ((a, b), (b, c), (d, e), (e, f), (f, d))])
+            h.solve(am=False, backend=backend, fold=False, processes=processes)
+            self.assertEqual(h.counts(), (3, 3))
+            self.assertEqual(set(h.retraction().values()), {d, e, f})
+            self.assertTrue(h.proven)
+
+#Returns the names of the vertices and the edges of the hypergraph as label and names of the arguments
+def names(h):
+
+    return [n.name for n in h.hgraph[0]], [(n.edge.name, n.edge.size, [m.name for m in n.args]) for n in h.hgraph[1]]
+
+class ParseTest(unittest.TestCase):
+
+    def parse(self, text):
+
+        return names(HGraph(parse=io.StringIO(text)))
+
+    #Edges listed more than once only get added once, labels without edges are fine
+    def test_forms(self):
+
+        self.assertEqual(self.parse("V:\na b\nL:\nP 2\nQ 0\nR 1\nE:\nP a b\nQ\nP a b\n"), (["a", "b"], [("P", 2, ["a", "b"]), ("Q", 0, [])]))
+        self.assertEqual(self.parse("V:\nL:\nE:"), ([], []))
+
+    #Each error names the line it was found on
+    def test_errors(self):
+
+        for text,message in (("L:\n", "Line 1: "), ("V:\na a\nL:\nE:\n", "Line 2: "), ("V:\na\nL:\nP\nE:\n", "Line 4: "), ("V:\na\nL:\nP 1\nP 2\nE:\n", "Line 5: "),
+                             ("V:\na\nL:\nP 1\nE:\nQ a\n", "Line 6: Label"), ("V:\na\nL:\nP 1\nE:\nP a a\n", "Line 6: The number"), ("V:\na\nL:\nP 1\nE:\nP b\n", "Line 6: Argument"), ("V:\na\nL:\n", "The file")):
+            with self.subTest(text=text):
+                with self.assertRaisesRegex(Exception, "^"+message):
+                    self.parse(text)
+
+    #Serializing a hypergraph and parsing it back gives the same hypergraph
+    def test_roundtrip(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in HGRAPHS:
+                h = HGraph(parse=n)
+                self.assertEqual(names(HGraph(parse=h.serialize(os.path.join(tmp, "hgraph.txt")))), names(h))
+
+class GenerateTest(unittest.TestCase):
+
+    #The same seed gives the same hypergraph, given as int or as random.Random, other seeds give other hypergraphs
+    def test_seed(self):
+
+        self.assertEqual(names(HGraph(gen=(30, 4, 2, 1.0, 7))), names(HGraph(gen=(30, 4, 2, 1.0, 7))))
+        self.assertEqual(names(HGraph(gen=(30, 4, 2, 1.0, random.Random(7)))), names(HGraph(gen=(30, 4, 2, 1.0, 7))))
+        self.assertNotEqual(names(HGraph(gen=(30, 4, 2, 1.0, 8))), names(HGraph(gen=(30, 4, 2, 1.0, 7))))
+
+    #Each label gets connectivity*2*vertex_n/(arrity*edge_n) distinct edges on average, a label of arrity 0 a single one
+    def test_density(self):
+
+        for seed in range(5):
+            h = HGraph(gen=(2000, 40, 3, 2.0, seed))
+            labels = {n.edge for n in h.hgraph[1]}
+            expected = sum(1 if n.size == 0 else 2.0*2*2000/(n.size*40) for n in labels)
+            self.assertLess(abs(h.counts()[1]-expected), 5*expected**0.5+len(labels))
+            self.assertEqual(len({(n.edge, n.args) for n in h.hgraph[1]}), h.counts()[1])
+            self.assertTrue(all(len(n.args) == n.edge.size for n in h.hgraph[1]))
+
+    #Labels of high arrity over many vertices don't take longer than the edges that get generated
+    def test_scale(self):
+
+        h = HGraph(gen=(100000, 5, 3, 1.0, 0))
+
+        self.assertEqual(h.counts()[0], 100000)
+        self.assertLess(h.counts()[1], 10**6)
+
+    #generate writes the same hypergraph to a file that gen builds in memory
+    def test_generate(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for seed in range(10):
+                path = HGraph.generate(os.path.join(tmp, "hgraph.txt"), 20, 4, 2, 1.5, seed)
+                self.assertEqual(names(HGraph(parse=path)), names(HGraph(gen=(20, 4, 2, 1.5, seed))))
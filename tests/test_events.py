@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from cores import Graph
+from coresh import HGraph
+from events import JsonLines, Round
+from tests import GRAPHS, HGRAPHS, dimacs_solver, require_z3
+
+KINDS = {"cache", "fold", "retract", "minimal", "drop"}
+
+#Every approach hands one event per round to the observer, which together account for each vertex removed on the way to the core.
+class ObserverTest(unittest.TestCase):
+
+    def assertEvents(self, path, method, **kwargs):
+
+        g = HGraph(parse=path) if path in HGRAPHS else Graph(parse=path)
+        vertices = g.counts()[0]
+        events = []
+
+        getattr(g, method)(observer=events.append, **kwargs)
+
+        self.assertEqual(sum(n["removed"] for n in events), vertices-g.counts()[0])
+
+        rounds = {}
+        for n in events:
+            self.assertIn(n["kind"], KINDS)
+            self.assertTrue(all(n[m+"_time"] >= 0 for m in ("encode", "solver", "reduce")))
+            self.assertLessEqual(n["removed"], n["vertices"])
+            #Rounds of each kind are numbered consecutively, per component if the components get solved on their own
+            key = (n["kind"], n.get("component"))
+            self.assertEqual(n["round"], rounds.get(key, 0))
+            rounds[key] = n["round"]+1
+
+        return events
+
+    def test_solve(self):
+
+        backend = dimacs_solver()
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+                events = self.assertEvents(path, "solve", backend=backend)
+                self.assertTrue(all(n["variables"] > 0 and n["clauses"] >= 0 for n in events if n["kind"] == "retract"))
+                self.assertEvents(path, "solve", backend=backend, minimal=True, fold=False)
+
+    #Each round of the minimal search reports its bound, and all of them share the counter of the same CNF per component
+    def test_minimal(self):
+
+        backend = dimacs_solver()
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+                events = [n for n in self.assertEvents(path, "solve", backend=backend, minimal=True, fold=False) if n["kind"] == "minimal"]
+                self.assertTrue(all(n["bound"] != None for n in events))
+                self.assertEqual(len({(n.get("component"), n["variables"], n["clauses"]) for n in events}), len({n.get("component") for n in events}))
+
+    def test_z3solve(self):
+
+        require_z3()
+
+        for path in GRAPHS+HGRAPHS:
+            with self.subTest(path=path):
+                self.assertEvents(path, "z3solve")
+                self.assertEvents(path, "z3solve", incremental=True)
+                self.assertTrue(all(n["bound"] != None for n in self.assertEvents(path, "z3solve", minimal=True, fold=False)))
+
+    def test_json_lines(self):
+
+        file = io.StringIO()
+        Graph(parse=GRAPHS[0]).solve(backend=dimacs_solver(), observer=JsonLines(file))
+
+        events = [json.loads(n) for n in file.getvalue().splitlines()]
+
+        self.assertTrue(events)
+        self.assertEqual(events[0]["kind"], "fold")
+
+    #Without an observer a round measures nothing, fields given as callables don't get called
+    def test_no_observer(self):
+
+        r = Round(None, "retract", 0, None)
+        r.lap("encode")
+        r.done(variables=lambda: self.fail("called"))
+
+        self.assertFalse(hasattr(r, "event"))
+
+class ProfileTest(unittest.TestCase):
+
+    def test_profile(self):
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        for i,path in enumerate((GRAPHS[0], HGRAPHS[0])):
+            target = os.path.join(directory, "{}.prof".format(i))
+            g = HGraph(parse=path) if path in HGRAPHS else Graph(parse=path)
+            self.assertNotEqual(g.solve(backend=dimacs_solver(), profile=target), None)
+            self.assertTrue(g.proven)
+            self.assertIn("solve", {n[2] for n in pstats.Stats(target).stats})
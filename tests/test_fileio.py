@@ -0,0 +1,195 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from array import array
+
+from cores import Adjacency, Graph
+from coresh import HGraph
+from fileio import binary_kind, read_graph, read_hgraph, write_graph, write_hgraph
+from tests import GRAPHS, HGRAPHS
+
+class BinaryFormatTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "graph.bin")
+
+    def test_graph_round_trip(self):
+
+        names = ["1", "2", "3-4", "ü"]
+        out = Adjacency.from_edges(4, {(0, 1): 1, (0, 3): 5, (2, 2): 2, (3, 0): 1<<25})
+
+        write_graph(self.path, names, out, out.transpose())
+        self.assertEqual(binary_kind(self.path), "graph")
+
+        for mmap in (False, True):
+            read, (ptr, tgt, mask), inc = read_graph(self.path, mmap)
+            self.assertEqual(read, names)
+            self.assertEqual((list(ptr), list(tgt), list(mask)), (list(out.ptr), list(out.tgt), list(out.mask)))
+            self.assertEqual([list(n) for n in inc], [list(n) for n in (out.transpose().ptr, out.transpose().tgt, out.transpose().mask)])
+            #Only with mmap the arrays are views of the file
+            self.assertEqual(isinstance(tgt, memoryview), mmap)
+            del ptr, tgt, mask, inc
+
+    def test_empty_graph_round_trip(self):
+
+        out = Adjacency.from_edges(0, {})
+
+        write_graph(self.path, [], out, out)
+
+        names, out, inc = read_graph(self.path)
+        self.assertEqual((names, list(out[0]), list(out[1])), ([], [0], []))
+
+    def test_hgraph_round_trip(self):
+
+        vertices = ["a", "b", "c"]
+        labels = [("P", 2, 2, array("i", [0, 1, 1, 2])), ("Q", 0, 3, array("i")), ("R", 1, 1, array("i", [2]))]
+
+        write_hgraph(self.path, vertices, labels)
+        self.assertEqual(binary_kind(self.path), "hgraph")
+
+        for mmap in (False, True):
+            read, read_labels = read_hgraph(self.path, mmap)
+            self.assertEqual(read, vertices)
+            self.assertEqual([(n, m, l, list(k)) for n,m,l,k in read_labels], [(n, m, l, list(k)) for n,m,l,k in labels])
+
+    def test_version_mismatch(self):
+
+        out = Adjacency.from_edges(1, {})
+        write_graph(self.path, ["1"], out, out)
+
+        with open(self.path, "r+b") as file:
+            file.seek(6)
+            file.write(b"\x02\x00")
+
+        with self.assertRaises(Exception):
+            read_graph(self.path)
+
+class ParseTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def gzip(self, path):
+
+        target = os.path.join(self.tmp.name, os.path.basename(path)+".gz")
+
+        with open(path, "rb") as file, gzip.open(target, "wb") as compressed:
+            shutil.copyfileobj(file, compressed)
+
+        return target
+
+    def test_gzip_graph(self):
+
+        for n in GRAPHS:
+            self.assertEqual(Graph(parse=self.gzip(n)).graph, Graph(parse=n).graph)
+
+    def test_gzip_hgraph(self):
+
+        for n in HGRAPHS:
+            a, b = HGraph(parse=self.gzip(n)), HGraph(parse=n)
+            self.assertEqual([m.name for m in a.hgraph[0]], [m.name for m in b.hgraph[0]])
+            self.assertEqual([(m.edge.name, [l.name for l in m.args]) for m in a.hgraph[1]], [(m.edge.name, [l.name for l in m.args]) for m in b.hgraph[1]])
+
+    #Text and binary files of the same graph parse to the same graph, with and without mmap.
+    def test_binary_matches_text(self):
+
+        path = os.path.join(self.tmp.name, "graph.bin")
+
+        for n in GRAPHS:
+            g = Graph(parse=n)
+            g.serialize(path, binary=True)
+            self.assertEqual(Graph(parse=path).graph, g.graph)
+            self.assertEqual(Graph(parse=path, mmap=True).graph, g.graph)
+
+        path = os.path.join(self.tmp.name, "hgraph.bin")
+        text = os.path.join(self.tmp.name, "hgraph.txt")
+
+        for n in HGRAPHS:
+            h = HGraph(parse=n)
+            h.serialize(text)
+            h.serialize(path, binary=True)
+            HGraph(parse=path).serialize(path+".txt")
+            #The binary format groups the edges by label
+            self.assertEqual(sorted(open(path+".txt").read().split("\n")), sorted(open(text).read().split("\n")))
+
+    #Hypergraphs without vertices and edges of arity 0 parse back from the text they serialize to, as well as from the text earlier versions wrote for them.
+    def test_nullary_hgraph(self):
+
+        path = os.path.join(self.tmp.name, "hgraph.txt")
+
+        with open(path, "w") as file:
+            file.write("V:\n\nL:\nA 0\nB 1\nE:\nA ")
+
+        h = HGraph(parse=path)
+        self.assertEqual(h.counts(), (0, 1))
+
+        h.serialize(path)
+        self.assertEqual(open(path).read(), "V:\nL:\nA 0\nE:\nA")
+        self.assertEqual(HGraph(parse=path).counts(), (0, 1))
+
+        for seed in range(20):
+            h = HGraph(gen=(4, 3, 1, 1.0, seed))
+            h.serialize(path)
+            self.assertEqual(HGraph(parse=path).counts(), h.counts())
+
+class SerializeInPlaceTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+
+        return os.path.join(self.tmp.name, name)
+
+    #Writing a graph back to the binary file it got loaded from must not pull the file out from under the graph, even if it reads from a memory map of it.
+    def test_graph_back_to_same_path(self):
+
+        for binary in (True, False):
+            g = Graph(parse=GRAPHS[0])
+            g.serialize(self.path("g.bin"), binary=True)
+
+            g = Graph(parse=self.path("g.bin"), mmap=True)
+            expected = g.graph
+            g.serialize(self.path("g.bin"), binary=binary)
+
+            self.assertEqual(Graph(parse=self.path("g.bin")).graph, expected)
+            self.assertEqual([n for n in os.listdir(self.tmp.name) if n.endswith(".tmp")], [])
+
+    def test_hgraph_back_to_same_path(self):
+
+        for binary in (True, False):
+            h = HGraph(parse=HGRAPHS[-1])
+            h.serialize(self.path("h.bin"), binary=True)
+
+            h = HGraph(parse=self.path("h.bin"))
+            expected = open(HGRAPHS[-1]).read()
+            h.serialize(self.path("h.bin"), binary=binary)
+
+            h = HGraph(parse=self.path("h.bin"))
+            h.serialize(self.path("h.txt"))
+            self.assertEqual(open(self.path("h.txt")).read().split(), expected.split())
+
+    #A failed write leaves the previous file as it was and no temporary file behind.
+    def test_failed_write_keeps_file(self):
+
+        with open(self.path("g.txt"), "w") as file:
+            file.write("old")
+
+        g = Graph(parse=GRAPHS[0])
+        g._write = None
+
+        with self.assertRaises(TypeError):
+            g.serialize(self.path("g.txt"))
+
+        self.assertEqual(open(self.path("g.txt")).read(), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["g.txt"])
@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+import unittest
+
+import sampling
+from cores import Graph
+
+class PositionsTest(unittest.TestCase):
+
+    #The positions are distinct, ascending and within range, with expected of them on average
+    def test_positions(self):
+
+        rng = random.Random(0)
+
+        for total,expected in ((10, 3), (1000, 50), (10**6, 20), (10**30, 10), (10**30, 10**-3)):
+            with self.subTest(total=total, expected=expected):
+                counts = []
+                for i in range(200):
+                    drawn = list(sampling.positions(total, expected, rng))
+                    self.assertEqual(drawn, sorted(set(drawn)))
+                    self.assertTrue(all(0 <= n < total for n in drawn))
+                    counts.append(len(drawn))
+                #The standard deviation of the mean of 200 draws is below sqrt(expected/200), the bound allows for more than 5 of them
+                self.assertLess(abs(sum(counts)/200-expected), 5*(expected/200)**0.5+0.01)
+
+    #Each position gets drawn with the same chance
+    def test_uniform(self):
+
+        rng = random.Random(1)
+        hits = [0]*10
+
+        for i in range(4000):
+            for n in sampling.positions(10, 2, rng):
+                hits[n] += 1
+
+        self.assertTrue(all(700 < n < 900 for n in hits), hits)
+
+    def test_edge_cases(self):
+
+        rng = random.Random(2)
+
+        self.assertEqual(list(sampling.positions(0, 5, rng)), [])
+        self.assertEqual(list(sampling.positions(5, 0, rng)), [])
+        self.assertEqual(list(sampling.positions(5, 5, rng)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(sampling.positions(5, 9, rng)), [0, 1, 2, 3, 4])
+
+    def test_source(self):
+
+        rng = random.Random(3)
+
+        self.assertIs(sampling.source(rng), rng)
+        self.assertIs(sampling.source(), random)
+        self.assertEqual(sampling.source(4).random(), random.Random(4).random())
+
+class GenerateTest(unittest.TestCase):
+
+    #The same seed gives the same graph, given as int or as random.Random, other seeds give other graphs
+    def test_seed(self):
+
+        self.assertEqual(Graph(gen=(50, 3, 2, 7)).graph, Graph(gen=(50, 3, 2, 7)).graph)
+        self.assertEqual(Graph(gen=(50, 3, 2, random.Random(7))).graph, Graph(gen=(50, 3, 2, 7)).graph)
+        self.assertNotEqual(Graph(gen=(50, 3, 2, 8)).graph, Graph(gen=(50, 3, 2, 7)).graph)
+
+        random.seed(9)
+        g = Graph(gen=(50, 3, 2)).graph
+        random.seed(9)
+        self.assertEqual(Graph(gen=(50, 3, 2, None)).graph, g)
+
+    #Each vertex has avg_edges_out outgoing edges on average, labels included
+    def test_density(self):
+
+        edges = sum(sum(len(m) for m in n.values()) for n in Graph(gen=(400, 3, 2.5, 0)).graph.values())
+
+        self.assertLess(abs(edges-1000), 5*1000**0.5)
+
+    #generate writes the same graph to a file that gen builds in memory
+    def test_generate(self):
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Graph.generate(os.path.join(tmp, "graph.txt"), 60, 4, 3, 5)
+            self.assertEqual(Graph(parse=path).graph, Graph(gen=(60, 4, 3, 5)).graph)
+
+    def test_invalid(self):
+
+        for gen in ((10, 27, 1, 0), (10, 3, 31, 0), (-1, 3, 1, 0), (10, 3, 1, "seed"), (10, 3)):
+            with self.subTest(gen=gen):
+                with self.assertRaises(Exception):
+                    Graph(gen=gen)
@@ -0,0 +1,99 @@
+import json
+import os
+import unittest
+
+from concurrent.futures import ProcessPoolExecutor
+
+import service
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, ROOT, dimacs_solver
+
+#Requests get answered by serve on a pool of a single worker, just like python service.py answers them on stdin and stdout.
+class ServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        cls.pool = ProcessPoolExecutor(1, initializer=service._init, initargs=(None, 1<<30))
+
+    @classmethod
+    def tearDownClass(cls):
+
+        cls.pool.shutdown()
+
+    #Returns the answers to the given requests, given as objects or as lines, by their id
+    def serve(self, *requests):
+
+        lines = [n if isinstance(n, str) else json.dumps(n) for n in requests]
+        answers = []
+
+        service.serve(lines, answers.append, self.pool)
+
+        self.assertTrue(all(n.endswith("\n") for n in answers))
+
+        return {n["id"]: n for n in map(json.loads, answers)}
+
+    def test_ping(self):
+
+        self.assertEqual(self.serve({"id": 1, "ping": True}), {1: {"id": 1, "pong": True}})
+
+    def test_errors(self):
+
+        answers = self.serve("{", "", {"id": 2}, {"id": 3, "graph": "1 2\n1 2 A\n", "path": GRAPHS[0]}, {"id": 4, "graph": {"vertices": [1, 2], "edges": [[1, 3, "A"]]}}, {"id": 5, "graph": "1 2\n1 2 A\n", "method": "other"})
+
+        self.assertEqual(sorted(answers, key=str), [2, 3, 4, 5, None])
+        self.assertTrue(all(n["error"] for n in answers.values()))
+        self.assertIn("[1, 3, \"A\"]", answers[4]["error"])
+
+    def test_graph(self):
+
+        backend = dimacs_solver()
+
+        with open(GRAPHS[0]) as file:
+            text = file.read()
+
+        g = Graph(parse=GRAPHS[0])
+        data = {"vertices": list(g.graph), "edges": [[n, m, l] for n in g.graph for m in g.graph[n] for l in g.graph[n][m]]}
+        g.solve(backend=backend)
+
+        answers = self.serve({"id": "text", "graph": text, "backend": backend}, {"id": "json", "graph": data, "backend": backend}, {"id": "path", "path": GRAPHS[0], "backend": backend})
+
+        for n in answers.values():
+            self.assertNotIn("error", n)
+            self.assertEqual(n["type"], "graph")
+            self.assertEqual((n["core_vertices"], n["core_edges"]), g.counts())
+            self.assertTrue(n["proven"])
+            self.assertEqual(set(n["retraction"]), set(data["vertices"]))
+
+        self.assertEqual(Graph(parse=GRAPHS[0]).counts(), (answers["text"]["vertices"], answers["text"]["edges"]))
+        self.assertEqual(len(answers["json"]["core"]["vertices"]), g.counts()[0])
+        self.assertIsInstance(answers["text"]["core"], str)
+
+    def test_hgraph(self):
+
+        backend = dimacs_solver()
+        path = os.path.join(ROOT, "hgraphs", "hgraph5.txt")
+
+        h = HGraph(parse=path)
+        data = {"vertices": [n.name for n in h.hgraph[0]], "labels": {n.edge.name: n.edge.size for n in h.hgraph[1]}, "edges": [[n.edge.name]+[m.name for m in n.args] for n in h.hgraph[1]]}
+        h.solve(backend=backend, am=False)
+
+        answers = self.serve({"id": "path", "path": path, "backend": backend}, {"id": "json", "hgraph": data, "backend": backend, "am": False})
+
+        for n in answers.values():
+            self.assertNotIn("error", n)
+            self.assertEqual(n["type"], "hgraph")
+            self.assertEqual((n["core_vertices"], n["core_edges"]), h.counts())
+            self.assertEqual(set(n["retraction"]), set(data["vertices"]))
+
+        self.assertEqual(sorted(answers["json"]["core"]["vertices"]), sorted(n.name for n in h.hgraph[0]))
+
+    #A timeout of 0 returns the graph itself without proving it to be its own core
+    def test_timeout(self):
+
+        answer = self.serve({"id": 1, "path": GRAPHS[-1], "backend": dimacs_solver(), "timeout": 0})[1]
+
+        self.assertNotIn("error", answer)
+        self.assertFalse(answer["proven"])
+        self.assertEqual((answer["core_vertices"], answer["core_edges"]), (answer["vertices"], answer["edges"]))
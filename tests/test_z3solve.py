@@ -0,0 +1,60 @@
+import contextlib
+import io
+import os
+import unittest
+
+from cores import Graph
+from coresh import HGraph
+from tests import GRAPHS, HGRAPHS, ROOT, core_size, require_z3
+
+class Z3SolveTest(unittest.TestCase):
+
+    def setUp(self):
+
+        require_z3()
+
+    #Rebuilding the encoding for each retract and keeping a single solver across all of them find cores of the same size
+    def test_cores(self):
+
+        for path in GRAPHS+HGRAPHS:
+            for incremental in (False, True):
+                with self.subTest(path=path, incremental=incremental):
+                    g = (HGraph if path in HGRAPHS else Graph)(parse=path)
+                    g.z3solve(incremental=incremental)
+                    self.assertEqual(g.counts(), core_size(path))
+                    self.assertTrue(g.proven)
+
+    def test_empty_hgraph(self):
+
+        for n in ({}, {"incremental": True}, {"minimal": True}, {"fold": False}):
+            h = HGraph.__new__(HGraph)
+            h._load([], [])
+            self.assertIs(h.z3solve(**n), True)
+            self.assertEqual(h.counts(), (0, 0))
+
+    def test_single_vertex_graph(self):
+
+        g = Graph(parse=GRAPHS[0])
+        g._reduce([[n, 0] for n in g._vertices()])
+
+        for n in ({}, {"incremental": True}, {"minimal": True}):
+            self.assertEqual(Graph(copy=g).z3solve(**n), g.retraction())
+
+    #A failure in the middle of the calculation leaves the graph as it was, even though folding already reduced it.
+    def test_restore_on_failure(self):
+
+        def fail(*args):
+            raise Exception("failure")
+
+        #Folding reduces both of these
+        for g in (Graph(parse=os.path.join(ROOT, "graphs", "graph6.txt")), HGraph(parse=os.path.join(ROOT, "hgraphs", "hgraph9.txt"))):
+
+            counts = g.counts()
+            g._z3 = fail
+
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                result = g.z3solve()
+
+            self.assertIn(result, (None, False))
+            self.assertIn("failure", out.getvalue())
+            self.assertEqual(g.counts(), counts)